@@ -50,4 +50,22 @@ class InternshipResponseAdmin(admin.ModelAdmin):
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'description', 'created_at']
     search_fields = ['name']
-    list_filter = ['created_at']
\ No newline at end of file
+    list_filter = ['created_at']
+
+@admin.register(SkillTag)
+class SkillTagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'category', 'aliases']
+    search_fields = ['name', 'aliases']
+    list_filter = ['category']
+
+@admin.register(SearchCounter)
+class SearchCounterAdmin(admin.ModelAdmin):
+    list_display = ['name', 'value']
+
+@admin.register(SearchLock)
+class SearchLockAdmin(admin.ModelAdmin):
+    list_display = ['key', 'owner', 'acquired_at', 'expires_at']
+
+@admin.register(AISearchResultCache)
+class AISearchResultCacheAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'corpus_version', 'result_count', 'hits', 'stored_at', 'last_used_at']
@@ -1,80 +1,295 @@
 import re
+import sys
+import heapq
+import logging
+import multiprocessing
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from difflib import SequenceMatcher
-from collections import Counter
+from collections import Counter, deque, namedtuple
+from itertools import chain, repeat
+from operator import itemgetter
 import math
-from .models import Applicant, Vacancy, IdealCandidateProfile, IdealVacancyProfile, AISearchMatch
-
-
-class AIMatcher:
+import time
+import uuid
+
+import numpy as np
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import (Applicant, ApplicantFeatures, Vacancy, VacancyFeatures, IdealCandidateProfile,
+                     IdealVacancyProfile, AISearchMatch)
+from . import embeddings, minhash, result_cache, search_index, search_locks, skill_tags, tokenizer
+from .search_log import item_sampler, logger, summarize
+from .prefilter import apply_prefilter
+from .skill_tags import SkillRequirements
+from .skill_vectors import RequiredSkillsMatrix, skills_match_batch
+
+
+# Бонус к смысловой схожести за точные совпадения ключевых терминов
+# (порядок задает биты key_terms в признаках резюме: после изменения - rebuild_search_index)
+KEY_TERMS = ['python', 'developer', 'разработчик', 'frontend', 'backend', 'javascript', 'react']
+
+
+# Веса итоговой оценки кандидата (смысл, навыки, опыт) по умолчанию; у профиля HR - свои
+DEFAULT_SCORE_WEIGHTS = (0.6, 0.3, 0.1)
+
+
+# Составляющие оценки, которые хранятся в AISearchMatch отдельными столбцами
+MATCH_COMPONENTS = ('semantic_similarity', 'skills_match', 'experience_match')
+
+
+# Паттерны для извлечения требований
+REQUIREMENT_PATTERNS = [
+    re.compile(r'требования?[:\s]*([^.!?]+)[.!?]'),
+    re.compile(r'навыки?[:\s]*([^.!?]+)[.!?]'),
+    re.compile(r'умение[:\s]*([^.!?]+)[.!?]'),
+    re.compile(r'обязанности?[:\s]*([^.!?]+)[.!?]'),
+    re.compile(r'знание[:\s]*([^.!?]+)[.!?]'),
+]
+REQUIREMENT_SPLIT_RE = re.compile(r'[,;]|\s+и\s+')
+REQUIREMENT_WORD_RE = re.compile(r'\b[а-яa-z]{3,}\b')
+GENERAL_REQUIREMENT_WORDS = {'работа', 'опыт', 'знание', 'умение', 'требование', 'навык'}
+
+# Столбцы признаков резюме, которые нужны оценке (полный текст в них не входит)
+CANDIDATE_COLUMNS = (
+    'applicant_id', 'requirements', 'experience_level', 'minhash', 'embedding', 'word_hashes', 'key_terms',
+    'skill_ids', 'skill_tags_version',
+)
+
+# Стандартные метки полей резюме (текст уже в нижнем регистре)
+RESUME_LABELS_RE = re.compile(
+    r'(должность:|уровень опыта:|уровень образования:|навыки:|резюме:|опыт:|образование:|о себе:|соискатель:)'
+)
+
+
+def word_hashes(text):
+    """Отсортированные CRC32 слов текста - id токенов, одинаковые во всех процессах без общего словаря"""
+    words = tokenizer.tokenize(text).word_set
+    hashes = np.fromiter((zlib.crc32(word.encode('utf-8')) for word in words), dtype=np.uint32, count=len(words))
+    return np.unique(hashes)
+
+
+def key_terms_mask(text):
+    """Биты KEY_TERMS, встречающихся в тексте"""
+    text = tokenizer.tokenize(text).text
+    return sum(1 << bit for bit, term in enumerate(KEY_TERMS) if term in text)
+
+
+class SemanticScorer:
+    """Смысловая схожесть текстов с одним эталоном (текстом профиля).
+
+    Эталон разбирается один раз на весь поиск. Вместо SequenceMatcher по умолчанию
+    используется косинус векторов текстов (AI_SEARCH_SEMANTIC='embedding') или
+    оценка сходства Жаккара по MinHash-подписям словесных шинглов ('minhash');
+    векторы и подписи документов считаются при сохранении. При AI_SEARCH_EXACT_RERANK
+    включается прежняя точная оценка через SequenceMatcher; для отсечения кандидатов
+    у нее есть дешевые верхние оценки: real_quick_ratio() и quick_ratio()
+    никогда не меньше ratio().
+    """
+
+    def __init__(self, reference_text, exact=None):
+        self.exact = settings.AI_SEARCH_EXACT_RERANK if exact is None else exact
+        self.embedding = not self.exact and settings.AI_SEARCH_SEMANTIC == 'embedding'
+        reference = tokenizer.tokenize(reference_text)
+        self.reference = reference.text
+        self.reference_words = reference.word_set
+        self.reference_terms = [term for term in KEY_TERMS if term in self.reference]
+        self.reference_hashes = word_hashes(reference)
+        self.reference_mask = key_terms_mask(reference)
+
+        if self.exact:
+            self.matcher = SequenceMatcher(None)
+            self.matcher.set_seq2(self.reference)
+        elif self.embedding:
+            self.reference_vector = embeddings.vectorize(reference)
+        else:
+            self.reference_signature = minhash.signature(reference)
+
+    def similarities(self, blobs, texts):
+        """Косинусы (в процентах) сразу для части документов по их сохраненным векторам.
+
+        Одно умножение матрицы на вектор вместо оценки каждого документа по
+        отдельности; None, если векторы не используются.
+        """
+        if not self.embedding:
+            return None
+        matrix = embeddings.stack(blobs, texts)
+        return (embeddings.cosine_similarities(matrix, self.reference_vector) * 100).tolist()
+
+    def prepare_chunk(self, chunk):
+        """prepare() сразу для всей части CandidateChunk.
+
+        Совпадение слов, бонус за термины и оценка сходства считаются операциями
+        над массивами части, без текста резюме (он есть только при точной переоценке).
+        """
+        offsets = chunk.word_offsets
+        sizes = np.diff(offsets)
+        common = np.concatenate(([0], np.cumsum(np.isin(chunk.word_hashes, self.reference_hashes))))
+        common = common[offsets[1:]] - common[offsets[:-1]]
+        largest = np.maximum(np.maximum(sizes, len(self.reference_hashes)), 1)
+        word_similarities = np.where(common > 0, common / largest * 100, 0).tolist()
+
+        bonuses = [10 * bin(mask).count('1') for mask in (chunk.key_terms & self.reference_mask).tolist()]
+
+        if self.exact or not self.reference:
+            estimates = [0] * len(chunk)
+        elif self.embedding:
+            similarities = embeddings.cosine_similarities(chunk.embeddings, self.reference_vector) * 100
+            estimates = np.maximum(similarities, 0).tolist()
+        else:
+            estimates = (minhash.jaccard_estimates(chunk.minhashes, self.reference_signature) * 100).tolist()
 
-    @staticmethod
-    def calculate_semantic_similarity(text1, text2):
-        """Улучшенное вычисление смысловой схожести"""
-        if not text1 or not text2:
-            return 0
+        texts = chunk.texts if chunk.texts is not None else [None] * len(chunk)
+        return list(zip(texts, word_similarities, bonuses, estimates))
 
-        text1 = text1.lower().strip()
-        text2 = text2.lower().strip()
+    def prepare(self, text, signature=None, similarity=None):
+        """Дешевая часть оценки: нормализованный текст, совпадение слов, бонус за термины, оценка сходства.
 
-        # Если тексты очень похожи по заголовкам - повышаем оценку
-        words1 = set(text1.split())
-        words2 = set(text2.split())
+        similarity - косинус из similarities(), иначе он (или Жаккар по signature) считается здесь.
+        """
+        document = tokenizer.tokenize(text)
+        text = document.text
 
         # Проверяем совпадение ключевых слов
-        common_words = words1 & words2
+        words = document.word_set
+        common_words = words & self.reference_words
         if common_words:
-            word_similarity = len(common_words) / max(len(words1), len(words2)) * 100
+            word_similarity = len(common_words) / max(len(words), len(self.reference_words)) * 100
         else:
             word_similarity = 0
 
-        # Используем SequenceMatcher для общего сравнения
-        sequence_similarity = SequenceMatcher(None, text1, text2).ratio() * 100
+        # Повышаем оценку если есть точные совпадения ключевых слов
+        bonus = sum(10 for term in self.reference_terms if term in text)
+
+        estimate = 0
+        if self.exact or not text or not self.reference:
+            pass
+        elif self.embedding:
+            if similarity is None:
+                similarity = float(embeddings.vectorize(document) @ self.reference_vector) * 100
+            # Косинус неотрицательных по смыслу текстов может чуть уйти в минус из-за коллизий хэшей
+            estimate = max(similarity, 0)
+        else:
+            if signature is None:
+                signature = minhash.signature(document)
+            estimate = minhash.jaccard_estimate(signature, self.reference_signature) * 100
+
+        return text, word_similarity, bonus, estimate
 
+    @staticmethod
+    def _combine(word_similarity, sequence_similarity, bonus):
         # Комбинируем оба подхода
-        final_similarity = max(word_similarity, sequence_similarity)
+        return min(int(max(word_similarity, sequence_similarity) + bonus), 100)
+
+    def upper_bounds(self, prepared):
+        """Все более точные верхние оценки score(), начиная с самой дешевой.
+
+        text в prepared - None, если текст не читался (документ заведомо не пустой).
+        """
+        text, word_similarity, bonus, estimate = prepared
+        if text == '' or not self.reference:
+            return
+
+        # Оценка по векторам или подписям и так дешевая - она и есть точное значение
+        if not self.exact:
+            yield self._combine(word_similarity, estimate, bonus)
+            return
+
+        self.matcher.set_seq1(text)
+        yield self._combine(word_similarity, self.matcher.real_quick_ratio() * 100, bonus)
+        yield self._combine(word_similarity, self.matcher.quick_ratio() * 100, bonus)
+
+    def score(self, prepared):
+        """Итоговая оценка: по векторам, по MinHash или точная через SequenceMatcher"""
+        text, word_similarity, bonus, estimate = prepared
+        if text == '' or not self.reference:
+            return 0
 
-        # Повышаем оценку если есть точные совпадения ключевых слов
-        key_terms = ['python', 'developer', 'разработчик', 'frontend', 'backend', 'javascript', 'react']
-        for term in key_terms:
-            if term in text1 and term in text2:
-                final_similarity += 10  # Бонус за ключевые термины
+        if not self.exact:
+            return self._combine(word_similarity, estimate, bonus)
+
+        self.matcher.set_seq1(text)
+        return self._combine(word_similarity, self.matcher.ratio() * 100, bonus)
+
+
+class AIMatcher:
+
+    @staticmethod
+    def calculate_semantic_similarity(text1, text2):
+        """Улучшенное вычисление смысловой схожести"""
+        if not text1 or not text2:
+            return 0
 
-        return min(int(final_similarity), 100)
+        scorer = SemanticScorer(text2)
+        return scorer.score(scorer.prepare(text1))
 
     @staticmethod
-    def extract_requirements(text):
+    def semantic_similarities_to_profiles(text, profile_texts):
+        """calculate_semantic_similarity(text, текст профиля) для нескольких профилей сразу.
+
+        Оценка по векторам и MinHash симметрична, поэтому эталоном служит документ:
+        он разбирается один раз, а косинусы с векторами всех профилей - одним умножением
+        матрицы на вектор. Точная оценка SequenceMatcher несимметрична и считается
+        по каждому профилю отдельно.
+        """
+        if settings.AI_SEARCH_EXACT_RERANK:
+            return [AIMatcher.calculate_semantic_similarity(text, profile_text) for profile_text in profile_texts]
+        if not text:
+            return [0] * len(profile_texts)
+
+        scorer = SemanticScorer(text)
+        similarities = scorer.similarities([b''] * len(profile_texts), profile_texts) or repeat(None)
+        return [
+            scorer.score(scorer.prepare(profile_text, similarity=similarity)) if profile_text else 0
+            for profile_text, similarity in zip(profile_texts, similarities)
+        ]
+
+    @staticmethod
+    def extract_requirements(text, word_fallback=True):
         """Извлекает требования/навыки из текста автоматически"""
         if not text:
             return []
 
-        text_lower = text.lower()
+        text_lower = tokenizer.tokenize(text).text
         requirements = []
 
-        # Паттерны для извлечения требований
-        patterns = [
-            r'требования?[:\s]*([^.!?]+)[.!?]',
-            r'навыки?[:\s]*([^.!?]+)[.!?]',
-            r'умение[:\s]*([^.!?]+)[.!?]',
-            r'обязанности?[:\s]*([^.!?]+)[.!?]',
-            r'знание[:\s]*([^.!?]+)[.!?]',
-        ]
-
-        for pattern in patterns:
-            matches = re.findall(pattern, text_lower)
-            for match in matches:
+        for pattern in REQUIREMENT_PATTERNS:
+            for match in pattern.findall(text_lower):
                 # Разбиваем на отдельные требования
-                items = re.split(r'[,;]|\s+и\s+', match)
+                items = REQUIREMENT_SPLIT_RE.split(match)
                 requirements.extend([item.strip() for item in items if len(item.strip()) > 2])
 
         # Если не нашли по паттернам, берем все существительные и глаголы
-        if not requirements:
-            words = re.findall(r'\b[а-яa-z]{3,}\b', text_lower)
+        if not requirements and word_fallback:
+            words = REQUIREMENT_WORD_RE.findall(text_lower)
             # Фильтруем слишком общие слова
-            general_words = {'работа', 'опыт', 'знание', 'умение', 'требование', 'навык'}
-            requirements = [word for word in words if word not in general_words]
+            requirements = [word for word in words if word not in GENERAL_REQUIREMENT_WORDS]
 
         return list(set(requirements))  # Убираем дубликаты
 
+    @staticmethod
+    def extract_skills(text, tags=None):
+        """Навыки текста: id тегов справочника и требования-строки.
+
+        Упоминания тегов и их синонимов находятся автоматом Ахо-Корасик за один проход.
+        Если они нашлись, запасной вариант "все слова текста" не нужен - вместо него
+        в требования попадают найденные написания навыков. tags - уже полученный
+        skill_tags.current_tags().
+        """
+        if tags is None:
+            tags = skill_tags.current_tags()
+        document = tokenizer.tokenize(text)
+        mentions = skill_tags.current_automaton(tags).find(document.text)
+        requirements = list(set(AIMatcher.extract_requirements(document, word_fallback=not mentions))
+                            | set(mentions.values()))
+        # Требования, целиком совпавшие с тегом, тоже дают id
+        tag_ids = set(mentions) | set(skill_tags.map_skills(requirements, tags[1])[0])
+        return tag_ids, requirements
+
     @staticmethod
     def is_almost_empty_resume(text):
         """Проверяет, является ли резюме практически пустым"""
@@ -82,22 +297,167 @@ class AIMatcher:
             return True
 
         # Убираем стандартные метки полей и проверяем реальный контент
-        cleaned_text = re.sub(
-            r'(Должность:|Уровень опыта:|Уровень образования:|Навыки:|Резюме:|Опыт:|Образование:|О себе:|Соискатель:)',
-            '', text)
-        cleaned_text = cleaned_text.strip()
+        cleaned_text = RESUME_LABELS_RE.sub('', tokenizer.tokenize(text).text)
 
         # Если после очистки осталось мало значимого текста
         meaningful_words = [word for word in cleaned_text.split() if len(word) > 2]
         return len(meaningful_words) < 5  # Меньше 5 значимых слов - считаем пустым
 
     @staticmethod
-    def match_candidate_with_profile(applicant, ideal_profile):
+    def compute_applicant_features(applicant):
+        """Разбирает резюме один раз: текст, навыки, уровень опыта, признак пустоты"""
+        # Текст разбирается один раз, все признаки считаются по одному документу
+        document = tokenizer.tokenize(applicant.get_full_resume_text())
+        tags = skill_tags.current_tags()
+        tag_ids, requirements = AIMatcher.extract_skills(document, tags)
+
+        return {
+            'normalized_text': document.text,
+            'requirements': requirements,
+            'experience_level': AIMatcher.detect_experience_level(document),
+            'is_empty': AIMatcher.is_almost_empty_resume(document),
+            'minhash': minhash.to_bytes(minhash.signature(document)),
+            'embedding': embeddings.to_bytes(embeddings.vectorize(document)),
+            'word_hashes': word_hashes(document).astype('<u4').tobytes(),
+            'key_terms': key_terms_mask(document),
+            # Навыки из справочника - отсортированными id тегов
+            'skill_ids': skill_tags.ids_to_bytes(sorted(tag_ids)),
+            'skill_tags_version': tags[0],
+        }
+
+    @staticmethod
+    def refresh_applicant_features(applicant):
+        """Пересчитывает и сохраняет признаки резюме и его LSH-корзины (вызывается при сохранении соискателя)"""
+        features, _ = ApplicantFeatures.objects.update_or_create(
+            applicant=applicant,
+            defaults=AIMatcher.compute_applicant_features(applicant)
+        )
+        search_index.index_signature('applicant', applicant.pk, minhash.from_bytes(features.minhash))
+        applicant.features = features
+        return features
+
+    @staticmethod
+    def get_applicant_features(applicant):
+        """Возвращает сохраненные признаки, вычисляя их только для еще не разобранных резюме"""
+        try:
+            features = applicant.features
+        except ApplicantFeatures.DoesNotExist:
+            return AIMatcher.refresh_applicant_features(applicant)
+
+        # Признаки, сохраненные до появления MinHash-подписей, векторов или хэшей слов
+        if not features.minhash or not features.embedding or not (features.word_hashes or features.is_empty):
+            return AIMatcher.refresh_applicant_features(applicant)
+        return features
+
+    @staticmethod
+    def refresh_vacancy_features(vacancy):
+        """Пересчитывает признаки вакансии и ее LSH-корзины (вызывается при сохранении вакансии)"""
+        _, _, vacancy_text = AIMatcher.vacancy_document(vacancy)
+        signature = minhash.signature(vacancy_text)
+        tags = skill_tags.current_tags()
+        tag_ids, requirements = AIMatcher.extract_skills(vacancy_text, tags)
+
+        features, _ = VacancyFeatures.objects.update_or_create(
+            vacancy=vacancy,
+            defaults={
+                'minhash': minhash.to_bytes(signature),
+                'embedding': embeddings.to_bytes(embeddings.vectorize(vacancy_text)),
+                'requirements': requirements,
+                'skill_ids': skill_tags.ids_to_bytes(sorted(tag_ids)),
+                'skill_tags_version': tags[0],
+            }
+        )
+        search_index.index_signature('vacancy', vacancy.pk, signature)
+        vacancy.features = features
+        return features
+
+    @staticmethod
+    def get_vacancy_features(vacancy):
+        """Возвращает сохраненные признаки вакансии, вычисляя их при отсутствии"""
+        try:
+            features = vacancy.features
+        except VacancyFeatures.DoesNotExist:
+            return AIMatcher.refresh_vacancy_features(vacancy)
+
+        # Признаки, сохраненные до появления требований, тегов навыков или векторов
+        if features.skill_tags_version is None or not features.embedding:
+            return AIMatcher.refresh_vacancy_features(vacancy)
+        return features
+
+    @staticmethod
+    def prepare_candidate_query(ideal_profile, tags=None):
+        """Разбирает идеальный профиль один раз на весь поиск"""
+        return {
+            'ideal_text': ideal_profile.ideal_resume,
+            # Навыки из справочника сравниваются по id тегов, остальные - нечетко
+            'required_skills': AIMatcher.candidate_skill_requirements(ideal_profile, tags),
+            'experience_level': ideal_profile.experience_level,
+            'weights': ideal_profile.score_weights(),
+        }
+
+    @staticmethod
+    def pool_threshold(ideal_profile):
+        """Порог, с которого совпадения сохраняются.
+
+        Он ниже порога профиля на AI_SEARCH_MATCH_POOL_MARGIN: в этих пределах порог
+        и веса профиля меняются запросом к БД без повторного поиска.
+        """
+        return max(0, ideal_profile.min_match_percentage - settings.AI_SEARCH_MATCH_POOL_MARGIN)
+
+    @staticmethod
+    def pool_size(ideal_profile):
+        """Сколько лучших кандидатов сохраняется для профиля HR (больше, чем показывается)"""
+        return ideal_profile.max_candidates * settings.AI_SEARCH_MATCH_POOL_FACTOR
+
+    @staticmethod
+    def visible_matches(scored, min_score, limit=None):
+        """Совпадения, которые увидит пользователь: не ниже порога, по убыванию итогового процента.
+
+        Порядок тот же, что у AISearchMatch.objects.candidate_results и vacancy_results.
+        """
+        visible = sorted(
+            ((item_id, details) for item_id, details in scored if details['final_score'] >= min_score),
+            key=lambda item: (-item[1]['final_score'], -item[1]['semantic_similarity'])
+        )
+        return visible[:limit] if limit is not None else visible
+
+    @staticmethod
+    def candidate_skill_requirements(ideal_profile, tags=None):
+        """Требуемые навыки идеального профиля кандидата (tags - уже полученный skill_tags.current_tags())"""
+        if tags is None:
+            tags = skill_tags.current_tags()
+        tag_ids, requirements = AIMatcher.extract_skills(
+            ideal_profile.ideal_resume + " " + ideal_profile.required_skills, tags
+        )
+        return SkillRequirements(requirements, extra_tag_ids=tag_ids, tags=tags)
+
+    @staticmethod
+    def match_candidate_with_profile(applicant, ideal_profile, query=None):
         """Сопоставляет кандидата с идеальным профилем с улучшенной логикой"""
-        applicant_text = applicant.get_full_resume_text()
+        if query is None:
+            query = AIMatcher.prepare_candidate_query(ideal_profile)
+
+        features = CandidateFeatures.from_features(applicant, AIMatcher.get_applicant_features(applicant))
+        return AIMatcher.match_features_with_query(features, query)
 
+    @staticmethod
+    def combine_scores(semantic_similarity, skills_match, experience_match, weights=None):
+        """Взвешенная оценка с акцентом на смысл (weights - веса профиля, иначе по умолчанию).
+
+        Та же формула пересчитывает процент в БД: AISearchMatch.objects.rescore_candidates
+        """
+        semantic_weight, skills_weight, experience_weight = weights or DEFAULT_SCORE_WEIGHTS
+        return int(
+            semantic_similarity * semantic_weight +  # Главное - смысловая схожесть
+            skills_match * skills_weight +  # Конкретные требования
+            experience_match * experience_weight  # Уровень опыта
+        )
+
+    @staticmethod
+    def match_features_with_query(features, query, skills_match=None, semantic_similarity=None):
+        """Оценивает предвычисленные признаки резюме относительно разобранного профиля"""
         # Если резюме практически пустое, сильно снижаем оценку
-        if AIMatcher.is_almost_empty_resume(applicant_text):
+        if features.is_empty:
             return {
                 'semantic_similarity': 0,
                 'skills_match': 0,
@@ -107,33 +467,28 @@ class AIMatcher:
                 'explanation': "Резюме слишком пустое для анализа"
             }
 
-        # Смысловая схожесть
-        semantic_similarity = AIMatcher.calculate_semantic_similarity(
-            applicant_text,
-            ideal_profile.ideal_resume
-        )
-
-        # Извлекаем и сравниваем требования
-        applicant_skills = AIMatcher.extract_requirements(applicant_text)
-        required_skills = AIMatcher.extract_requirements(
-            ideal_profile.ideal_resume + " " + ideal_profile.required_skills
-        )
-
-        # Схожесть требований
-        skills_match = AIMatcher.calculate_skills_match(applicant_skills, required_skills)
+        # Смысловая схожесть (если не посчитана заранее)
+        if semantic_similarity is None:
+            semantic_similarity = AIMatcher.calculate_semantic_similarity(
+                features.normalized_text,
+                query['ideal_text']
+            )
 
-        # Опыт работы (определяем по контексту)
-        experience_match = AIMatcher.match_experience_by_context(
-            applicant_text,
-            ideal_profile.experience_level
+        # Сравниваем требования (если не посчитано заранее пакетом для всех кандидатов)
+        applicant_skills = features.requirements
+        if skills_match is None:
+            skills_match = AIMatcher.calculate_skills_match_batch(
+                [applicant_skills], query['required_skills'], [features.tag_ids]
+            )[0]
+
+        # Опыт работы (уровень определен по контексту при сохранении резюме)
+        experience_match = AIMatcher.compare_experience_levels(
+            features.experience_level,
+            query['experience_level']
         )
 
-        # Взвешенная оценка с акцентом на смысл
-        final_score = int(
-            semantic_similarity * 0.6 +  # Главное - смысловая схожесть
-            skills_match * 0.3 +  # Конкретные требования
-            experience_match * 0.1  # Уровень опыта
-        )
+        final_score = AIMatcher.combine_scores(semantic_similarity, skills_match, experience_match,
+                                               query.get('weights'))
 
         return {
             'semantic_similarity': semantic_similarity,
@@ -149,6 +504,23 @@ class AIMatcher:
     @staticmethod
     def calculate_skills_match(skills1, skills2):
         """Сравнивает наборы навыков"""
+        return skills_match_batch([skills1], skills2)[0]
+
+    @staticmethod
+    def calculate_skills_match_batch(candidates_skills, required_skills, candidates_tag_ids=None):
+        """Сравнивает навыки сразу всех кандидатов с требованиями одной матричной операцией.
+
+        Для SkillRequirements навыки из справочника сравниваются пересечением id тегов.
+        """
+        if isinstance(required_skills, SkillRequirements):
+            if candidates_tag_ids is None:
+                candidates_tag_ids = [frozenset()] * len(candidates_skills)
+            return required_skills.match_batch(candidates_skills, candidates_tag_ids)
+        return skills_match_batch(candidates_skills, required_skills)
+
+    @staticmethod
+    def calculate_skills_match_exact(skills1, skills2):
+        """Точное попарное сравнение навыков через SequenceMatcher (эталон для векторной версии)"""
         if not skills2:
             return 100
 
@@ -166,37 +538,38 @@ class AIMatcher:
 
         return int((total_match / len(skills2)) * 100)
 
+    # Ключевые слова для разных уровней
+    EXPERIENCE_KEYWORDS = {
+        'junior': ['стажер', 'начинающий', 'младший', 'без опыта', 'учусь'],
+        'middle': ['опыт', 'работал', 'разрабатывал', 'создавал', 'участвовал'],
+        'senior': ['ведущий', 'старший', 'руководил', 'управлял', 'архитектура', 'стратеги'],
+        'lead': ['тимлид', 'руководитель', 'управление', 'менеджер', 'координация']
+    }
+
     @staticmethod
-    def match_experience_by_context(text, target_experience):
-        """Определяет уровень опыта по контексту"""
-        text_lower = text.lower()
-
-        # Ключевые слова для разных уровней
-        experience_keywords = {
-            'junior': ['стажер', 'начинающий', 'младший', 'без опыта', 'учусь'],
-            'middle': ['опыт', 'работал', 'разрабатывал', 'создавал', 'участвовал'],
-            'senior': ['ведущий', 'старший', 'руководил', 'управлял', 'архитектура', 'стратеги'],
-            'lead': ['тимлид', 'руководитель', 'управление', 'менеджер', 'координация']
-        }
+    def detect_experience_level(text):
+        """Определяет доминирующий уровень опыта по контексту"""
+        text_lower = tokenizer.tokenize(text).text
 
         # Считаем вес каждого уровня в тексте
         level_weights = {}
-        for level, keywords in experience_keywords.items():
+        for level, keywords in AIMatcher.EXPERIENCE_KEYWORDS.items():
             weight = sum(1 for keyword in keywords if keyword in text_lower)
             level_weights[level] = weight
 
-        # Определяем доминирующий уровень
-        if not level_weights:
-            return 0
+        return max(level_weights.items(), key=lambda x: x[1])[0]
 
-        dominant_level = max(level_weights.items(), key=lambda x: x[1])[0]
+    @staticmethod
+    def compare_experience_levels(dominant_level, target_experience):
+        """Сравнивает определенный уровень опыта с целевым"""
+        if not dominant_level:
+            return 0
 
-        # Сравниваем с целевым уровнем
         if dominant_level == target_experience.lower():
             return 100
 
         # Получаем список уровней для сравнения позиций
-        levels = list(experience_keywords.keys())
+        levels = list(AIMatcher.EXPERIENCE_KEYWORDS.keys())
         try:
             dominant_index = levels.index(dominant_level)
             target_index = levels.index(target_experience.lower())
@@ -209,6 +582,14 @@ class AIMatcher:
         except ValueError:
             return 30  # Если уровень не найден
 
+    @staticmethod
+    def match_experience_by_context(text, target_experience):
+        """Определяет уровень опыта по контексту"""
+        return AIMatcher.compare_experience_levels(
+            AIMatcher.detect_experience_level(text),
+            target_experience
+        )
+
     @staticmethod
     def generate_explanation(semantic, skills, experience):
         """Генерирует понятное объяснение совпадения"""
@@ -234,104 +615,1141 @@ class AIMatcher:
         return ". ".join(explanations)
 
     @staticmethod
-    def find_candidates_for_hr(ideal_profile):
-        """Умный поиск кандидатов с фильтрацией пустых резюме"""
-        # Ищем только опубликованные резюме
-        applicants = Applicant.objects.filter(is_published=True)
-        matches = []
-
-        print(f"\n=== ПОИСК КАНДИДАТОВ ДЛЯ: {ideal_profile.title} ===")
-        print(f"Всего кандидатов в базе: {applicants.count()}")
-
-        for applicant in applicants:
-            # Проверяем, не пустое ли резюме
-            resume_text = applicant.get_full_resume_text()
-            if AIMatcher.is_almost_empty_resume(resume_text):
-                print(f"❌ Пропускаем пустое резюме: {applicant.first_name} {applicant.last_name}")
-                continue
+    def get_candidate_shortlist(ideal_profile):
+        """Отбирает id кандидатов через инвертированный индекс вместо полного перебора.
+
+        Возвращает None, если индекс еще не построен и оценивать нужно весь корпус.
+        """
+        if search_index.index_is_empty():
+            return None
+
+        query_text = f"{ideal_profile.ideal_resume} {ideal_profile.required_skills}"
+        shortlist_ids = search_index.shortlist_applicant_ids(query_text)
+
+        # Резюме, ближайшие к идеальному по косинусу векторов (top-K одним умножением матрицы на вектор)
+        seen_ids = set(shortlist_ids)
+        nearest = embeddings.get_index('applicant').nearest(query_text, settings.AI_SEARCH_SHORTLIST_SIZE)
+        for pk, _ in nearest:
+            if pk not in seen_ids:
+                shortlist_ids.append(pk)
+                seen_ids.add(pk)
+
+        # Резюме, близкие к идеальному по MinHash, добавляем через поиск по LSH-корзинам
+        for pk in search_index.lsh_candidate_ids('applicant', minhash.signature(ideal_profile.ideal_resume)):
+            if pk not in seen_ids:
+                shortlist_ids.append(pk)
+                seen_ids.add(pk)
+
+        # Порядок - по числу совпавших токенов; неопубликованные отсеются при чтении признаков
+        return shortlist_ids
 
-            match_result = AIMatcher.match_candidate_with_profile(applicant, ideal_profile)
+    @staticmethod
+    def find_candidates_for_hr(ideal_profile, progress_callback=None, budget=None, resume=None):
+        """Умный поиск кандидатов с фильтрацией пустых резюме.
+
+        Кандидаты оцениваются в порядке шорт-листа (лучшие по индексу - первыми). При
+        исчерпании budget возвращаются лучшие из уже оцененных с stats['partial'], а
+        result.resume передается в resume, чтобы досчитать остальных.
+        """
+        timer = StageTimer()
+
+        # Ищем только опубликованные резюме, дорогую оценку запускаем только для шорт-листа.
+        # Продолжение идет по шорт-листу, сохраненному при остановке: собранный заново
+        # может уже не содержать последнего оцененного кандидата
+        shortlist_ids = resume['shortlist'] if resume else AIMatcher.get_candidate_shortlist(ideal_profile)
+        full_shortlist = shortlist_ids
+        timer.mark('shortlist')
+
+        if shortlist_ids is None:
+            logger.debug('Профиль %s: индекс не построен, оцениваем весь корпус', ideal_profile.pk)
+        else:
+            logger.debug('Профиль %s: кандидатов в шорт-листе %d', ideal_profile.pk, len(shortlist_ids))
+
+        # Профиль разбираем один раз, резюме - берем уже разобранными
+        query = AIMatcher.prepare_candidate_query(ideal_profile)
+        # Сохраняем запас ниже порога и сверх max_candidates: порог и веса меняются без повторного поиска
+        query['min_match_percentage'] = AIMatcher.pool_threshold(ideal_profile)
+
+        # Структурные ограничения профиля (уровень опыта, образование) - фильтрами в SQL
+        rows, prefilter_stats = apply_prefilter(
+            AIMatcher.candidate_rows(), ideal_profile, prefix='applicant__',
+            scope=Q(applicant_id__in=shortlist_ids) if shortlist_ids is not None else None,
+            explain=logger.isEnabledFor(logging.DEBUG)
+        )
+        logger.debug('Профиль %s: префильтр %s', ideal_profile.pk, prefilter_stats)
+        timer.mark('prefilter')
+
+        total = len(shortlist_ids) if shortlist_ids is not None else None
+        after_id = 0
+        if resume:
+            # Продолжаем с кандидата, следующего за последним оцененным
+            if shortlist_ids is None:
+                after_id = resume['last_id']
+            else:
+                shortlist_ids = shortlist_ids[shortlist_ids.index(resume['last_id']) + 1:]
 
-            print(f"Кандидат: {applicant.first_name} {applicant.last_name} - {match_result['final_score']}%")
+        # Признаки читаются частями прямо во время оценки (этап scoring), пустые резюме отсеиваются в запросе
+        chunks = AIMatcher.iter_candidate_chunks(shortlist_ids, rows=rows, after_id=after_id)
 
-            if match_result['final_score'] >= ideal_profile.min_match_percentage:
-                matches.append({
-                    'applicant': applicant,
-                    'match_details': match_result,
-                    'score': match_result['final_score']
-                })
-                print(f"✅ ДОБАВЛЕН: {applicant.first_name} {applicant.last_name}")
+        # Лучшие по смыслу, в том числе при параллельной оценке частями
+        scored, pruning_stats = run_chunked_scoring(
+            score_candidate_chunk, query, chunks, AIMatcher.pool_size(ideal_profile),
+            progress_callback=progress_callback, total=total, budget=budget, resume=resume
+        )
+        if budget is not None and budget.stopped:
+            budget.resume_state['shortlist'] = full_shortlist
+        timer.mark('scoring')
+
+        # Модели резюме нужны только попавшим в результат
+        applicants_by_id = Applicant.objects.in_bulk([applicant_id for applicant_id, _ in scored])
+        # Резюме, удаленные между остановкой и продолжением поиска
+        scored = [(applicant_id, details) for applicant_id, details in scored if applicant_id in applicants_by_id]
+        top_matches = AIMatcher.store_candidate_matches(ideal_profile, scored, applicants_by_id, pruning_stats,
+                                                        partial=budget is not None and budget.stopped)
+        timer.mark('write')
+        top_matches.stats['prefilter'] = prefilter_stats
+        top_matches.stats['timings'] = timer.timings
+        if budget is not None:
+            budget.mark_partial(top_matches)
+        summarize('candidates', ideal_profile, top_matches)
 
-        print(f"Найдено подходящих кандидатов: {len(matches)}")
+        return top_matches
 
-        # Сортируем по смыслу
-        matches.sort(key=lambda x: x['match_details']['semantic_similarity'], reverse=True)
-        top_matches = matches[:ideal_profile.max_candidates]
-
-        # Удаляем старые совпадения
-        AISearchMatch.objects.filter(ideal_candidate_profile=ideal_profile).delete()
-
-        # Сохраняем новые результаты
-        for match in top_matches:
-            AISearchMatch.objects.create(
-                ideal_candidate_profile=ideal_profile,
-                matched_applicant=match['applicant'],
-                match_percentage=match['score'],
-                match_details=match['match_details']
+    @staticmethod
+    def store_candidate_matches(ideal_profile, scored, applicants_by_id, pruning_stats, partial=False):
+        """Сохраняет разницу с прошлым запуском и собирает SearchResult.
+
+        Сохраняются все оцененные кандидаты (с запасом ниже порога и сверх
+        max_candidates), в SearchResult - только видимые пользователю.
+        partial - поиск остановлен по бюджету (см. save_matches).
+        """
+        top_matches = SearchResult(
+            {
+                'applicant': applicants_by_id[applicant_id],
+                'match_details': match_result,
+                'score': match_result['final_score']
+            }
+            for applicant_id, match_result in AIMatcher.visible_matches(
+                scored, ideal_profile.min_match_percentage, ideal_profile.max_candidates
             )
+        )
+
+        top_matches.stats['pruning'] = pruning_stats
+        top_matches.stats['pool'] = {'size': len(scored), 'min_score': AIMatcher.pool_threshold(ideal_profile)}
 
+        # Сохраняем только разницу с прошлым запуском
+        top_matches.stats['write'] = AIMatcher.save_matches(
+            AISearchMatch.objects.filter(ideal_candidate_profile=ideal_profile),
+            'matched_applicant_id',
+            {'ideal_candidate_profile': ideal_profile},
+            dict(scored),
+            partial
+        )
         return top_matches
 
     @staticmethod
-    def find_vacancies_for_applicant(ideal_profile):
-        """Умный поиск вакансий с улучшенным алгоритмом"""
-        vacancies = Vacancy.objects.filter(status='published')
-        matches = []
+    def candidate_rows():
+        """Признаки опубликованных непустых резюме - исходный набор строк для поиска кандидатов"""
+        return ApplicantFeatures.objects.filter(applicant__is_published=True, is_empty=False)
+
+    @staticmethod
+    def iter_candidate_chunks(applicant_ids=None, chunk_size=None, rows=None, after_id=0):
+        """Опубликованные непустые резюме частями по chunk_size в виде CandidateChunk.
+
+        Читаются только нужные оценке столбцы, весь корпус - по возрастанию id без OFFSET,
+        шорт-лист applicant_ids - частями списка в его порядке. В памяти одновременно
+        держится одна часть, сколько бы резюме ни было в базе. rows - уже суженный
+        набор строк candidate_rows(), after_id - продолжить чтение всего корпуса после этого id.
+        """
+        chunk_size = chunk_size or settings.AI_SEARCH_CHUNK_SIZE
+
+        # Резюме без сохраненных признаков, подписи, вектора или хэшей слов разбираем заранее
+        stale = Applicant.objects.filter(is_published=True).filter(
+            Q(features__isnull=True) | Q(features__minhash=b'') | Q(features__embedding=b'')
+            | Q(features__word_hashes=b'', features__is_empty=False)
+        )
+        if applicant_ids is not None:
+            stale = stale.filter(pk__in=applicant_ids)
+        for applicant in stale.iterator(chunk_size=chunk_size):
+            AIMatcher.refresh_applicant_features(applicant)
+
+        tags = skill_tags.current_tags()
+        if rows is None:
+            rows = AIMatcher.candidate_rows()
+
+        # Полный текст читается только для точной переоценки
+        # и для резюме, разобранных до изменения справочника тегов
+        exact = settings.AI_SEARCH_EXACT_RERANK
+        columns = CANDIDATE_COLUMNS + ('normalized_text',) if exact else CANDIDATE_COLUMNS
+
+        def read(queryset):
+            rows = list(queryset.values_list(*columns))
+            stale_ids = [row[0] for row in rows if row[8] != tags[0]]
+            if exact:
+                texts = [row[-1] for row in rows]
+            else:
+                texts = None
+                stale_texts = dict(ApplicantFeatures.objects.filter(applicant_id__in=stale_ids).values_list(
+                    'applicant_id', 'normalized_text'
+                )) if stale_ids else {}
+            # Автомат справочника - один на часть корпуса и только если в ней есть устаревшие теги
+            automaton = skill_tags.current_automaton(tags) if stale_ids else None
+
+            chunk_rows = []
+            remapped = {}
+            for position, row in enumerate(rows):
+                pk, requirements, level, signature, embedding, hashes, key_terms, skill_ids, tags_version = row[:9]
+                text = texts[position] if exact else stale_texts.get(pk, '')
+                tag_ids = skill_tags.stored_tag_ids(requirements, text, skill_ids, tags_version, tags, automaton)
+                if tags_version != tags[0]:
+                    remapped[pk] = tag_ids
+                chunk_rows.append((pk, requirements, level, signature, embedding, hashes, key_terms, tag_ids))
+            # Заново сопоставленные теги сохраняются, чтобы следующий поиск их не пересчитывал
+            skill_tags.save_remapped_ids(ApplicantFeatures, 'applicant_id', remapped, tags[0])
+            return CandidateChunk.from_rows(chunk_rows, texts)
+
+        if applicant_ids is not None:
+            for start in range(0, len(applicant_ids), chunk_size):
+                ids = applicant_ids[start:start + chunk_size]
+                chunk = read(rows.filter(applicant_id__in=ids))
+                # Порядок шорт-листа: лучшие по индексу - первыми
+                positions = {pk: position for position, pk in enumerate(ids)}
+                chunk = chunk.take(sorted(range(len(chunk)), key=lambda row: positions[int(chunk.ids[row])]))
+                if len(chunk):
+                    yield chunk
+            return
+
+        last_id = after_id
+        while True:
+            chunk = read(rows.filter(applicant_id__gt=last_id).order_by('applicant_id')[:chunk_size])
+            if not len(chunk):
+                return
+            last_id = int(chunk.ids[-1])
+            yield chunk
+
+    @staticmethod
+    def prepare_profiles_batch(profiles, tags=None):
+        """Разбирает профили HR для score_profiles_chunk: навыки вне справочника
+        каждого профиля - свой отрезок столбцов общей матрицы n-грамм.
+        """
+        if tags is None:
+            tags = skill_tags.current_tags()
+        requirements = []
+        batch_profiles = []
+        for profile in profiles:
+            profile_requirements = AIMatcher.candidate_skill_requirements(profile, tags)
+            query = {
+                'ideal_text': profile.ideal_resume,
+                'experience_level': profile.experience_level,
+                'min_match_percentage': AIMatcher.pool_threshold(profile),
+                'top_k': AIMatcher.pool_size(profile),
+                'weights': profile.score_weights(),
+            }
+            start = len(requirements)
+            requirements.extend(profile_requirements.free_skills)
+            batch_profiles.append((profile.pk, query, profile_requirements, start, len(requirements)))
 
-        print(f"\n=== УЛУЧШЕННЫЙ ПОИСК ВАКАНСИЙ ===")
+        return {'required_skills': RequiredSkillsMatrix(requirements), 'profiles': batch_profiles}
 
+    @staticmethod
+    def find_candidates_for_profiles(profiles=None, progress_callback=None):
+        """Пакетный поиск кандидатов сразу для многих профилей HR.
+
+        Корпус резюме читается из БД и разбирается один раз, требования всех профилей
+        сравниваются с навыками кандидатов одной матрицей (кандидаты x требования).
+        В отличие от find_candidates_for_hr оценивается весь корпус, без шорт-листа
+        индекса.
+
+        На время поиска берется блокировка каждого профиля, как у фоновых задач и
+        rematch_profiles: профили, по которым сейчас идет поиск, пропускаются.
+        Результаты записываются в кэш результатов. Возвращает {id профиля: SearchResult}
+        только для обработанных профилей.
+        """
+        if profiles is None:
+            profiles = IdealCandidateProfile.objects.filter(is_active=True)
+
+        owner = f'batch:{uuid.uuid4().hex}'
+        locked = [
+            profile for profile in profiles
+            if search_locks.acquire(search_locks.profile_key(profile), owner)
+        ]
+        try:
+            return AIMatcher._find_candidates_for_locked_profiles(locked, owner, progress_callback)
+        finally:
+            for profile in locked:
+                search_locks.release(search_locks.profile_key(profile), owner)
+
+    @staticmethod
+    def _find_candidates_for_locked_profiles(profiles, owner, progress_callback=None):
+        if not profiles:
+            return {}
+
+        def report_progress(scored, total):
+            # Долгий проход по корпусу продлевает блокировки всех профилей
+            search_locks.extend_owned(owner)
+            if progress_callback:
+                progress_callback(scored, total)
+
+        # Версию корпуса фиксируем до поиска: изменения во время поиска сделают результат неактуальным
+        version = result_cache.corpus_version()
+        timer = StageTimer()
+        batch = AIMatcher.prepare_profiles_batch(profiles)
+
+        chunk_results = {profile.pk: [] for profile in profiles}
+        chunk_stats = {profile.pk: Counter() for profile in profiles}
+        # Корпус читается частями во время оценки, поэтому этапы чтения и оценки общие
+        chunks = AIMatcher.iter_candidate_chunks()
+        for results, _ in map_chunks(score_profiles_chunk, batch, chunks, report_progress):
+            for profile_id, (chunk_result, stats) in results.items():
+                chunk_results[profile_id].append(chunk_result)
+                chunk_stats[profile_id].update(stats)
+        timer.mark('scoring')
+
+        scored_by_profile = {
+            profile.pk: merge_chunk_results(chunk_results[profile.pk], chunk_stats[profile.pk],
+                                              AIMatcher.pool_size(profile))
+            for profile in profiles
+        }
+        applicants_by_id = Applicant.objects.in_bulk({
+            applicant_id for scored, _ in scored_by_profile.values() for applicant_id, _ in scored
+        })
+
+        results = {}
+        for profile in profiles:
+            scored, pruning_stats = scored_by_profile[profile.pk]
+            results[profile.pk] = AIMatcher.store_candidate_matches(profile, scored, applicants_by_id, pruning_stats)
+        timer.mark('write')
+
+        for profile in profiles:
+            results[profile.pk].stats['timings'] = timer.timings
+            summarize('candidates', profile, results[profile.pk])
+            result_cache.store(profile, version, results[profile.pk])
+        return results
+
+    @staticmethod
+    def prepare_vacancy_query(ideal_profile, tags=None):
+        """Разбирает идеальный профиль вакансии один раз на весь поиск"""
         # Используем правильные поля из модели IdealVacancyProfile
         profile_title = getattr(ideal_profile, 'title', '')
         desired_skills = getattr(ideal_profile, 'desired_skills', '')
         tech_stack = getattr(ideal_profile, 'tech_stack', '')
 
         # Формируем идеальный запрос из всех доступных полей
-        ideal_text = f"{profile_title} {desired_skills} {tech_stack}"
+        query = {
+            'ideal_text': f"{profile_title} {desired_skills} {tech_stack}",
+            'min_match_percentage': AIMatcher.pool_threshold(ideal_profile),
+        }
+
+        # Если соискатель выбрал теги навыков, совпадение навыков тоже входит в оценку
+        # (all(), а не values_list: теги могут быть загружены заранее через prefetch_related)
+        selected_tag_ids = [tag.pk for tag in ideal_profile.selected_skill_tags.all()] \
+            if ideal_profile.pk else []
+        if selected_tag_ids:
+            profile_skills = [
+                item.strip() for item in REQUIREMENT_SPLIT_RE.split(f"{desired_skills}, {tech_stack}")
+                if len(item.strip()) > 1
+            ]
+            if tags is None:
+                tags = skill_tags.current_tags()
+            query['required_skills'] = SkillRequirements(
+                profile_skills, extra_tag_ids=set(selected_tag_ids) | skill_tags.find_tag_ids(query['ideal_text'], tags),
+                tags=tags
+            )
+
+        return query
+
+    @staticmethod
+    def vacancy_tag_ids(vacancy, features, tags=None, automaton=None, remapped=None):
+        """id тегов навыков вакансии по ее сохраненным признакам.
+
+        Теги, заново сопоставленные после изменения справочника, сохраняются в признаки
+        сразу, а если передан remapped - добавляются в него для одной общей записи.
+        """
+        tags = tags or skill_tags.current_tags()
+        _, _, vacancy_text = AIMatcher.vacancy_document(vacancy)
+        tag_ids = skill_tags.stored_tag_ids(features.requirements, vacancy_text, features.skill_ids,
+                                            features.skill_tags_version, tags, automaton)
+        if features.skill_tags_version != tags[0]:
+            if remapped is None:
+                skill_tags.save_remapped_ids(VacancyFeatures, 'vacancy_id', {vacancy.pk: tag_ids}, tags[0])
+            else:
+                remapped[vacancy.pk] = tag_ids
+            features.skill_ids = skill_tags.ids_to_bytes(sorted(tag_ids))
+            features.skill_tags_version = tags[0]
+        return tag_ids
+
+    @staticmethod
+    def combine_vacancy_scores(semantic_similarity, skills_match=None):
+        """Итог для вакансии: смысловая схожесть, а при выбранных тегах - вместе с навыками"""
+        if skills_match is None:
+            return semantic_similarity
+        return int(semantic_similarity * 0.7 + skills_match * 0.3)
+
+    @staticmethod
+    def vacancy_document(vacancy):
+        """Вакансия в виде (id, заголовок, текст для сравнения)"""
+        return vacancy.pk, vacancy.title, f"{vacancy.title} {vacancy.description} {vacancy.requirements}"
+
+    @staticmethod
+    def match_vacancy_with_query(vacancy_text, query, similarity=None, skills_match=None):
+        """Оценивает текст вакансии относительно разобранного профиля"""
+        if similarity is None:
+            similarity = AIMatcher.calculate_semantic_similarity(vacancy_text, query['ideal_text'])
+
+        required_skills = query.get('required_skills')
+        if required_skills is None:
+            return {
+                'semantic_similarity': similarity,
+                'final_score': similarity,
+                'explanation': f"Смысловое соответствие: {similarity}%"
+            }
 
-        print(f"Поиск для: {profile_title}")
-        print(f"Минимальный %: {ideal_profile.min_match_percentage}")
-        print(f"Всего вакансий: {vacancies.count()}")
+        if skills_match is None:
+            tag_ids, requirements = AIMatcher.extract_skills(vacancy_text)
+            skills_match = required_skills.match_batch(
+                [requirements], [frozenset(tag_ids)]
+            )[0]
 
+        return {
+            'semantic_similarity': similarity,
+            'skills_match': skills_match,
+            'final_score': AIMatcher.combine_vacancy_scores(similarity, skills_match),
+            'explanation': f"Смысловое соответствие: {similarity}%, совпадение навыков: {skills_match}%"
+        }
+
+    @staticmethod
+    def vacancy_documents(vacancies):
+        """Вакансии в виде документов для score_vacancy_chunk: ({id: вакансия}, [документ])"""
+        vacancies_by_id = {}
+        documents = []
+        tags = skill_tags.current_tags()
+        automaton = None
+        remapped = {}
         for vacancy in vacancies:
-            vacancy_text = f"{vacancy.title} {vacancy.description} {vacancy.requirements}"
-
-            similarity = AIMatcher.calculate_semantic_similarity(vacancy_text, ideal_text)
-
-            print(f"'{vacancy.title}' - {similarity}%")
-
-            if similarity >= ideal_profile.min_match_percentage:
-                matches.append({
-                    'vacancy': vacancy,
-                    'match_details': {
-                        'semantic_similarity': similarity,
-                        'final_score': similarity,
-                        'explanation': f"Смысловое соответствие: {similarity}%"
-                    },
-                    'score': similarity
-                })
-
-        print(f"Найдено совпадений: {len(matches)}")
-
-        # Удаляем старые совпадения для этого профиля
-        AISearchMatch.objects.filter(ideal_vacancy_profile=ideal_profile).delete()
-
-        # Сохраняем новые результаты
-        for match in matches:
-            AISearchMatch.objects.create(
-                ideal_vacancy_profile=ideal_profile,
-                matched_vacancy=match['vacancy'],
-                match_percentage=match['score'],
-                match_details=match['match_details']
+            vacancies_by_id[vacancy.pk] = vacancy
+            # Смысловую схожесть считаем по сохраненным вектору и подписи, навыки - по сохраненным требованиям
+            features = AIMatcher.get_vacancy_features(vacancy)
+            if automaton is None and features.skill_tags_version != tags[0]:
+                automaton = skill_tags.current_automaton(tags)
+            documents.append(AIMatcher.vacancy_document(vacancy) + (
+                features.minhash, features.requirements,
+                AIMatcher.vacancy_tag_ids(vacancy, features, tags, automaton, remapped),
+                bytes(features.embedding)
+            ))
+        skill_tags.save_remapped_ids(VacancyFeatures, 'vacancy_id', remapped, tags[0])
+        return vacancies_by_id, documents
+
+    @staticmethod
+    def get_vacancy_shortlist(query_text):
+        """Отбирает id вакансий по индексам вместо полного перебора: ближайшие по косинусу
+        векторов, затем близкие по MinHash из LSH-корзин и сохраненные после построения
+        индекса векторов.
+
+        Возвращает None, если LSH-корзины вакансий еще не построены и оценивать нужно все вакансии.
+        """
+        if search_index.lsh_is_empty('vacancy'):
+            return None
+
+        index = embeddings.get_index('vacancy')
+        shortlist_ids = [pk for pk, _ in index.nearest(query_text, settings.AI_SEARCH_SHORTLIST_SIZE)]
+        seen_ids = set(shortlist_ids)
+        for pk in chain(search_index.lsh_candidate_ids('vacancy', minhash.signature(query_text)),
+                        embeddings.changed_after_index('vacancy', index)):
+            if pk not in seen_ids:
+                shortlist_ids.append(pk)
+                seen_ids.add(pk)
+        return shortlist_ids
+
+    @staticmethod
+    def find_vacancies_for_applicant(ideal_profile, progress_callback=None, budget=None, resume=None):
+        """Умный поиск вакансий с улучшенным алгоритмом.
+
+        Оцениваются только вакансии шорт-листа (get_vacancy_shortlist), самые похожие
+        по косинусу векторов - первыми. Бюджет и продолжение - как в find_candidates_for_hr.
+        """
+        timer = StageTimer()
+
+        query = AIMatcher.prepare_vacancy_query(ideal_profile)
+        # Продолжение идет по порядку оценки, сохраненному при остановке
+        shortlist_ids = resume['shortlist'] if resume else AIMatcher.get_vacancy_shortlist(query['ideal_text'])
+        timer.mark('shortlist')
+
+        # Категория и локация из профиля - фильтрами в SQL, до загрузки вакансий
+        vacancies, prefilter_stats = apply_prefilter(
+            Vacancy.objects.filter(status='published').select_related('features'), ideal_profile,
+            scope=Q(pk__in=shortlist_ids) if shortlist_ids is not None else None,
+            explain=logger.isEnabledFor(logging.DEBUG)
+        )
+        logger.debug('Профиль %s: префильтр %s', ideal_profile.pk, prefilter_stats)
+        if shortlist_ids is not None:
+            vacancies = vacancies.filter(pk__in=shortlist_ids)
+        timer.mark('prefilter')
+
+        vacancies_by_id, documents = AIMatcher.vacancy_documents(vacancies)
+
+        # Самые похожие по косинусу векторов - первыми: при остановке по бюджету оценены самые перспективные.
+        # Вакансии, которых еще нет в индексе процесса, идут следом в прежнем порядке
+        if documents:
+            if shortlist_ids is None:
+                shortlist_ids = [vacancy_id for vacancy_id, _ in
+                                 embeddings.get_index('vacancy').nearest(query['ideal_text'])]
+            ranks = {vacancy_id: rank for rank, vacancy_id in enumerate(shortlist_ids)}
+            documents.sort(key=lambda document: ranks.get(document[0], len(ranks)))
+        order = resume['shortlist'] if resume else [document[0] for document in documents]
+        total = len(order)
+        if resume:
+            # Вакансии после последней оцененной, даже если саму ее успели снять с публикации
+            remaining = set(order[order.index(resume['last_id']) + 1:])
+            documents = [document for document in documents if document[0] in remaining]
+        timer.mark('load')
+
+        scored, pruning_stats = run_chunked_scoring(score_vacancy_chunk, query, chunked(documents),
+                                                    progress_callback=progress_callback, total=total,
+                                                    budget=budget, resume=resume)
+        if budget is not None and budget.stopped:
+            budget.resume_state['shortlist'] = order
+        # Вакансии, снятые с публикации между остановкой и продолжением поиска
+        scored = [(vacancy_id, details) for vacancy_id, details in scored if vacancy_id in vacancies_by_id]
+        timer.mark('scoring')
+
+        matches = SearchResult(
+            {
+                'vacancy': vacancies_by_id[vacancy_id],
+                'match_details': match_details,
+                'score': match_details['final_score']
+            }
+            for vacancy_id, match_details in AIMatcher.visible_matches(scored, ideal_profile.min_match_percentage)
+        )
+
+        matches.stats['pruning'] = pruning_stats
+        matches.stats['pool'] = {'size': len(scored), 'min_score': AIMatcher.pool_threshold(ideal_profile)}
+        matches.stats['prefilter'] = prefilter_stats
+
+        # Сохраняем только разницу с прошлым запуском
+        matches.stats['write'] = AIMatcher.save_matches(
+            AISearchMatch.objects.filter(ideal_vacancy_profile=ideal_profile),
+            'matched_vacancy_id',
+            {'ideal_vacancy_profile': ideal_profile},
+            dict(scored),
+            partial=budget is not None and budget.stopped
+        )
+        timer.mark('write')
+        matches.stats['timings'] = timer.timings
+        if budget is not None:
+            budget.mark_partial(matches)
+        summarize('vacancies', ideal_profile, matches)
+
+        return matches
+
+    @staticmethod
+    def match_vacancy_against_profiles(vacancy):
+        """Обратный поиск: одна опубликованная вакансия против всех активных профилей соискателей.
+
+        Теги профилей загружаются одним запросом, справочник читается один раз,
+        а смысловая схожесть вакансии со всеми профилями считается вместе.
+        """
+        _, _, vacancy_text = AIMatcher.vacancy_document(vacancy)
+
+        scored = {}
+        if vacancy.status == 'published':
+            profiles = list(IdealVacancyProfile.objects.filter(is_active=True).prefetch_related('selected_skill_tags'))
+            features = AIMatcher.get_vacancy_features(vacancy)
+            tags = skill_tags.current_tags()
+            tag_ids = AIMatcher.vacancy_tag_ids(vacancy, features, tags)
+            queries = [AIMatcher.prepare_vacancy_query(profile, tags) for profile in profiles]
+            similarities = AIMatcher.semantic_similarities_to_profiles(
+                vacancy_text, [query['ideal_text'] for query in queries]
+            )
+            for profile, query, similarity in zip(profiles, queries, similarities):
+                skills_match = None
+                if 'required_skills' in query:
+                    skills_match = query['required_skills'].match_batch([features.requirements], [tag_ids])[0]
+                match_details = AIMatcher.match_vacancy_with_query(vacancy_text, query, similarity, skills_match)
+                if match_details['final_score'] >= query['min_match_percentage']:
+                    scored[profile.pk] = match_details
+
+        return AIMatcher.save_matches(
+            AISearchMatch.objects.filter(matched_vacancy=vacancy, ideal_vacancy_profile__isnull=False),
+            'ideal_vacancy_profile_id',
+            {'matched_vacancy': vacancy},
+            scored
+        )
+
+    @staticmethod
+    def match_applicant_against_profiles(applicant):
+        """Обратный поиск: одно резюме против всех активных профилей HR.
+
+        Профили разбираются пакетом, как в find_candidates_for_profiles: навыки
+        резюме сравниваются с требованиями всех профилей одной матрицей, смысловая
+        схожесть - со всеми текстами профилей вместе.
+        """
+        tags = skill_tags.current_tags()
+        features = CandidateFeatures.from_features(applicant, AIMatcher.get_applicant_features(applicant), tags)
+        profiles = list(IdealCandidateProfile.objects.filter(is_active=True))
+
+        scored = {}
+        if applicant.is_published and not features.is_empty and profiles:
+            batch = AIMatcher.prepare_profiles_batch(profiles, tags)
+            best = batch['required_skills'].best_matches([features.requirements])
+            similarities = AIMatcher.semantic_similarities_to_profiles(
+                features.normalized_text, [query['ideal_text'] for _, query, _, _, _ in batch['profiles']]
             )
+            for (profile_id, query, requirements, start, end), similarity in zip(batch['profiles'], similarities):
+                fuzzy_total = best[0, start:end].sum() if start < end else 0
+                skills_match = requirements.percentages([fuzzy_total], [features.tag_ids])[0]
+                match_result = AIMatcher.match_features_with_query(features, query, skills_match, similarity)
+                if match_result['final_score'] >= query['min_match_percentage']:
+                    scored[profile_id] = match_result
+
+        return AIMatcher.save_matches(
+            AISearchMatch.objects.filter(matched_applicant=applicant, ideal_candidate_profile__isnull=False),
+            'ideal_candidate_profile_id',
+            {'matched_applicant': applicant},
+            scored
+        )
+
+    @staticmethod
+    def save_matches(existing_matches, key_field, fixed_fields, scored, partial=False):
+        """Записывает результаты поиска разницей с уже сохраненными совпадениями.
+
+        existing_matches - текущие совпадения (профиля или документа), key_field - поле,
+        по которому они сопоставляются с scored ({id: детали совпадения}),
+        fixed_fields - общие поля для новых строк. Все изменения - одной транзакцией:
+        bulk_create новых, bulk_update изменившихся и один DELETE выбывших.
+        Статус сохранившихся совпадений не трогаем, а совпадения, по которым уже
+        что-то сделано (например, отправлен офер), не удаляем. При partial (поиск
+        остановлен по бюджету и будет продолжен) документы вне scored могли быть
+        просто не оценены: совпадения только добавляются и обновляются, удаляет
+        выбывшие итоговый проход.
+        """
+        with transaction.atomic():
+            existing = {getattr(match, key_field): match for match in existing_matches.select_for_update()}
+            to_create = []
+            to_update = []
+            unchanged = 0
+
+            for key, match_details in scored.items():
+                match = existing.get(key)
+                components = {field: match_details.get(field) for field in MATCH_COMPONENTS}
+                if match is None:
+                    to_create.append(AISearchMatch(
+                        match_percentage=match_details['final_score'],
+                        match_details=match_details,
+                        **components,
+                        **{key_field: key},
+                        **fixed_fields
+                    ))
+                elif (match.match_percentage != match_details['final_score'] or match.match_details != match_details
+                      or any(getattr(match, field) != value for field, value in components.items())):
+                    match.match_percentage = match_details['final_score']
+                    match.match_details = match_details
+                    for field, value in components.items():
+                        setattr(match, field, value)
+                    to_update.append(match)
+                else:
+                    unchanged += 1
+
+            stale_ids = [] if partial else [
+                match.pk for key, match in existing.items()
+                if key not in scored and match.status == 'pending'
+            ]
+
+            AISearchMatch.objects.bulk_create(to_create)
+            AISearchMatch.objects.bulk_update(to_update, ['match_percentage', 'match_details', *MATCH_COMPONENTS])
+            if stale_ids:
+                AISearchMatch.objects.filter(pk__in=stale_ids).delete()
+
+        return {
+            'created': len(to_create),
+            'updated': len(to_update),
+            'unchanged': unchanged,
+            'deleted': len(stale_ids),
+        }
+
+
+class SearchResult(list):
+    """Список найденных совпадений со статистикой запуска в stats.
+
+    Если поиск остановлен по бюджету (stats['partial']), в resume - состояние
+    для его продолжения с места остановки.
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.stats = {}
+        self.resume = None
+
+
+class StageTimer:
+    """Длительность этапов поиска в секундах (для stats['timings'])"""
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.timings = {}
+
+    def mark(self, stage):
+        """Закрывает этап, начавшийся с предыдущей отметки"""
+        now = time.perf_counter()
+        self.timings.pop('total', None)
+        self.timings[stage] = round(now - self.last, 4)
+        self.timings['total'] = round(now - self.started, 4)
+        self.last = now
+
+
+class SearchBudget:
+    """Бюджет поиска: время с начала поиска и число оцененных документов (0 - без ограничения).
+
+    Исчерпание проверяется после каждой части корпуса, поэтому бюджет может быть
+    превышен не больше чем на одну часть. При остановке в resume_state остается
+    состояние для продолжения поиска.
+    """
+
+    def __init__(self, seconds=0, documents=0):
+        self.seconds = seconds
+        self.documents = documents
+        self.started = time.perf_counter()
+        self.resume_state = None
+
+    @classmethod
+    def for_role(cls, role):
+        """Бюджет роли пользователя из settings.AI_SEARCH_BUDGETS"""
+        return cls(**settings.AI_SEARCH_BUDGETS.get(role, {}))
+
+    def exhausted(self, documents):
+        if self.documents and documents >= self.documents:
+            return True
+        return bool(self.seconds) and time.perf_counter() - self.started >= self.seconds
+
+    @property
+    def stopped(self):
+        """Оценка остановлена по бюджету, часть документов не оценена"""
+        return self.resume_state is not None
+
+    def mark_partial(self, result):
+        """Помечает SearchResult, если поиск остановлен по бюджету"""
+        if not self.stopped:
+            return
+        result.stats['partial'] = True
+        result.stats['budget'] = {
+            'seconds': self.seconds,
+            'documents': self.documents,
+            'scored': self.resume_state['scored'],
+        }
+        result.resume = self.resume_state
+
+
+class CandidateFeatures(namedtuple('CandidateFeatures', [
+    'applicant_id', 'normalized_text', 'requirements', 'experience_level', 'is_empty', 'minhash', 'tag_ids',
+    'embedding'
+])):
+    """Признаки резюме без привязки к ORM - их можно передавать в другие процессы"""
+
+    @classmethod
+    def from_features(cls, applicant, features, tags=None):
+        """tags - результат skill_tags.current_tags(), чтобы не читать справочник на каждое резюме.
+
+        Теги, заново сопоставленные после изменения справочника, сохраняются в признаки резюме.
+        """
+        tags = tags or skill_tags.current_tags()
+        tag_ids = skill_tags.stored_tag_ids(features.requirements, features.normalized_text, features.skill_ids,
+                                            features.skill_tags_version, tags)
+        if features.skill_tags_version != tags[0]:
+            skill_tags.save_remapped_ids(ApplicantFeatures, 'applicant_id', {applicant.pk: tag_ids}, tags[0])
+        return cls(
+            applicant.pk,
+            features.normalized_text,
+            features.requirements,
+            features.experience_level,
+            features.is_empty,
+            bytes(features.minhash),
+            tag_ids,
+            bytes(features.embedding),
+        )
+
+
+class CandidateChunk:
+    """Часть корпуса резюме в компактном виде: параллельные массивы вместо объекта на резюме.
+
+    id, коды уровней опыта, маски ключевых терминов, MinHash-подписи и векторы -
+    массивами NumPy. Слова текста - CRC32 в одном упакованном массиве со смещениями,
+    требования и теги - так же, требования - номерами в словаре строк части
+    (сами строки интернированы и общие для всего процесса). Полный текст есть
+    только при точной переоценке. Элемент части по индексу собирается в
+    CandidateFeatures только при обращении.
+    """
+
+    __slots__ = ('ids', 'levels', 'level_codes', 'key_terms', 'minhashes', 'embeddings', 'word_offsets',
+                 'word_hashes', 'vocabulary', 'requirement_offsets', 'requirement_ids', 'tag_offsets', 'tag_ids',
+                 'texts')
+
+    def __init__(self, **columns):
+        for name in self.__slots__:
+            setattr(self, name, columns[name])
+
+    @classmethod
+    def from_rows(cls, rows, texts=None):
+        """rows - кортежи (id, требования, уровень опыта, MinHash, вектор, хэши слов, маска терминов, id тегов)"""
+        levels, level_index, level_codes = [], {}, array('B')
+        vocabulary, vocabulary_index = [], {}
+        requirement_offsets, requirement_ids = array('I', [0]), array('I')
+        tag_offsets, tag_ids = array('I', [0]), array('q')
+        word_offsets = array('q', [0])
+
+        for _, requirements, level, _, _, hashes, _, row_tag_ids in rows:
+            if level not in level_index:
+                level_index[level] = len(levels)
+                levels.append(level)
+            level_codes.append(level_index[level])
+
+            for requirement in requirements:
+                number = vocabulary_index.get(requirement)
+                if number is None:
+                    number = vocabulary_index[requirement] = len(vocabulary)
+                    vocabulary.append(sys.intern(requirement))
+                requirement_ids.append(number)
+            requirement_offsets.append(len(requirement_ids))
+
+            tag_ids.extend(sorted(row_tag_ids))
+            tag_offsets.append(len(tag_ids))
+            word_offsets.append(word_offsets[-1] + len(hashes) // 4)
+
+        # Держим только то, по чему считается смысловая схожесть: векторы или MinHash-подписи
+        exact = settings.AI_SEARCH_EXACT_RERANK
+        use_embeddings = not exact and settings.AI_SEARCH_SEMANTIC == 'embedding'
+        use_minhash = not exact and not use_embeddings
+        signatures = [bytes(row[3]) for row in rows] if use_minhash else []
+        # Векторы другой размерности (до смены AI_SEARCH_EMBEDDING_DIM) - нулевые до rebuild_search_index
+        vectors = embeddings.stack([bytes(row[4]) for row in rows]) if use_embeddings \
+            else np.zeros((len(rows), 0), dtype=np.float32)
+
+        return cls(
+            ids=np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+            levels=levels,
+            level_codes=level_codes,
+            key_terms=np.fromiter((row[6] for row in rows), dtype=np.int64, count=len(rows)),
+            minhashes=np.frombuffer(b''.join(signatures), dtype='<u4').reshape(
+                len(rows), minhash.NUM_PERMUTATIONS if use_minhash else 0),
+            embeddings=vectors,
+            word_offsets=np.asarray(word_offsets, dtype=np.int64),
+            word_hashes=np.frombuffer(b''.join(bytes(row[5]) for row in rows), dtype='<u4'),
+            vocabulary=vocabulary,
+            requirement_offsets=requirement_offsets,
+            requirement_ids=requirement_ids,
+            tag_offsets=tag_offsets,
+            tag_ids=tag_ids,
+            texts=texts,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        return CandidateFeatures(
+            int(self.ids[position]),
+            self.texts[position] if self.texts is not None else None,
+            self.requirements(position),
+            self.experience_level(position),
+            False,
+            self.minhashes[position].tobytes(),
+            self.tag_set(position),
+            self.embeddings[position].tobytes(),
+        )
+
+    def __iter__(self):
+        return (self[position] for position in range(len(self)))
+
+    def take(self, positions):
+        """Новая часть из строк positions (в их порядке)"""
+        rows = [
+            (int(self.ids[position]), self.requirements(position), self.experience_level(position),
+             self.minhashes[position].tobytes(), self.embeddings[position].tobytes(),
+             self.word_hashes[self.word_offsets[position]:self.word_offsets[position + 1]].tobytes(),
+             int(self.key_terms[position]), self.tag_set(position))
+            for position in positions
+        ]
+        texts = [self.texts[position] for position in positions] if self.texts is not None else None
+        return CandidateChunk.from_rows(rows, texts)
+
+    def experience_level(self, position):
+        return self.levels[self.level_codes[position]]
+
+    def requirements(self, position):
+        start, end = self.requirement_offsets[position], self.requirement_offsets[position + 1]
+        return [self.vocabulary[number] for number in self.requirement_ids[start:end]]
+
+    def requirement_lists(self):
+        return [self.requirements(position) for position in range(len(self))]
+
+    def tag_set(self, position):
+        return frozenset(self.tag_ids[self.tag_offsets[position]:self.tag_offsets[position + 1]])
+
+    def tag_sets(self):
+        return [self.tag_set(position) for position in range(len(self))]
+
+
+# Функции оценки частей корпуса объявлены на уровне модуля, чтобы их можно было
+# передавать в ProcessPoolExecutor. Каждая возвращает список (ключ сортировки, id, детали),
+# упорядоченный по убыванию ключа, и счетчики отсечения
+
+def score_candidate_chunk(query, chunk, skills_scores=None):
+    """Оценивает часть кандидатов (CandidateChunk), держа в куче только top_k лучших по смыслу.
+
+    Дорогой SequenceMatcher.ratio() запускается, только если верхняя оценка
+    итогового балла проходит порог, а смысловой - может вытеснить худшего в куче.
+    skills_scores - совпадение навыков, если оно уже посчитано пакетом.
+    """
+    semantic = SemanticScorer(query['ideal_text'])
+    top_k = query.get('top_k')
+    stats = Counter(candidates=len(chunk))
 
-        return matches
\ No newline at end of file
+    # Навыки всех кандидатов части сравниваем одной матричной операцией
+    if skills_scores is None:
+        skills_scores = AIMatcher.calculate_skills_match_batch(
+            chunk.requirement_lists(), query['required_skills'], chunk.tag_sets()
+        )
+
+    # Смысловая схожесть всей части - операциями над массивами части
+    prepared_rows = semantic.prepare_chunk(chunk)
+    experience_matches = [
+        AIMatcher.compare_experience_levels(level, query['experience_level']) for level in chunk.levels
+    ]
+
+    # Отладочные строки по кандидатам выключены по умолчанию (AI_SEARCH_DEBUG_SAMPLE_RATE)
+    sample = item_sampler()
+
+    # Куча (смысл, -позиция, id, детали): при равном смысле выбывает более поздний кандидат
+    heap = []
+    for position, (prepared, skills_match) in enumerate(zip(prepared_rows, skills_scores)):
+        experience_match = experience_matches[chunk.level_codes[position]]
+
+        pruned_by = None
+        for bound in semantic.upper_bounds(prepared):
+            if AIMatcher.combine_scores(bound, skills_match, experience_match,
+                                        query.get('weights')) < query['min_match_percentage']:
+                pruned_by = 'pruned_threshold'
+            elif top_k and len(heap) >= top_k and bound <= heap[0][0]:
+                pruned_by = 'pruned_top_k'
+            if pruned_by:
+                break
+
+        if pruned_by:
+            stats[pruned_by] += 1
+            continue
+
+        stats['exact_scored'] += 1
+        candidate = chunk[position]
+        match_result = AIMatcher.match_features_with_query(
+            candidate, query, skills_match, semantic.score(prepared)
+        )
+
+        if sample is not None and sample():
+            logger.debug('Кандидат %s: %s%%', candidate.applicant_id, match_result['final_score'])
+
+        if match_result['final_score'] < query['min_match_percentage']:
+            continue
+
+        # Сортируем по смыслу
+        entry = (match_result['semantic_similarity'], -position, candidate.applicant_id, match_result)
+        if not top_k or len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    scored = [(key, applicant_id, match_result) for key, _, applicant_id, match_result in sorted(heap, reverse=True)]
+    return scored, stats
+
+
+def score_profiles_chunk(batch, chunk):
+    """Оценивает часть кандидатов (CandidateChunk) сразу по всем профилям пакета.
+
+    Навыки из справочника сравниваются по id тегов, остальные - с требованиями
+    всех профилей одной матрицей n-грамм. Возвращает
+    {id профиля: (результат части, счетчики)} и пустые общие счетчики.
+    """
+    best = batch['required_skills'].best_matches(chunk.requirement_lists())
+    candidates_tag_ids = chunk.tag_sets()
+
+    results = {}
+    for profile_id, query, requirements, start, end in batch['profiles']:
+        if start == end:
+            fuzzy_totals = [0] * len(chunk)
+        else:
+            fuzzy_totals = best[:, start:end].sum(axis=1).tolist()
+        skills_scores = requirements.percentages(fuzzy_totals, candidates_tag_ids)
+        results[profile_id] = score_candidate_chunk(query, chunk, skills_scores)
+
+    return results, Counter()
+
+
+def score_vacancy_chunk(query, documents):
+    """Оценивает часть вакансий относительно текста идеального профиля"""
+    semantic = SemanticScorer(query['ideal_text'])
+    stats = Counter(candidates=len(documents))
+
+    # Навыки (если профиль их задает) сравниваем сразу для всей части
+    if 'required_skills' in query:
+        skills_scores = query['required_skills'].match_batch(
+            [document[4] for document in documents], [document[5] for document in documents]
+        )
+    else:
+        skills_scores = [None] * len(documents)
+
+    similarities = semantic.similarities(
+        [document[6] for document in documents], [document[2] for document in documents]
+    ) or repeat(None)
+
+    sample = item_sampler()
+
+    scored = []
+    for (vacancy_id, title, vacancy_text, signature, _, _, _), skills_match, similarity in zip(
+            documents, skills_scores, similarities):
+        prepared = semantic.prepare(vacancy_text, minhash.from_bytes(signature), similarity)
+
+        # Вакансии, которые не могут пройти порог даже по верхней оценке, не сравниваем точно
+        if any(AIMatcher.combine_vacancy_scores(bound, skills_match) < query['min_match_percentage']
+               for bound in semantic.upper_bounds(prepared)):
+            stats['pruned_threshold'] += 1
+            continue
+
+        stats['exact_scored'] += 1
+        match_details = AIMatcher.match_vacancy_with_query(vacancy_text, query, semantic.score(prepared),
+                                                           skills_match)
+        similarity = match_details['final_score']
+
+        if sample is not None and sample():
+            logger.debug("Вакансия %s '%s': %s%%", vacancy_id, title, similarity)
+
+        if similarity >= query['min_match_percentage']:
+            scored.append((similarity, vacancy_id, match_details))
+
+    return scored, stats
+
+
+def _parallel_context():
+    """Контекст fork: дочерние процессы наследуют настроенный Django и не импортируют его заново"""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def chunked(items, chunk_size=None):
+    """Делит список на части по chunk_size элементов"""
+    chunk_size = chunk_size or settings.AI_SEARCH_CHUNK_SIZE
+    return (items[start:start + chunk_size] for start in range(0, len(items), chunk_size))
+
+
+def map_chunks(chunk_scorer, query, chunks, progress_callback=None, total=None, budget=None, scored_offset=0):
+    """Оценивает части корпуса последовательно или в пуле процессов.
+
+    chunks - любой итерируемый набор частей, в том числе генератор, читающий корпус
+    из БД. Отдает пары (результат части, счетчики) в порядке частей;
+    progress_callback(оценено, всего) вызывается после каждой части, total - размер
+    корпуса, если он известен заранее (иначе None до конца оценки).
+
+    При исчерпании budget оценка останавливается после очередной части, в
+    budget.resume_state записываются id последнего оцененного документа
+    (первое поле элемента части) и число оцененных. scored_offset - сколько
+    документов было оценено до продолжения поиска.
+    """
+    workers = settings.AI_SEARCH_WORKERS
+    context = _parallel_context()
+    chunks = iter(chunks)
+
+    # Маленький корпус дешевле оценить в текущем процессе, чем раздавать по воркерам:
+    # части читаем, пока не наберется порог для пула или не кончится корпус
+    buffered = []
+    buffered_size = 0
+    if workers > 1 and context is not None:
+        for chunk in chunks:
+            buffered.append(chunk)
+            buffered_size += len(chunk)
+            if buffered_size >= settings.AI_SEARCH_PARALLEL_MIN_CORPUS:
+                break
+    parallel = buffered_size >= settings.AI_SEARCH_PARALLEL_MIN_CORPUS
+    pending = chain(buffered, chunks)
+
+    def scored_chunks():
+        if not parallel:
+            for chunk in pending:
+                yield len(chunk), chunk[-1][0], chunk_scorer(query, chunk)
+            return
+
+        # В пуле не больше двух частей на воркера: чтение корпуса не опережает оценку
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            in_flight = deque()
+            for chunk in pending:
+                in_flight.append((len(chunk), chunk[-1][0], executor.submit(chunk_scorer, query, chunk)))
+                if len(in_flight) >= workers * 2:
+                    size, last_id, future = in_flight.popleft()
+                    yield size, last_id, future.result()
+            while in_flight:
+                size, last_id, future = in_flight.popleft()
+                yield size, last_id, future.result()
+
+    scored_count = scored_offset
+    results = scored_chunks()
+    try:
+        for size, last_id, result in results:
+            scored_count += size
+            if progress_callback:
+                progress_callback(scored_count, total)
+            yield result
+
+            if budget is not None and budget.exhausted(scored_count - scored_offset):
+                budget.resume_state = {'last_id': last_id, 'scored': scored_count}
+                return
+    finally:
+        # Остановка по бюджету: части, уже отданные в пул, дожидаются завершения и отбрасываются
+        results.close()
+
+    # Размер корпуса стал известен (или часть шорт-листа отсеялась при чтении)
+    if progress_callback and total != scored_count:
+        progress_callback(scored_count, scored_count)
+
+
+def merge_chunk_results(chunk_results, stats, top_k=None):
+    """Сливает результаты частей: top_k лучших по ключу сортировки или все в исходном порядке"""
+    scored = chain.from_iterable(chunk_results)
+    if top_k is not None:
+        scored = heapq.nlargest(top_k, scored, key=itemgetter(0))
+
+    stats = Counter(stats)
+    pruned = stats['pruned_threshold'] + stats['pruned_top_k']
+    stats['pruned_ratio'] = round(pruned / stats['candidates'], 3) if stats['candidates'] else 0
+
+    return [(item_id, details) for _, item_id, details in scored], dict(stats)
+
+
+def run_chunked_scoring(chunk_scorer, query, chunks, top_k=None, progress_callback=None, total=None,
+                        budget=None, resume=None):
+    """Оценивает корпус частями последовательно или в пуле процессов и сливает результаты.
+
+    При top_k каждая часть держит только top_k лучших, и из них выбираются top_k
+    лучших по ключу сортировки; иначе возвращаются все прошедшие порог в исходном
+    порядке. Результат - список пар (id, детали совпадения) и сводные счетчики отсечения.
+    progress_callback(оценено, всего) вызывается после каждой части.
+
+    Если оценка остановлена по budget, budget.resume_state можно передать в resume,
+    чтобы оценить оставшиеся части (chunks продолжения начинаются после
+    resume_state['last_id']).
+    """
+    query = dict(query, top_k=top_k)
+
+    # Результаты частей, оцененных до остановки, при продолжении не пересчитываются
+    chunk_results = [resume['results']] if resume else []
+    stats = Counter(resume['stats']) if resume else Counter()
+    scored_offset = resume['scored'] if resume else 0
+    for chunk_result, chunk_stats in map_chunks(chunk_scorer, query, chunks, progress_callback, total,
+                                                budget, scored_offset):
+        chunk_results.append(chunk_result)
+        stats.update(chunk_stats)
+
+    if budget is not None and budget.resume_state is not None:
+        kept = list(chain.from_iterable(chunk_results))
+        if top_k is not None:
+            kept = heapq.nlargest(top_k, kept, key=itemgetter(0))
+        budget.resume_state.update(results=kept, stats=dict(stats))
+
+    return merge_chunk_results(chunk_results, stats, top_k)
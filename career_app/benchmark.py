@@ -0,0 +1,411 @@
+import contextlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .ai_matcher import AIMatcher, CandidateFeatures
+from .models import (Applicant, Category, Company, IdealCandidateProfile, IdealVacancyProfile, SkillTag,
+                     Vacancy)
+from .prefilter import apply_prefilter
+from . import embeddings, search_index, skill_tags, tokenizer
+
+# Префикс синтетических записей, чтобы их было легко отличить и удалить
+BENCHMARK_PREFIX = 'bench'
+
+# Навыки для тегов подкатегорий, если в базе их еще нет (по основным категориям add_categories.py)
+BENCHMARK_SKILLS = {
+    'IT и технологии': [
+        'python', 'django', 'java', 'spring', 'javascript', 'react', 'typescript', 'sql', 'postgresql',
+        'docker', 'kubernetes', 'linux', 'git', 'kotlin', 'swift', 'go', 'c++', 'c#', 'pandas', 'pytest',
+    ],
+    'Дизайн и творчество': [
+        'figma', 'photoshop', 'illustrator', 'blender', 'after effects', 'прототипирование',
+        'типографика', 'композиция', 'ui kit', 'анимация',
+    ],
+    'Маркетинг и продажи': [
+        'seo', 'smm', 'google analytics', 'яндекс директ', 'контекстная реклама', 'crm', 'email маркетинг',
+        'копирайтинг', 'переговоры', 'холодные звонки',
+    ],
+    'Менеджмент': [
+        'scrum', 'kanban', 'jira', 'agile', 'управление рисками', 'бюджетирование', 'подбор персонала',
+        'онбординг', 'confluence', 'roadmap',
+    ],
+    'Финансы и бухгалтерия': [
+        '1с', 'excel', 'мсфо', 'рсбу', 'налоговый учет', 'финансовая модель', 'аудит', 'power bi',
+    ],
+    'Образование и наука': [
+        'методика преподавания', 'научные публикации', 'статистика', 'латех', 'презентации', 'английский язык',
+    ],
+    'Медицина и здоровье': [
+        'фармакология', 'диагностика', 'первая помощь', 'медицинская документация', 'консультирование',
+    ],
+    'Транспорт и логистика': [
+        'складской учет', 'маршрутизация', 'таможенное оформление', 'водительские права', 'wms',
+    ],
+    'Производство и строительство': [
+        'autocad', 'revit', 'сметы', 'технадзор', 'чертежи', 'solidworks', 'охрана труда',
+    ],
+    'Сфера услуг': [
+        'сервис', 'кассовая дисциплина', 'бронирование', 'работа с гостями', 'стандарты качества',
+    ],
+    'Другие профессии': [
+        'договорная работа', 'перевод', 'редактура', 'фотосъемка', 'видеомонтаж', 'консалтинг',
+    ],
+}
+
+SENIORITY = [
+    ('junior', 'Младший', 'Junior'),
+    ('middle', '', 'Middle'),
+    ('senior', 'Старший', 'Senior'),
+    ('lead', 'Ведущий', 'Lead'),
+]
+
+RU_EXPERIENCE = [
+    'Начинающий специалист, учусь и участвовал в учебных проектах.',
+    'Работал в команде, разрабатывал и создавал решения для клиентов.',
+    'Старший специалист, руководил направлением и отвечал за архитектуру.',
+    'Тимлид, руководитель группы, управление командой и координация задач.',
+]
+EN_EXPERIENCE = [
+    'Junior specialist, studied and took part in student projects.',
+    'Worked in a product team, built and shipped features for customers.',
+    'Senior engineer, owned the architecture and mentored colleagues.',
+    'Team lead, managed a team and coordinated delivery across projects.',
+]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Глушит вывод скриптов подготовки данных (add_categories.py)"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def ensure_taxonomy():
+    """Категории из add_categories.py и теги навыков для их подкатегорий"""
+    from add_categories import create_categories
+
+    with quiet():
+        create_categories()
+
+    tags_by_category = {}
+    for main_category in Category.objects.filter(is_main=True):
+        skills = BENCHMARK_SKILLS.get(main_category.name, [])
+        for subcategory in main_category.get_subcategories():
+            tags = list(SkillTag.objects.filter(category=subcategory).values_list('name', flat=True))
+            if not tags and skills:
+                SkillTag.objects.bulk_create(SkillTag(name=name, category=subcategory) for name in skills)
+                tags = list(skills)
+            if tags:
+                tags_by_category[subcategory] = tags
+    return tags_by_category
+
+
+class CorpusGenerator:
+    """Синтетические резюме, вакансии и профили на русском и английском"""
+
+    def __init__(self, tags_by_category, seed=1, english_share=0.3):
+        self.random = random.Random(seed)
+        self.categories = list(tags_by_category.items())
+        self.english_share = english_share
+
+    def _pick(self):
+        category, tags = self.random.choice(self.categories)
+        skills = self.random.sample(tags, min(len(tags), self.random.randint(3, 6)))
+        level = self.random.randrange(len(SENIORITY))
+        english = self.random.random() < self.english_share
+        return category, skills, level, english
+
+    def _position(self, category, skills, level, english):
+        _, ru_title, en_title = SENIORITY[level]
+        if english:
+            return f"{en_title} {skills[0]} specialist"
+        return f"{ru_title} специалист: {category.name}".strip()
+
+    def applicant(self, number):
+        category, skills, level, english = self._pick()
+        code = SENIORITY[level][0]
+        if english:
+            resume_text = (f"{EN_EXPERIENCE[level]} {self.random.randint(1, 12)} years of experience in "
+                           f"{category.name}. Day-to-day stack: {', '.join(skills)}.")
+        else:
+            resume_text = (f"{RU_EXPERIENCE[level]} Опыт {self.random.randint(1, 12)} лет в направлении "
+                           f"«{category.name}». Навыки: {', '.join(skills)}.")
+
+        return Applicant(
+            first_name=f'{BENCHMARK_PREFIX}{number}',
+            last_name='Benchmark',
+            email=f'{BENCHMARK_PREFIX}{number}@example.com',
+            phone='0',
+            position=self._position(category, skills, level, english),
+            experience_level=code,
+            education_level='high',
+            skills=', '.join(skills),
+            resume_text=resume_text,
+        )
+
+    def vacancy(self, number, company, user):
+        category, skills, level, english = self._pick()
+        if english:
+            description = f"We are hiring for {category.name}. {EN_EXPERIENCE[level]}"
+            requirements = f"Requirements: {', '.join(skills)}."
+        else:
+            description = f"Ищем специалиста в направлении «{category.name}». {RU_EXPERIENCE[level]}"
+            requirements = f"Требования: {', '.join(skills)}."
+
+        return Vacancy(
+            title=self._position(category, skills, level, english),
+            company=company,
+            category=category,
+            description=description,
+            requirements=requirements,
+            contact_info=f'{BENCHMARK_PREFIX}{number}@example.com',
+            status='published',
+            created_by=user,
+        )
+
+    def candidate_profile(self, number, user):
+        category, skills, level, english = self._pick()
+        code = SENIORITY[level][0]
+        experience = EN_EXPERIENCE[level] if english else RU_EXPERIENCE[level]
+        return IdealCandidateProfile(
+            hr_user=user,
+            title=f'{BENCHMARK_PREFIX} {number}: {self._position(category, skills, level, english)}',
+            ideal_resume=f"{experience} {category.name}: {', '.join(skills)}.",
+            required_skills=', '.join(skills),
+            experience_level=code,
+            min_match_percentage=30,
+            max_candidates=20,
+        )
+
+    def vacancy_profile(self, number, applicant):
+        category, skills, level, english = self._pick()
+        return IdealVacancyProfile(
+            applicant=applicant,
+            title=f'{BENCHMARK_PREFIX} {number}: {self._position(category, skills, level, english)}',
+            main_category=category.parent,
+            subcategory=category,
+            desired_skills=', '.join(skills[:3]),
+            tech_stack=', '.join(skills[3:]),
+            experience_level=SENIORITY[level][0],
+            min_match_percentage=30,
+        )
+
+
+def build_corpus(size, tags_by_category, seed=1, profiles=3, batch_size=2000):
+    """Создает корпус заданного размера и готовит для него индексы; возвращает профили и замеры"""
+    generator = CorpusGenerator(tags_by_category, seed=seed)
+    timings = {}
+
+    started = time.perf_counter()
+    user, _ = User.objects.get_or_create(username=f'{BENCHMARK_PREFIX}_hr')
+    company, _ = Company.objects.get_or_create(
+        name=f'{BENCHMARK_PREFIX} company',
+        defaults={'description': 'Benchmark', 'contact_email': 'bench@example.com', 'contact_phone': '0'}
+    )
+    # bulk_create не вызывает сигналы, индексы строим отдельным этапом ниже
+    for start in range(0, size, batch_size):
+        numbers = range(start, min(start + batch_size, size))
+        Applicant.objects.bulk_create(generator.applicant(number) for number in numbers)
+        Vacancy.objects.bulk_create(generator.vacancy(number, company, user) for number in numbers)
+    timings['generate'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    search_index.rebuild_applicant_index(batch_size=batch_size)
+    timings['index'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for applicant in Applicant.objects.iterator(chunk_size=batch_size):
+        AIMatcher.refresh_applicant_features(applicant)
+    for vacancy in Vacancy.objects.iterator(chunk_size=batch_size):
+        AIMatcher.refresh_vacancy_features(vacancy)
+    timings['features'] = time.perf_counter() - started
+
+    profile_applicant = Applicant.objects.filter(first_name__startswith=BENCHMARK_PREFIX).first()
+    candidate_profiles = [generator.candidate_profile(number, user) for number in range(profiles)]
+    vacancy_profiles = [generator.vacancy_profile(number, profile_applicant) for number in range(profiles)]
+    for profile in candidate_profiles + vacancy_profiles:
+        profile.save()
+
+    return candidate_profiles, vacancy_profiles, {stage: round(value, 4) for stage, value in timings.items()}
+
+
+def measure_search(search, profiles, repeat=3):
+    """Время поиска по этапам (медиана по запускам), пропускная способность и пиковая память.
+
+    Пропускная способность - по документам, которые поиск действительно оценил
+    (stats['pruning']['candidates']): шорт-лист и префильтр отсекают часть корпуса до оценки.
+    """
+    runs = []
+    throughput = []
+    scored = []
+    for _ in range(repeat):
+        for profile in profiles:
+            # Каждый запуск - с холодным кэшем токенизатора
+            tokenizer.clear_cache()
+            result = search(profile)
+            timings = result.stats['timings']
+            runs.append(timings)
+            documents = result.stats['pruning'].get('candidates', 0)
+            scored.append(documents)
+            if timings.get('total'):
+                throughput.append(documents / timings['total'])
+
+    stages = {stage: round(statistics.median(run.get(stage, 0) for run in runs), 4) for stage in runs[0]}
+
+    # Пиковую память меряем отдельным запуском: tracemalloc сильно замедляет поиск
+    tokenizer.clear_cache()
+    tracemalloc.start()
+    try:
+        search(profiles[0])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = stages['total']
+    return {
+        'runs': len(runs),
+        'median_seconds': total,
+        'stages': stages,
+        'documents_scored': statistics.median(scored),
+        'documents_per_second': round(statistics.median(throughput), 1) if throughput else None,
+        'peak_traced_memory_mb': round(peak / 1024 / 1024, 2),
+    }
+
+
+def measure_prefilter(candidate_profiles, vacancy_profiles):
+    """Доля корпуса, которую отсекает префильтр (медиана по профилям), и примененные ограничения.
+
+    В поиске число строк и план запроса собираются только при отладочном логе,
+    поэтому здесь префильтр вызывается отдельно с explain.
+    """
+    result = {}
+    for name, profiles, queryset, prefix in (
+        ('candidates', candidate_profiles, AIMatcher.candidate_rows(), 'applicant__'),
+        ('vacancies', vacancy_profiles, Vacancy.objects.filter(status='published'), ''),
+    ):
+        runs = [apply_prefilter(queryset, profile, prefix=prefix, explain=True)[1] for profile in profiles]
+        result[name] = {
+            'rows_before': statistics.median(run['rows_before'] for run in runs),
+            'rows_after': statistics.median(run['rows_after'] for run in runs),
+            'reduction': statistics.median(run['reduction'] for run in runs),
+            'applied': sorted({constraint for run in runs for constraint in run['applied']}),
+            'relaxed': sorted({constraint for run in runs for constraint in run['relaxed']}),
+        }
+    return result
+
+
+def load_corpus_materialized():
+    """Корпус резюме так, как его загружал поиск до чтения частями: модели Applicant
+    вместе с признаками (select_related) и по CandidateFeatures на каждое непустое резюме.
+    """
+    tags = skill_tags.current_tags()
+    applicants_by_id = {}
+    candidates = []
+    for applicant in Applicant.objects.filter(is_published=True).select_related('features'):
+        features = AIMatcher.get_applicant_features(applicant)
+        if features.is_empty:
+            continue
+        applicants_by_id[applicant.pk] = applicant
+        candidates.append(CandidateFeatures.from_features(applicant, features, tags))
+    return applicants_by_id, candidates
+
+
+def measure_corpus_read(chunk_size=None):
+    """Пиковая память чтения всего корпуса резюме: потоком по частям и прежней загрузкой целиком.
+
+    При потоковом чтении пик не должен расти с размером корпуса.
+    """
+    result = {}
+    for mode in ('streamed', 'materialized'):
+        tokenizer.clear_cache()
+        tracemalloc.start()
+        try:
+            if mode == 'streamed':
+                documents = sum(len(chunk) for chunk in AIMatcher.iter_candidate_chunks(chunk_size=chunk_size))
+            else:
+                _, candidates = load_corpus_materialized()
+                documents = len(candidates)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result[f'{mode}_peak_mb'] = round(peak / 1024 / 1024, 2)
+    result['documents'] = documents
+    return result
+
+
+def measure_corpus_memory():
+    """Память корпуса резюме в пересчете на 10 тыс. документов.
+
+    Сравниваются модели Applicant целиком, признаки по одному CandidateFeatures
+    на резюме и компактные части CandidateChunk, в которых корпус оценивается.
+    """
+    def traced(load):
+        tokenizer.clear_cache()
+        tracemalloc.start()
+        try:
+            loaded = load()
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return size, loaded
+
+    models_size, applicants = traced(lambda: list(Applicant.objects.filter(is_published=True)))
+    rows_size, rows = traced(lambda: [candidate for chunk in AIMatcher.iter_candidate_chunks() for candidate in chunk])
+    chunks_size, _ = traced(lambda: list(AIMatcher.iter_candidate_chunks()))
+
+    def per_10k(size, documents):
+        return round(size / documents * 10000 / 1024 / 1024, 2) if documents else None
+
+    return {
+        'documents': len(rows),
+        'applicant_models_mb_per_10k': per_10k(models_size, len(applicants)),
+        'feature_rows_mb_per_10k': per_10k(rows_size, len(rows)),
+        'compact_chunks_mb_per_10k': per_10k(chunks_size, len(rows)),
+    }
+
+
+def measure_index_open(kind='applicant'):
+    """Холодный старт индекса векторов: построение из БД против открытия файла через mmap"""
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        index = embeddings.build_index(kind)
+        from_db = time.perf_counter() - started
+
+        documents = embeddings.write_index_file(kind, directory)
+
+        started = time.perf_counter()
+        mapped = embeddings.open_index_file(embeddings.index_path(kind, directory))
+        from_file = time.perf_counter() - started
+        # Первый запрос дочитывает страницы файла
+        mapped.nearest('python разработчик', 10)
+        first_query = time.perf_counter() - started
+        del mapped
+
+    return {
+        'documents': documents,
+        'build_from_db_seconds': round(from_db, 4),
+        'open_file_seconds': round(from_file, 4),
+        'open_and_first_query_seconds': round(first_query, 4),
+        'matrix_mb': round(index.matrix.nbytes / 1024 / 1024, 2),
+    }
+
+
+def max_rss_mb():
+    """Пиковый размер резидентной памяти процесса"""
+    if resource is None:
+        return None
+    # В Linux ru_maxrss - в килобайтах, в macOS - в байтах
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
@@ -0,0 +1,416 @@
+import json
+import math
+import os
+import tempfile
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+
+from django.conf import settings
+
+from . import result_cache, tokenizer
+from .models import Applicant, ApplicantFeatures, Vacancy, VacancyFeatures
+
+# Старший бит CRC32 задает знак вклада термина: коллизии хэшей в среднем гасят друг друга
+_SIGN_BIT = 1 << 31
+
+
+def dimension():
+    return settings.AI_SEARCH_EMBEDDING_DIM
+
+
+def vectorize(text):
+    """Вектор текста по хэшированию терминов (hashing trick).
+
+    Каждый термин попадает в одну из dimension() координат по CRC32, вклад -
+    1 + log(частота) со знаком. Вектор нормирован по L2, поэтому скалярное
+    произведение двух векторов - косинус между текстами.
+    """
+    size = dimension()
+    vector = np.zeros(size, dtype=np.float32)
+    counts = Counter(tokenizer.tokenize(text).term_tokens)
+    for term, count in counts.items():
+        term_hash = zlib.crc32(term.encode('utf-8'))
+        weight = 1 + math.log(count)
+        vector[term_hash % size] += weight if term_hash & _SIGN_BIT else -weight
+    return normalize(vector)
+
+
+def normalize(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def to_bytes(vector):
+    """Компактное хранение вектора: 4 байта (float32) на координату"""
+    return vector.astype('<f4').tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(bytes(data), dtype='<f4')
+
+
+def stack(blobs, texts=None):
+    """Сохраненные векторы одной непрерывной матрицей (документы x координаты).
+
+    Векторы другой размерности (сохраненные до смены AI_SEARCH_EMBEDDING_DIM)
+    пересчитываются по texts, а без текста - остаются нулевыми.
+    """
+    size = dimension()
+    row_bytes = size * 4
+    matrix = np.zeros((len(blobs), size), dtype=np.float32)
+    for row, blob in enumerate(blobs):
+        if len(blob) == row_bytes:
+            matrix[row] = np.frombuffer(bytes(blob), dtype='<f4')
+        elif texts is not None:
+            matrix[row] = vectorize(texts[row])
+    return matrix
+
+
+def cosine_similarities(matrix, vector):
+    """Косинусы всех строк нормированной матрицы с вектором - одно умножение матрицы на вектор"""
+    if not len(matrix):
+        return np.zeros(0, dtype=np.float32)
+    return matrix @ vector
+
+
+def inverse_frequencies(frequencies, documents):
+    """IDF координат по числу документов, в которых координата ненулевая"""
+    return (np.log((1 + documents) / (1 + frequencies)) + 1).astype(np.float32)
+
+
+def apply_idf(matrix, idf):
+    """Строки матрицы, взвешенные IDF и заново нормированные по L2"""
+    weighted = matrix * idf
+    norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return weighted / norms
+
+
+class EmbeddingIndex:
+    """Векторы всех документов одного типа для поиска ближайших соседей.
+
+    К сохраненным векторам (частоты терминов) применяется IDF по корпусу:
+    он зависит от всех документов сразу, поэтому не хранится в признаках.
+    matrix - уже взвешенные и нормированные строки (в памяти или numpy.memmap
+    файла индекса). Запрос - одно умножение матрицы на вектор и argpartition для top-K.
+    """
+
+    def __init__(self, ids, matrix, idf, version=None, path=None, read_at=None):
+        self.ids = ids
+        self.matrix = matrix
+        self.idf = idf
+        self.version = version
+        self.path = path
+        # Для индекса из файла - когда начали читать БД (time.time()): более поздние изменения в нем не учтены
+        self.read_at = read_at
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def from_vectors(cls, ids, matrix, version=None):
+        """Индекс в памяти по сохраненным векторам документов"""
+        idf = inverse_frequencies(np.count_nonzero(matrix, axis=0), len(ids))
+        weighted = np.ascontiguousarray(apply_idf(matrix, idf), dtype=np.float32)
+        return cls(np.asarray(ids, dtype=np.int64), weighted, idf, version)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query_vector(self, text):
+        return normalize(vectorize(text) * self.idf)
+
+    def nearest(self, text, k=None, min_similarity=0.0):
+        """Ближайшие документы к тексту: [(id, косинус)] по убыванию сходства"""
+        if not len(self.ids):
+            return []
+        return _top(self.ids, cosine_similarities(self.matrix, self.query_vector(text)), k, min_similarity)
+
+
+class MergedIndex:
+    """Индекс из файла с поправкой на документы, сохраненные после его построения.
+
+    Их строки в матрице файла не учитываются, а актуальные векторы (если документ
+    по-прежнему опубликован) читаются из БД и взвешиваются IDF файла. Удаленные
+    документы остаются в файле до перестройки - оценка все равно идет по признакам из БД.
+    """
+
+    def __init__(self, base, changed_ids, ids, matrix, version, read_at=None):
+        self.base = base
+        self.read_at = read_at
+        self.idf = base.idf
+        self.version = version
+        self.keep = ~np.isin(base.ids, np.asarray(changed_ids, dtype=np.int64))
+        self.extra = np.ascontiguousarray(apply_idf(matrix, base.idf), dtype=np.float32)
+        self.ids = np.concatenate([np.asarray(base.ids)[self.keep], np.asarray(ids, dtype=np.int64)])
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query_vector(self, text):
+        return self.base.query_vector(text)
+
+    def nearest(self, text, k=None, min_similarity=0.0):
+        """Ближайшие документы к тексту, как EmbeddingIndex.nearest"""
+        if not len(self.ids):
+            return []
+        vector = self.query_vector(text)
+        scores = np.concatenate([
+            cosine_similarities(self.base.matrix, vector)[self.keep], cosine_similarities(self.extra, vector)
+        ])
+        return _top(self.ids, scores, k, min_similarity)
+
+
+def _top(ids, scores, k, min_similarity):
+    """[(id, косинус)] k лучших по убыванию сходства"""
+    if k is not None and k < len(scores):
+        # Частичная сортировка: k лучших за линейное время, затем сортируем только их
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [(int(ids[i]), float(scores[i])) for i in top if scores[i] > min_similarity]
+
+
+def _rows(kind):
+    if kind == 'applicant':
+        return ApplicantFeatures.objects.filter(
+            applicant__is_published=True, is_empty=False
+        ).values_list('applicant_id', 'embedding')
+    return VacancyFeatures.objects.filter(vacancy__status='published').values_list('vacancy_id', 'embedding')
+
+
+def _document_model(kind):
+    return Applicant if kind == 'applicant' else Vacancy
+
+
+def _stored_vectors(kind, changed_after=None):
+    """(id, вектор в байтах) опубликованных документов с вектором текущей размерности.
+
+    changed_after - только документы, сохраненные позже этого момента.
+    """
+    row_bytes = dimension() * 4
+    rows = _rows(kind)
+    if changed_after is not None:
+        rows = rows.filter(**{f'{kind}__updated_at__gt': changed_after})
+    for object_id, blob in rows.iterator(chunk_size=settings.AI_SEARCH_CHUNK_SIZE):
+        # Документы без вектора нужной размерности появятся после пересчета признаков
+        if len(blob) == row_bytes:
+            yield object_id, bytes(blob)
+
+
+def build_index(kind, version=None):
+    """Читает векторы опубликованных документов kind ('applicant' или 'vacancy') из БД"""
+    read_at = time.time()
+    ids = []
+    blobs = []
+    for object_id, blob in _stored_vectors(kind):
+        ids.append(object_id)
+        blobs.append(blob)
+
+    matrix = np.frombuffer(b''.join(blobs), dtype='<f4').reshape(len(ids), dimension())
+    index = EmbeddingIndex.from_vectors(ids, matrix, version)
+    index.read_at = read_at
+    return index
+
+
+# Файл индекса: заголовок фиксированного размера (сигнатура и JSON), затем матрица
+# float32 (документы x координаты), id документов int64 и IDF float32.
+# Массивы открываются через numpy.memmap: страницы файла общие для всех процессов
+INDEX_MAGIC = b'HRIX'
+INDEX_FORMAT = 1
+INDEX_HEADER_SIZE = 4096
+
+
+def index_path(kind, directory=None):
+    """Путь к файлу индекса; формат и размерность - в имени, чтобы разные версии не путались"""
+    directory = directory or settings.AI_SEARCH_INDEX_DIR
+    return os.path.join(str(directory), f'embeddings-{kind}-v{INDEX_FORMAT}-d{dimension()}.idx')
+
+
+def write_index_file(kind, directory=None):
+    """Строит файл индекса векторов из БД и атомарно подменяет им прежний.
+
+    Векторы пишутся во временный файл потоком, не собираясь в памяти, затем
+    взвешиваются IDF по частям через memmap. Готовый файл переименовывается
+    поверх старого: процессы, уже открывшие старый файл, дочитывают его,
+    а новые открывают только целиком записанный. Возвращает число документов.
+    """
+    path = index_path(kind, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    size = dimension()
+    version = result_cache.corpus_version()
+    # Документы, сохраненные после этого момента, get_index дочитывает из БД
+    read_at = time.time()
+
+    handle = tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=f'.embeddings-{kind}-',
+                                         suffix='.tmp', delete=False)
+    try:
+        with handle:
+            handle.write(b'\0' * INDEX_HEADER_SIZE)
+            ids = []
+            frequencies = np.zeros(size, dtype=np.int64)
+            for object_id, blob in _stored_vectors(kind):
+                handle.write(blob)
+                ids.append(object_id)
+                frequencies += np.frombuffer(blob, dtype='<f4') != 0
+
+            idf = inverse_frequencies(frequencies, len(ids))
+            handle.write(np.asarray(ids, dtype='<i8').tobytes())
+            handle.write(idf.astype('<f4').tobytes())
+            handle.flush()
+
+            if ids:
+                matrix = np.memmap(handle.name, dtype='<f4', mode='r+', offset=INDEX_HEADER_SIZE,
+                                   shape=(len(ids), size))
+                chunk_size = settings.AI_SEARCH_CHUNK_SIZE
+                for start in range(0, len(ids), chunk_size):
+                    matrix[start:start + chunk_size] = apply_idf(matrix[start:start + chunk_size], idf)
+                matrix.flush()
+                del matrix
+
+            header = json.dumps({
+                'format': INDEX_FORMAT, 'kind': kind, 'dimension': size, 'documents': len(ids),
+                'corpus_version': version, 'read_at': read_at, 'built_at': time.time(),
+            }).encode('utf-8')
+            handle.seek(0)
+            handle.write(INDEX_MAGIC + len(header).to_bytes(4, 'little') + header)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(handle.name, path)
+    except BaseException:
+        if os.path.exists(handle.name):
+            os.remove(handle.name)
+        raise
+    return len(ids)
+
+
+def open_index_file(path):
+    """Открывает файл индекса через numpy.memmap; None, если файла нет или он другого формата"""
+    try:
+        with open(path, 'rb') as f:
+            prefix = f.read(8)
+            if len(prefix) < 8 or prefix[:4] != INDEX_MAGIC:
+                return None
+            header = json.loads(f.read(int.from_bytes(prefix[4:], 'little')))
+    except (OSError, ValueError):
+        return None
+    if header.get('format') != INDEX_FORMAT or header.get('dimension') != dimension():
+        return None
+
+    documents, size = header['documents'], header['dimension']
+    if not documents:
+        ids = np.zeros(0, dtype=np.int64)
+        matrix = np.zeros((0, size), dtype=np.float32)
+        idf = np.ones(size, dtype=np.float32)
+    else:
+        ids_offset = INDEX_HEADER_SIZE + documents * size * 4
+        matrix = np.memmap(path, dtype='<f4', mode='r', offset=INDEX_HEADER_SIZE, shape=(documents, size))
+        ids = np.memmap(path, dtype='<i8', mode='r', offset=ids_offset, shape=(documents,))
+        idf = np.array(np.memmap(path, dtype='<f4', mode='r', offset=ids_offset + documents * 8, shape=(size,)))
+    return EmbeddingIndex(ids, matrix, idf, header['corpus_version'], path,
+                          header.get('read_at', header.get('built_at')))
+
+
+# Индексы процесса по типу документа, открытые файлы индекса (с ключом stat файла)
+# и индексы файлов с поправкой на документы, сохраненные после их построения
+_indexes = {}
+_mapped = {}
+_merged = {}
+
+
+def _file_index(kind):
+    """Индекс из файла; файл переоткрывается, только если его подменили"""
+    path = index_path(kind)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        _mapped.pop(kind, None)
+        return None
+
+    key = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    cached = _mapped.get(kind)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    index = open_index_file(path)
+    _mapped[kind] = (key, index)
+    return index
+
+
+def _is_fresh(index, version):
+    """Индекс построен по текущей версии корпуса или недавно"""
+    return index.version == version or time.monotonic() - index.loaded_at < settings.AI_SEARCH_EMBEDDING_INDEX_TTL
+
+
+def _merged_index(kind, base, version):
+    """Индекс файла base, устаревшего относительно корпуса, с документами из БД, сохраненными позже"""
+    merged = _merged.get(kind)
+    if merged is not None and merged.base is base and _is_fresh(merged, version):
+        return merged
+
+    read_at = time.time()
+    changed_after = datetime.fromtimestamp(base.read_at or 0, tz=timezone.utc)
+    changed_ids = list(_document_model(kind).objects.filter(
+        updated_at__gt=changed_after
+    ).values_list('id', flat=True))
+    ids = []
+    blobs = []
+    for object_id, blob in _stored_vectors(kind, changed_after):
+        ids.append(object_id)
+        blobs.append(blob)
+
+    matrix = np.frombuffer(b''.join(blobs), dtype='<f4').reshape(len(ids), dimension())
+    merged = _merged[kind] = MergedIndex(base, changed_ids, ids, matrix, version, read_at)
+    return merged
+
+
+def get_index(kind):
+    """Индекс векторов процесса.
+
+    Если файл индекса построен (build_embedding_index), он открывается через
+    mmap без чтения всех векторов из БД. Если корпус изменился после построения
+    файла, документы, сохраненные позже, дочитываются из БД поверх файла
+    (MergedIndex) до следующей перестройки. Без файла индекс строится из БД
+    в памяти. Оба перечитываются при изменении корпуса, но не чаще раза в
+    AI_SEARCH_EMBEDDING_INDEX_TTL секунд: индекс только подсказывает порядок
+    и шорт-лист, а оценка идет по актуальным признакам из БД.
+    """
+    version = result_cache.corpus_version()
+    index = _file_index(kind)
+    if index is not None:
+        return index if index.version == version else _merged_index(kind, index, version)
+
+    index = _indexes.get(kind)
+    if index is not None and _is_fresh(index, version):
+        return index
+
+    index = _indexes[kind] = build_index(kind, version)
+    return index
+
+
+def changed_after_index(kind, index):
+    """id опубликованных документов kind, сохраненных после того, как index прочитал БД.
+
+    В индексе их еще нет (он перечитывается не чаще раза в AI_SEARCH_EMBEDDING_INDEX_TTL
+    секунд), поэтому шорт-лист по индексу добавляет их отдельно.
+    """
+    if index.read_at is None:
+        return []
+    documents = _document_model(kind).objects.filter(
+        updated_at__gt=datetime.fromtimestamp(index.read_at, tz=timezone.utc)
+    )
+    if kind == 'applicant':
+        documents = documents.filter(is_published=True)
+    else:
+        documents = documents.filter(status='published')
+    return list(documents.values_list('id', flat=True))
+
+
+def clear_indexes():
+    _indexes.clear()
+    _mapped.clear()
+    _merged.clear()
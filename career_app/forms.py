@@ -335,7 +335,8 @@ class IdealCandidateProfileForm(forms.ModelForm):
         model = IdealCandidateProfile
         fields = [
             'title', 'ideal_resume', 'required_skills', 'experience_level',
-            'education_requirements', 'min_match_percentage', 'max_candidates'
+            'education_requirements', 'min_match_percentage', 'max_candidates',
+            'semantic_weight', 'skills_weight', 'experience_weight'
         ]
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Например: Старший Python разработчик'}),
@@ -366,6 +367,10 @@ class IdealCandidateProfileForm(forms.ModelForm):
                 'max': '50',
                 'value': '10'
             }),
+            'semantic_weight': forms.NumberInput(attrs={'class': 'form-control', 'min': '0', 'max': '1', 'step': '0.05'}),
+            'skills_weight': forms.NumberInput(attrs={'class': 'form-control', 'min': '0', 'max': '1', 'step': '0.05'}),
+            'experience_weight': forms.NumberInput(attrs={'class': 'form-control', 'min': '0', 'max': '1',
+                                                          'step': '0.05'}),
         }
         labels = {
             'title': 'Название профиля',
@@ -374,8 +379,21 @@ class IdealCandidateProfileForm(forms.ModelForm):
             'education_requirements': 'Требования к образованию',
             'min_match_percentage': 'Минимальный процент совпадения (%)',
             'max_candidates': 'Количество кандидатов для поиска',
+            'semantic_weight': 'Вес смысловой схожести',
+            'skills_weight': 'Вес навыков',
+            'experience_weight': 'Вес опыта',
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        weights = [cleaned_data.get(field) for field in ('semantic_weight', 'skills_weight', 'experience_weight')]
+
+        # Итог остается процентом, только если веса в сумме дают единицу
+        if None not in weights and abs(sum(weights) - 1) > 0.001:
+            raise forms.ValidationError("Сумма весов смысла, навыков и опыта должна быть равна 1")
+
+        return cleaned_data
+
 
 class IdealVacancyProfileForm(forms.ModelForm):
     EXPERIENCE_LEVELS = [
@@ -0,0 +1,134 @@
+import json
+import platform
+import subprocess
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from career_app import benchmark
+from career_app.ai_matcher import AIMatcher
+
+
+class Command(BaseCommand):
+    help = ('Замеряет скорость ИИ-поиска на синтетическом корпусе резюме и вакансий. '
+            'Данные создаются в транзакции и откатываются (если не указан --keep)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help='Размеры корпуса (резюме и вакансий каждого)')
+        parser.add_argument('--profiles', type=int, default=3, help='Профилей каждого типа на размер')
+        parser.add_argument('--repeat', type=int, default=3, help='Повторов поиска по каждому профилю')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument('--compare', help='JSON прошлого запуска для сравнения')
+        parser.add_argument('--keep', action='store_true', help='Не откатывать созданные данные')
+
+    def handle(self, *args, **options):
+        report = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': self.git_commit(),
+            'python': platform.python_version(),
+            'settings': {
+                name: getattr(settings, name) for name in (
+                    'AI_SEARCH_WORKERS', 'AI_SEARCH_CHUNK_SIZE', 'AI_SEARCH_SHORTLIST_SIZE',
+                    'AI_SEARCH_EXACT_RERANK', 'AI_SEARCH_STEMMING', 'AI_SEARCH_SEMANTIC', 'AI_SEARCH_EMBEDDING_DIM',
+                )
+            },
+            'results': [],
+        }
+
+        for size in options['sizes']:
+            self.stdout.write(f'Корпус {size}...')
+            with transaction.atomic():
+                report['results'].append(self.run_size(size, options))
+                if not options['keep']:
+                    transaction.set_rollback(True)
+
+        report['max_rss_mb'] = benchmark.max_rss_mb()
+
+        output = options['output'] or f"matcher_benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Результаты сохранены в {output}'))
+
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+    def run_size(self, size, options):
+        tags_by_category = benchmark.ensure_taxonomy()
+        candidate_profiles, vacancy_profiles, build = benchmark.build_corpus(
+            size, tags_by_category, seed=options['seed'], profiles=options['profiles']
+        )
+        self.stdout.write(f'  подготовка: {build}')
+
+        result = {'size': size, 'build': build}
+        for name, search, profiles in (
+            ('candidates', AIMatcher.find_candidates_for_hr, candidate_profiles),
+            ('vacancies', AIMatcher.find_vacancies_for_applicant, vacancy_profiles),
+        ):
+            result[name] = benchmark.measure_search(search, profiles, repeat=options['repeat'])
+            self.stdout.write(
+                f"  {name}: {result[name]['median_seconds']} с, "
+                f"{result[name]['documents_per_second']} док/с (оценено {result[name]['documents_scored']}), "
+                f"пик {result[name]['peak_traced_memory_mb']} МБ, этапы {result[name]['stages']}"
+            )
+
+        result['prefilter'] = benchmark.measure_prefilter(candidate_profiles, vacancy_profiles)
+        for name, stats in result['prefilter'].items():
+            self.stdout.write(
+                f"  префильтр {name}: {stats['rows_before']} -> {stats['rows_after']} "
+                f"(-{stats['reduction']:.0%}), применены {stats['applied']}, сняты {stats['relaxed']}"
+            )
+
+        result['corpus_read'] = benchmark.measure_corpus_read()
+        self.stdout.write(
+            f"  чтение корпуса: потоком {result['corpus_read']['streamed_peak_mb']} МБ, "
+            f"целиком {result['corpus_read']['materialized_peak_mb']} МБ"
+        )
+
+        result['corpus_memory'] = benchmark.measure_corpus_memory()
+        self.stdout.write(
+            f"  память на 10 тыс. резюме: модели {result['corpus_memory']['applicant_models_mb_per_10k']} МБ, "
+            f"признаки по резюме {result['corpus_memory']['feature_rows_mb_per_10k']} МБ, "
+            f"компактные части {result['corpus_memory']['compact_chunks_mb_per_10k']} МБ"
+        )
+
+        result['index_open'] = benchmark.measure_index_open()
+        self.stdout.write(
+            f"  индекс векторов: из БД {result['index_open']['build_from_db_seconds']} с, "
+            f"из файла {result['index_open']['open_file_seconds']} с "
+            f"(с первым запросом {result['index_open']['open_and_first_query_seconds']} с)"
+        )
+        return result
+
+    def compare(self, report, path):
+        """Печатает отношение медианного времени к прошлому запуску"""
+        with open(path, encoding='utf-8') as f:
+            previous = {result['size']: result for result in json.load(f)['results']}
+
+        for result in report['results']:
+            old = previous.get(result['size'])
+            if not old:
+                continue
+            for name in ('candidates', 'vacancies'):
+                before, after = old[name]['median_seconds'], result[name]['median_seconds']
+                ratio = after / before if before else float('inf')
+                style = self.style.ERROR if ratio > 1.1 else self.style.SUCCESS
+                self.stdout.write(style(f"{result['size']} {name}: {before} -> {after} с (x{ratio:.2f})"))
+
+            if 'corpus_read' in old and 'corpus_read' in result:
+                before = old['corpus_read']['streamed_peak_mb']
+                after = result['corpus_read']['streamed_peak_mb']
+                self.stdout.write(f"{result['size']} чтение корпуса потоком: {before} -> {after} МБ")
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, text=True,
+                stderr=subprocess.DEVNULL
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from career_app.embeddings import index_path, write_index_file
+
+
+class Command(BaseCommand):
+    help = ('Строит файлы индекса векторов резюме и вакансий для ИИ-поиска. '
+            'Новый файл подменяет прежний переименованием, работающие процессы не прерываются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=['applicant', 'vacancy'], action='append',
+                            help='Тип документов (по умолчанию оба)')
+        parser.add_argument('--directory', help='Каталог индекса (по умолчанию AI_SEARCH_INDEX_DIR)')
+
+    def handle(self, *args, **options):
+        for kind in options['kind'] or ['applicant', 'vacancy']:
+            documents = write_index_file(kind, options['directory'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{index_path(kind, options["directory"])}: документов {documents}'
+            ))
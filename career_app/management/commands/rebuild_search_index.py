@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from career_app.ai_matcher import AIMatcher
+from career_app.embeddings import write_index_file
+from career_app.models import Applicant, Vacancy
+from career_app.search_index import rebuild_applicant_index
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает инвертированный индекс резюме, признаки и LSH-корзины резюме и вакансий '
+            'и файлы индекса векторов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Размер пакета при записи индекса')
+
+    def handle(self, *args, **options):
+        indexed = rebuild_applicant_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано резюме: {indexed}'))
+
+        for applicant in Applicant.objects.iterator(chunk_size=options['batch_size']):
+            AIMatcher.refresh_applicant_features(applicant)
+        for vacancy in Vacancy.objects.iterator(chunk_size=options['batch_size']):
+            AIMatcher.refresh_vacancy_features(vacancy)
+        self.stdout.write(self.style.SUCCESS('Признаки, MinHash-подписи и векторы текстов пересчитаны'))
+
+        for kind in ('applicant', 'vacancy'):
+            documents = write_index_file(kind)
+            self.stdout.write(self.style.SUCCESS(f'Файл индекса векторов ({kind}): документов {documents}'))
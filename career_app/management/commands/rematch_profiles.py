@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from career_app.rematch import PROFILE_KINDS, rematch_profiles
+
+MODE_LABELS = {
+    'full': 'полный поиск',
+    'incremental': 'измененные документы',
+    'unchanged': 'без изменений',
+    'skipped': 'пропущен, идет поиск',
+}
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает совпадения активных профилей по резюме и вакансиям, измененным после '
+            'прошлого пересчета (запускать по расписанию, например, раз в ночь из cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(PROFILE_KINDS), nargs='+', default=sorted(PROFILE_KINDS),
+                            help='Профили HR (candidate) и/или соискателей (vacancy)')
+        parser.add_argument('--profile', type=int, nargs='+', dest='profile_ids',
+                            help='Пересчитать только указанные профили')
+        parser.add_argument('--full', action='store_true',
+                            help='Искать заново целиком (например, после изменения справочника тегов)')
+
+    def handle(self, *args, **options):
+        def report(profile, stats):
+            line = f"{profile.title}: {MODE_LABELS[stats['mode']]}"
+            if stats.get('documents'):
+                line += f", документов {stats['documents']}"
+            if 'write' in stats:
+                write = stats['write']
+                line += f", новых {write['created']}, обновлено {write['updated']}, удалено {write['deleted']}"
+            self.stdout.write(line)
+
+        for kind in options['kind']:
+            results = rematch_profiles(kind, options['profile_ids'], options['full'], report)
+            self.stdout.write(self.style.SUCCESS(f'{kind}: профилей {len(results)}'))
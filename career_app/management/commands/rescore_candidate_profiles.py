@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from career_app.ai_matcher import AIMatcher
+from career_app.models import IdealCandidateProfile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает совпадения для всех активных профилей HR за один проход по корпусу резюме'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', type=int, nargs='+', dest='profile_ids',
+                            help='Пересчитать только указанные профили')
+
+    def handle(self, *args, **options):
+        profiles = IdealCandidateProfile.objects.filter(is_active=True)
+        if options['profile_ids']:
+            profiles = profiles.filter(pk__in=options['profile_ids'])
+        profiles = list(profiles)
+
+        if not profiles:
+            self.stdout.write('Нет активных профилей')
+            return
+
+        self.stdout.write(f'Профилей: {len(profiles)}')
+
+        def report_progress(scored, total):
+            # Корпус читается потоком, общее число резюме известно только в конце
+            self.stdout.write(f'Оценено резюме: {scored}' + (f' из {total}' if total else ''))
+
+        results = AIMatcher.find_candidates_for_profiles(profiles, progress_callback=report_progress)
+
+        for profile in profiles:
+            result = results.get(profile.pk)
+            if result is None:
+                self.stdout.write(f'{profile.title}: пропущен, идет поиск')
+                continue
+            write = result.stats['write']
+            self.stdout.write(
+                f"{profile.title}: найдено {len(result)}, новых {write['created']}, "
+                f"обновлено {write['updated']}, удалено {write['deleted']}"
+            )
+
+        if not results:
+            return
+        timings = next(iter(results.values())).stats['timings']
+        self.stdout.write(self.style.SUCCESS(f"Готово за {timings['total']} с ({timings})"))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from career_app.search_jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает очередь задач ИИ-поиска (запускать отдельным процессом)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза между проверками пустой очереди, сек')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать текущую очередь и завершиться')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Воркер ИИ-поиска запущен')
+
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Задача #{job.id}: {job.profile}')
+            try:
+                job = run_job(job)
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'Задача #{job.id} завершилась с ошибкой: {e}'))
+                continue
+
+            if job.status == 'queued':
+                self.stdout.write(f'Задача #{job.id} отложена: по профилю уже идет поиск')
+                continue
+
+            self.stdout.write(self.style.SUCCESS(
+                f'Задача #{job.id} выполнена: найдено {job.result_count} из {job.total}'
+            ))
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import ExpressionWrapper, F, Q
+from django.db.models.functions import Cast, Floor
 
 
 class VacancyManager(models.Manager):
@@ -17,4 +19,50 @@ class InternshipManager(models.Manager):
         return self.filter(status='published')
 
     def for_moderation(self):
-        return self.filter(status='moderation')
\ No newline at end of file
+        return self.filter(status='moderation')
+
+class AISearchMatchManager(models.Manager):
+    """Совпадения ИИ-поиска хранятся с запасом ниже порога профиля; видимые результаты отбираются запросом"""
+
+    def visible(self):
+        """Совпадения не ниже порога своего профиля и те, по которым уже что-то сделано"""
+        return self.filter(
+            Q(ideal_candidate_profile__isnull=False,
+              match_percentage__gte=F('ideal_candidate_profile__min_match_percentage'))
+            | Q(ideal_vacancy_profile__isnull=False,
+                match_percentage__gte=F('ideal_vacancy_profile__min_match_percentage'))
+            | ~Q(status='pending')
+        )
+
+    def candidate_results(self, profile):
+        """Результаты профиля HR: max_candidates лучших по итоговому проценту"""
+        return self.filter(ideal_candidate_profile=profile).filter(
+            Q(match_percentage__gte=profile.min_match_percentage) | ~Q(status='pending')
+        ).select_related('matched_applicant').order_by(
+            '-match_percentage', '-semantic_similarity', 'id'
+        )[:profile.max_candidates]
+
+    def vacancy_results(self, profile):
+        """Результаты профиля соискателя: вакансии не ниже порога по убыванию процента"""
+        return self.filter(ideal_vacancy_profile=profile).filter(
+            Q(match_percentage__gte=profile.min_match_percentage) | ~Q(status='pending')
+        ).select_related('matched_vacancy', 'matched_vacancy__company').order_by(
+            '-match_percentage', '-semantic_similarity', 'id'
+        )
+
+    def rescore_candidates(self, profile):
+        """Пересчитывает итоговый процент совпадений профиля HR по его весам одним UPDATE.
+
+        Формула та же, что в AIMatcher.combine_scores (дробная часть отбрасывается).
+        Совпадения, сохраненные до появления столбцов составляющих, не трогаются.
+        """
+        semantic_weight, skills_weight, experience_weight = profile.score_weights()
+        score = ExpressionWrapper(
+            F('semantic_similarity') * semantic_weight + F('skills_match') * skills_weight
+            + F('experience_match') * experience_weight,
+            output_field=models.FloatField()
+        )
+        return self.filter(
+            ideal_candidate_profile=profile, semantic_similarity__isnull=False,
+            skills_match__isnull=False, experience_match__isnull=False
+        ).update(match_percentage=Cast(Floor(score), models.IntegerField()))
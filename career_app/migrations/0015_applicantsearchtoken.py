@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0014_alter_idealvacancyprofile_desired_skills_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicantSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(db_index=True, max_length=100, verbose_name='Токен')),
+                ('applicant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='career_app.applicant', verbose_name='Соискатель')),
+            ],
+            options={
+                'verbose_name': 'Токен поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс резюме',
+                'unique_together': {('token', 'applicant')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0015_applicantsearchtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicantFeatures',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized_text', models.TextField(blank=True, verbose_name='Нормализованный текст резюме')),
+                ('requirements', models.JSONField(default=list, verbose_name='Извлеченные навыки')),
+                ('experience_level', models.CharField(blank=True, max_length=20, verbose_name='Определенный уровень опыта')),
+                ('is_empty', models.BooleanField(default=False, verbose_name='Пустое резюме')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('applicant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='features', to='career_app.applicant', verbose_name='Соискатель')),
+            ],
+            options={
+                'verbose_name': 'Признаки резюме',
+                'verbose_name_plural': 'Признаки резюме',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('career_app', '0016_applicantfeatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AISearchJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершена'), ('failed', 'Ошибка')], db_index=True, default='queued', max_length=20, verbose_name='Статус')),
+                ('scored', models.IntegerField(default=0, verbose_name='Оценено документов')),
+                ('total', models.IntegerField(default=0, verbose_name='Всего документов')),
+                ('result_count', models.IntegerField(default=0, verbose_name='Найдено совпадений')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('ideal_candidate_profile', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='career_app.idealcandidateprofile')),
+                ('ideal_vacancy_profile', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='career_app.idealvacancyprofile')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Инициатор')),
+            ],
+            options={
+                'verbose_name': 'Задача ИИ-поиска',
+                'verbose_name_plural': 'Задачи ИИ-поиска',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0017_aisearchjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aisearchjob',
+            name='stats',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Статистика запуска'),
+        ),
+    ]
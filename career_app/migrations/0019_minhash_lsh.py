@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0018_aisearchjob_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicantfeatures',
+            name='minhash',
+            field=models.BinaryField(blank=True, default=b'', verbose_name='MinHash-подпись'),
+        ),
+        migrations.CreateModel(
+            name='VacancyFeatures',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minhash', models.BinaryField(blank=True, default=b'', verbose_name='MinHash-подпись')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vacancy', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='features', to='career_app.vacancy', verbose_name='Вакансия')),
+            ],
+            options={
+                'verbose_name': 'Признаки вакансии',
+                'verbose_name_plural': 'Признаки вакансий',
+            },
+        ),
+        migrations.CreateModel(
+            name='LSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('applicant', 'Резюме'), ('vacancy', 'Вакансия')], max_length=10, verbose_name='Тип документа')),
+                ('band', models.SmallIntegerField(verbose_name='Полоса')),
+                ('bucket', models.BigIntegerField(verbose_name='Хэш полосы')),
+                ('object_id', models.BigIntegerField(verbose_name='ID документа')),
+            ],
+            options={
+                'verbose_name': 'LSH-корзина',
+                'verbose_name_plural': 'LSH-корзины',
+                'indexes': [models.Index(fields=['kind', 'band', 'bucket'], name='career_app__kind_c3f640_idx'), models.Index(fields=['kind', 'object_id'], name='career_app__kind_b9de43_idx')],
+            },
+        ),
+    ]
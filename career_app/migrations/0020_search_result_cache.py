@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0019_minhash_lsh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Название')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Значение')),
+            ],
+            options={
+                'verbose_name': 'Счетчик ИИ-поиска',
+                'verbose_name_plural': 'Счетчики ИИ-поиска',
+            },
+        ),
+        migrations.CreateModel(
+            name='AISearchResultCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64, verbose_name='Отпечаток профиля')),
+                ('corpus_version', models.BigIntegerField(verbose_name='Версия корпуса')),
+                ('result_count', models.IntegerField(default=0, verbose_name='Найдено')),
+                ('stats', models.JSONField(blank=True, default=dict, verbose_name='Статистика запуска')),
+                ('hits', models.IntegerField(default=0, verbose_name='Попаданий')),
+                ('stored_at', models.DateTimeField(verbose_name='Сохранено')),
+                ('last_used_at', models.DateTimeField(db_index=True, verbose_name='Последнее использование')),
+                ('ideal_candidate_profile', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='result_cache', to='career_app.idealcandidateprofile')),
+                ('ideal_vacancy_profile', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='result_cache', to='career_app.idealvacancyprofile')),
+            ],
+            options={
+                'verbose_name': 'Кэш результатов ИИ-поиска',
+                'verbose_name_plural': 'Кэш результатов ИИ-поиска',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0020_search_result_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicantfeatures',
+            name='skill_ids',
+            field=models.BinaryField(blank=True, default=b'', verbose_name='ID тегов навыков'),
+        ),
+        migrations.AddField(
+            model_name='applicantfeatures',
+            name='skill_tags_version',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Версия справочника тегов'),
+        ),
+        migrations.AddField(
+            model_name='vacancyfeatures',
+            name='requirements',
+            field=models.JSONField(blank=True, default=list, verbose_name='Извлеченные требования'),
+        ),
+        migrations.AddField(
+            model_name='vacancyfeatures',
+            name='skill_ids',
+            field=models.BinaryField(blank=True, default=b'', verbose_name='ID тегов навыков'),
+        ),
+        migrations.AddField(
+            model_name='vacancyfeatures',
+            name='skill_tags_version',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Версия справочника тегов'),
+        ),
+    ]
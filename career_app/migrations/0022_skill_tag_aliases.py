@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0021_skill_tag_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skilltag',
+            name='aliases',
+            field=models.TextField(blank=True, help_text='Другие написания навыка через запятую, например: js, ecmascript', verbose_name='Синонимы'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0022_skill_tag_aliases'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='applicant',
+            index=models.Index(fields=['is_published', 'experience_level'], name='career_app__is_publ_c02918_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='applicant',
+            index=models.Index(fields=['is_published', 'education_level'], name='career_app__is_publ_5d6e09_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacancy',
+            index=models.Index(fields=['status', 'category'], name='career_app__status_217f82_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacancy',
+            index=models.Index(fields=['status', 'employment_type'], name='career_app__status_ed6182_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0023_prefilter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicantfeatures',
+            name='embedding',
+            field=models.BinaryField(blank=True, default=b'', verbose_name='Вектор текста (float32)'),
+        ),
+        migrations.AddField(
+            model_name='vacancyfeatures',
+            name='embedding',
+            field=models.BinaryField(blank=True, default=b'', verbose_name='Вектор текста (float32)'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0024_feature_embeddings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicantfeatures',
+            name='key_terms',
+            field=models.PositiveIntegerField(default=0, verbose_name='Маска ключевых терминов'),
+        ),
+        migrations.AddField(
+            model_name='applicantfeatures',
+            name='word_hashes',
+            field=models.BinaryField(blank=True, default=b'', verbose_name='CRC32 слов текста'),
+        ),
+    ]
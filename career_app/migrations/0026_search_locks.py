@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0025_applicant_word_hashes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True, verbose_name='Ключ')),
+                ('owner', models.CharField(max_length=100, verbose_name='Владелец')),
+                ('acquired_at', models.DateTimeField(verbose_name='Захвачена')),
+                ('expires_at', models.DateTimeField(verbose_name='Истекает')),
+            ],
+            options={
+                'verbose_name': 'Блокировка ИИ-поиска',
+                'verbose_name_plural': 'Блокировки ИИ-поиска',
+            },
+        ),
+        migrations.AddField(
+            model_name='aisearchjob',
+            name='coalesced',
+            field=models.IntegerField(default=0, verbose_name='Присоединенных запросов'),
+        ),
+        migrations.AddField(
+            model_name='aisearchjob',
+            name='fingerprint',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Отпечаток профиля'),
+        ),
+    ]
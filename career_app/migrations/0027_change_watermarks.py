@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0026_search_locks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicant',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='idealcandidateprofile',
+            name='rematched_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Совпадения пересчитаны'),
+        ),
+        migrations.AddField(
+            model_name='idealcandidateprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='idealvacancyprofile',
+            name='rematched_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Совпадения пересчитаны'),
+        ),
+        migrations.AddField(
+            model_name='idealvacancyprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='vacancy',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:33
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_app', '0027_change_watermarks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aisearchmatch',
+            name='experience_match',
+            field=models.IntegerField(blank=True, db_index=True, null=True, verbose_name='Совпадение опыта'),
+        ),
+        migrations.AddField(
+            model_name='aisearchmatch',
+            name='semantic_similarity',
+            field=models.IntegerField(blank=True, db_index=True, null=True, verbose_name='Смысловая схожесть'),
+        ),
+        migrations.AddField(
+            model_name='aisearchmatch',
+            name='skills_match',
+            field=models.IntegerField(blank=True, db_index=True, null=True, verbose_name='Совпадение навыков'),
+        ),
+        migrations.AddField(
+            model_name='idealcandidateprofile',
+            name='experience_weight',
+            field=models.FloatField(default=0.1, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)], verbose_name='Вес опыта'),
+        ),
+        migrations.AddField(
+            model_name='idealcandidateprofile',
+            name='semantic_weight',
+            field=models.FloatField(default=0.6, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)], verbose_name='Вес смысловой схожести'),
+        ),
+        migrations.AddField(
+            model_name='idealcandidateprofile',
+            name='skills_weight',
+            field=models.FloatField(default=0.3, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)], verbose_name='Вес навыков'),
+        ),
+        migrations.AddIndex(
+            model_name='aisearchmatch',
+            index=models.Index(fields=['ideal_candidate_profile', 'match_percentage'], name='career_app__ideal_c_74cf06_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='aisearchmatch',
+            index=models.Index(fields=['ideal_vacancy_profile', 'match_percentage'], name='career_app__ideal_v_e2360e_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+import hashlib
+import zlib
+
+import numpy as np
+
+from . import tokenizer
+
+# 128 перестановок = 32 полосы по 4 строки: пара текстов попадает в общую корзину
+# хотя бы одной полосы с вероятностью ~50% при сходстве Жаккара около 0.42
+NUM_PERMUTATIONS = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+# Размер шингла в словах
+SHINGLE_SIZE = 2
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Фиксированное зерно: подписи, сохраненные в БД, должны считаться одинаково во всех процессах
+_generator = np.random.RandomState(1)
+_PERMUTATION_A = _generator.randint(1, (1 << 32) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERMUTATION_B = _generator.randint(0, (1 << 32) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Множество словесных шинглов текста"""
+    words = tokenizer.tokenize(text).word_tokens
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def signature(text):
+    """MinHash-подпись текста (NUM_PERMUTATIONS x uint32)"""
+    text_shingles = shingles(text)
+    if not text_shingles:
+        return np.full(NUM_PERMUTATIONS, _MAX_HASH, dtype=np.uint32)
+
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode('utf-8')) for shingle in text_shingles),
+        dtype=np.uint64, count=len(text_shingles)
+    )
+    # Переполнение uint64 при умножении детерминировано, поэтому подписи воспроизводимы
+    with np.errstate(over='ignore'):
+        permuted = (hashes[:, None] * _PERMUTATION_A[None, :] + _PERMUTATION_B[None, :]) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+
+def to_bytes(sig):
+    """Компактное хранение подписи: 4 байта на перестановку"""
+    return sig.astype('<u4').tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(bytes(data), dtype='<u4')
+
+
+def band_hashes(sig):
+    """Хэши полос подписи для LSH-корзин (знаковые 64-битные, влезают в BigIntegerField)"""
+    raw = sig.astype('<u4').tobytes()
+    band_size = ROWS_PER_BAND * 4
+    return [
+        int.from_bytes(hashlib.blake2b(raw[i:i + band_size], digest_size=8).digest(), 'little', signed=True)
+        for i in range(0, len(raw), band_size)
+    ]
+
+
+def jaccard_estimate(sig1, sig2):
+    """Оценка сходства Жаккара по доле совпавших минимумов"""
+    return float(np.count_nonzero(sig1 == sig2)) / NUM_PERMUTATIONS
+
+
+def jaccard_estimates(signatures, sig):
+    """Оценки сходства одной подписи со всеми строками матрицы подписей"""
+    return np.count_nonzero(signatures == sig[None, :], axis=1) / NUM_PERMUTATIONS
@@ -1,8 +1,11 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.urls import reverse
 
+from .managers import AISearchMatchManager
+
 
 # Добавим новую модель для запросов на подтверждение роли
 class RoleApprovalRequest(models.Model):
@@ -112,6 +115,8 @@ class Vacancy(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft', verbose_name="Статус")
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Создатель")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Отметка изменения: плановый пересчет совпадений оценивает только вакансии, измененные после прошлого запуска
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     published_at = models.DateTimeField(null=True, blank=True)
     auto_close_at = models.DateTimeField(null=True, blank=True, verbose_name="Автоматическое закрытие")
 
@@ -130,6 +135,11 @@ class Vacancy(models.Model):
         verbose_name = "Вакансия"
         verbose_name_plural = "Вакансии"
         ordering = ['-created_at']
+        # Предварительный отбор ИИ-поиска по категории и типу занятости
+        indexes = [
+            models.Index(fields=['status', 'category']),
+            models.Index(fields=['status', 'employment_type']),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.company.name}"
@@ -221,11 +231,18 @@ class Applicant(models.Model):
     resume_file = models.FileField(upload_to='resumes/', null=True, blank=True, verbose_name="Файл резюме")
     resume_text = models.TextField(blank=True, verbose_name="Текст резюме")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Отметка изменения: плановый пересчет совпадений оценивает только резюме, измененные после прошлого запуска
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     is_published = models.BooleanField(default=True, verbose_name="Резюме опубликовано")
 
     class Meta:
         verbose_name = "Соискатель"
         verbose_name_plural = "Соискатели"
+        # Предварительный отбор ИИ-поиска по уровню опыта и образования
+        indexes = [
+            models.Index(fields=['is_published', 'experience_level']),
+            models.Index(fields=['is_published', 'education_level']),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -529,8 +546,19 @@ class IdealCandidateProfile(models.Model):
     education_requirements = models.TextField(blank=True, verbose_name="Требования к образованию")
     min_match_percentage = models.IntegerField(default=70, verbose_name="Минимальный % совпадения")
     max_candidates = models.IntegerField(default=10, verbose_name="Максимум кандидатов")
+    # Веса составляющих итогового процента: меняются без повторного поиска (пересчет в БД)
+    semantic_weight = models.FloatField(default=0.6, validators=[MinValueValidator(0), MaxValueValidator(1)],
+                                        verbose_name="Вес смысловой схожести")
+    skills_weight = models.FloatField(default=0.3, validators=[MinValueValidator(0), MaxValueValidator(1)],
+                                      verbose_name="Вес навыков")
+    experience_weight = models.FloatField(default=0.1, validators=[MinValueValidator(0), MaxValueValidator(1)],
+                                          verbose_name="Вес опыта")
     is_active = models.BooleanField(default=True, verbose_name="Активен")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Начало последнего пересчета совпадений (rematch_profiles): документы, измененные позже, еще не оценены.
+    # Меняется через QuerySet.update(), чтобы не сдвигать updated_at
+    rematched_at = models.DateTimeField(null=True, blank=True, verbose_name="Совпадения пересчитаны")
 
     class Meta:
         verbose_name = "Идеальный профиль кандидата"
@@ -539,10 +567,16 @@ class IdealCandidateProfile(models.Model):
     def __str__(self):
         return f"{self.title} - {self.hr_user.username}"
 
+    def score_weights(self):
+        """Веса (смысл, навыки, опыт) для итогового процента совпадения"""
+        return self.semantic_weight, self.skills_weight, self.experience_weight
+
 class SkillTag(models.Model):
     """Теги навыков для категорий"""
     name = models.CharField(max_length=100, verbose_name="Название тега")
     category = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name="Категория")
+    aliases = models.TextField(blank=True, verbose_name="Синонимы",
+                               help_text="Другие написания навыка через запятую, например: js, ecmascript")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -553,6 +587,10 @@ class SkillTag(models.Model):
     def __str__(self):
         return f"{self.name} ({self.category.name})"
 
+    def alias_list(self):
+        """Синонимы тега списком"""
+        return [alias.strip() for alias in self.aliases.split(',') if alias.strip()]
+
 class EducationLevel(models.Model):
     """Уровни образования"""
     name = models.CharField(max_length=100, verbose_name="Название уровня")
@@ -601,6 +639,10 @@ class IdealVacancyProfile(models.Model):
     max_vacancies = models.IntegerField(default=10, verbose_name="Максимум вакансий")
     is_active = models.BooleanField(default=True, verbose_name="Активен")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Начало последнего пересчета совпадений (rematch_profiles): документы, измененные позже, еще не оценены.
+    # Меняется через QuerySet.update(), чтобы не сдвигать updated_at
+    rematched_at = models.DateTimeField(null=True, blank=True, verbose_name="Совпадения пересчитаны")
 
     class Meta:
         verbose_name = "Идеальный профиль вакансии"
@@ -628,6 +670,10 @@ class AISearchMatch(models.Model):
     matched_applicant = models.ForeignKey(Applicant, on_delete=models.CASCADE, null=True, blank=True)
     matched_vacancy = models.ForeignKey(Vacancy, on_delete=models.CASCADE, null=True, blank=True)
     match_percentage = models.IntegerField(verbose_name="Процент совпадения")
+    # Составляющие оценки (копия match_details): по ним процент пересчитывается и ранжируется в БД
+    semantic_similarity = models.IntegerField(null=True, blank=True, db_index=True, verbose_name="Смысловая схожесть")
+    skills_match = models.IntegerField(null=True, blank=True, db_index=True, verbose_name="Совпадение навыков")
+    experience_match = models.IntegerField(null=True, blank=True, db_index=True, verbose_name="Совпадение опыта")
     match_details = models.JSONField(verbose_name="Детали совпадения", default=dict)
     status = models.CharField(max_length=20, choices=[
         ('pending', 'Ожидает'),
@@ -637,9 +683,16 @@ class AISearchMatch(models.Model):
     ], default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = AISearchMatchManager()
+
     class Meta:
         verbose_name = "Результат ИИ-поиска"
         verbose_name_plural = "Результаты ИИ-поиска"
+        # Результаты профиля - по порогу и убыванию процента прямо из индекса
+        indexes = [
+            models.Index(fields=['ideal_candidate_profile', 'match_percentage']),
+            models.Index(fields=['ideal_vacancy_profile', 'match_percentage']),
+        ]
 
     def __str__(self):
         if self.ideal_candidate_profile:
@@ -648,8 +701,176 @@ class AISearchMatch(models.Model):
             return f"Вакансия {self.matched_vacancy} - {self.match_percentage}%"
 
 
-# Добавить в models.py после существующих моделей
+class ApplicantSearchToken(models.Model):
+    """Инвертированный индекс резюме: токен -> соискатель"""
+    token = models.CharField(max_length=100, db_index=True, verbose_name="Токен")
+    applicant = models.ForeignKey(Applicant, on_delete=models.CASCADE, related_name='search_tokens',
+                                  verbose_name="Соискатель")
+
+    class Meta:
+        verbose_name = "Токен поискового индекса"
+        verbose_name_plural = "Поисковый индекс резюме"
+        unique_together = ('token', 'applicant')
+
+    def __str__(self):
+        return f"{self.token} -> {self.applicant_id}"
+
+
+class ApplicantFeatures(models.Model):
+    """Предвычисленные признаки резюме для ИИ-поиска"""
+    applicant = models.OneToOneField(Applicant, on_delete=models.CASCADE, related_name='features',
+                                     verbose_name="Соискатель")
+    normalized_text = models.TextField(blank=True, verbose_name="Нормализованный текст резюме")
+    requirements = models.JSONField(default=list, verbose_name="Извлеченные навыки")
+    experience_level = models.CharField(max_length=20, blank=True, verbose_name="Определенный уровень опыта")
+    is_empty = models.BooleanField(default=False, verbose_name="Пустое резюме")
+    minhash = models.BinaryField(default=b'', blank=True, verbose_name="MinHash-подпись")
+    embedding = models.BinaryField(default=b'', blank=True, verbose_name="Вектор текста (float32)")
+    word_hashes = models.BinaryField(default=b'', blank=True, verbose_name="CRC32 слов текста")
+    key_terms = models.PositiveIntegerField(default=0, verbose_name="Маска ключевых терминов")
+    skill_ids = models.BinaryField(default=b'', blank=True, verbose_name="ID тегов навыков")
+    skill_tags_version = models.BigIntegerField(null=True, blank=True, verbose_name="Версия справочника тегов")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Признаки резюме"
+        verbose_name_plural = "Признаки резюме"
+
+    def __str__(self):
+        return f"Признаки: {self.applicant_id}"
+
+
+class AISearchJob(models.Model):
+    """Фоновая задача ИИ-поиска (очередь в БД, обрабатывается командой run_search_worker)"""
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Завершена'),
+        ('failed', 'Ошибка'),
+    ]
+
+    ideal_candidate_profile = models.ForeignKey(IdealCandidateProfile, on_delete=models.CASCADE, null=True, blank=True)
+    ideal_vacancy_profile = models.ForeignKey(IdealVacancyProfile, on_delete=models.CASCADE, null=True, blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                     verbose_name="Инициатор")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True,
+                              verbose_name="Статус")
+    scored = models.IntegerField(default=0, verbose_name="Оценено документов")
+    total = models.IntegerField(default=0, verbose_name="Всего документов")
+    result_count = models.IntegerField(default=0, verbose_name="Найдено совпадений")
+    stats = models.JSONField(default=dict, blank=True, verbose_name="Статистика запуска")
+    fingerprint = models.CharField(max_length=64, blank=True, verbose_name="Отпечаток профиля")
+    coalesced = models.IntegerField(default=0, verbose_name="Присоединенных запросов")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Задача ИИ-поиска"
+        verbose_name_plural = "Задачи ИИ-поиска"
+        ordering = ['created_at']
 
+    def __str__(self):
+        return f"Поиск #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def profile(self):
+        return self.ideal_candidate_profile or self.ideal_vacancy_profile
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+
+class VacancyFeatures(models.Model):
+    """Предвычисленные признаки вакансии для ИИ-поиска"""
+    vacancy = models.OneToOneField(Vacancy, on_delete=models.CASCADE, related_name='features',
+                                   verbose_name="Вакансия")
+    minhash = models.BinaryField(default=b'', blank=True, verbose_name="MinHash-подпись")
+    requirements = models.JSONField(default=list, blank=True, verbose_name="Извлеченные требования")
+    embedding = models.BinaryField(default=b'', blank=True, verbose_name="Вектор текста (float32)")
+    skill_ids = models.BinaryField(default=b'', blank=True, verbose_name="ID тегов навыков")
+    skill_tags_version = models.BigIntegerField(null=True, blank=True, verbose_name="Версия справочника тегов")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Признаки вакансии"
+        verbose_name_plural = "Признаки вакансий"
+
+    def __str__(self):
+        return f"Признаки: {self.vacancy_id}"
+
+
+class LSHBucket(models.Model):
+    """LSH-корзина: полоса MinHash-подписи документа"""
+    KIND_CHOICES = [
+        ('applicant', 'Резюме'),
+        ('vacancy', 'Вакансия'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="Тип документа")
+    band = models.SmallIntegerField(verbose_name="Полоса")
+    bucket = models.BigIntegerField(verbose_name="Хэш полосы")
+    object_id = models.BigIntegerField(verbose_name="ID документа")
+
+    class Meta:
+        verbose_name = "LSH-корзина"
+        verbose_name_plural = "LSH-корзины"
+        indexes = [
+            models.Index(fields=['kind', 'band', 'bucket']),
+            models.Index(fields=['kind', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} [{self.band}]"
 
 
+class SearchCounter(models.Model):
+    """Именованный счетчик ИИ-поиска (версия корпуса, попадания и промахи кэша)"""
+    name = models.CharField(max_length=50, unique=True, verbose_name="Название")
+    value = models.BigIntegerField(default=0, verbose_name="Значение")
 
+    class Meta:
+        verbose_name = "Счетчик ИИ-поиска"
+        verbose_name_plural = "Счетчики ИИ-поиска"
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class SearchLock(models.Model):
+    """Рекомендательная блокировка ИИ-поиска: строка с уникальным ключом существует, пока блокировка занята"""
+    key = models.CharField(max_length=100, unique=True, verbose_name="Ключ")
+    owner = models.CharField(max_length=100, verbose_name="Владелец")
+    acquired_at = models.DateTimeField(verbose_name="Захвачена")
+    expires_at = models.DateTimeField(verbose_name="Истекает")
+
+    class Meta:
+        verbose_name = "Блокировка ИИ-поиска"
+        verbose_name_plural = "Блокировки ИИ-поиска"
+
+    def __str__(self):
+        return f"{self.key} ({self.owner})"
+
+
+class AISearchResultCache(models.Model):
+    """Запись кэша ИИ-поиска: сохраненные совпадения профиля актуальны для версии корпуса"""
+    ideal_candidate_profile = models.OneToOneField(IdealCandidateProfile, on_delete=models.CASCADE,
+                                                   null=True, blank=True, related_name='result_cache')
+    ideal_vacancy_profile = models.OneToOneField(IdealVacancyProfile, on_delete=models.CASCADE,
+                                                 null=True, blank=True, related_name='result_cache')
+    fingerprint = models.CharField(max_length=64, verbose_name="Отпечаток профиля")
+    corpus_version = models.BigIntegerField(verbose_name="Версия корпуса")
+    result_count = models.IntegerField(default=0, verbose_name="Найдено")
+    stats = models.JSONField(default=dict, blank=True, verbose_name="Статистика запуска")
+    hits = models.IntegerField(default=0, verbose_name="Попаданий")
+    stored_at = models.DateTimeField(verbose_name="Сохранено")
+    last_used_at = models.DateTimeField(db_index=True, verbose_name="Последнее использование")
+
+    class Meta:
+        verbose_name = "Кэш результатов ИИ-поиска"
+        verbose_name_plural = "Кэш результатов ИИ-поиска"
+
+    def __str__(self):
+        return f"Кэш: {self.ideal_candidate_profile or self.ideal_vacancy_profile}"
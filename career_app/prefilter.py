@@ -0,0 +1,147 @@
+import re
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import IdealCandidateProfile
+
+# Уровни опыта по возрастанию: соседние уровни считаются допустимыми
+EXPERIENCE_ORDER = ['no_experience', 'intern', 'junior', 'middle', 'senior', 'lead']
+
+# Требование к образованию (свободный текст профиля) -> допустимые уровни образования
+EDUCATION_RULES = [
+    (re.compile(r'высш|бакалавр|магистр|специалитет|higher|degree'), ['high']),
+    (re.compile(r'средне[ег]о?\s+проф|колледж|техникум'), ['secondary_professional', 'high']),
+]
+
+REMOTE_RE = re.compile(r'удален|удалён|remote')
+
+
+def experience_condition(profile, prefix):
+    """Резюме с тем же или соседним уровнем опыта; резюме без уровня не отсекаются"""
+    level = (profile.experience_level or '').lower()
+    if level not in EXPERIENCE_ORDER:
+        return None
+    index = EXPERIENCE_ORDER.index(level)
+    allowed = EXPERIENCE_ORDER[max(0, index - 1):index + 2]
+    return Q(**{f'{prefix}experience_level__in': allowed + ['']})
+
+
+def education_condition(profile, prefix):
+    """Уровень образования из текстового требования профиля"""
+    requirements = (profile.education_requirements or '').lower()
+    for pattern, allowed in EDUCATION_RULES:
+        if pattern.search(requirements):
+            return Q(**{f'{prefix}education_level__in': allowed + ['']})
+    return None
+
+
+def category_condition(profile, prefix):
+    """Вакансии выбранной подкатегории или любой подкатегории выбранной основной категории"""
+    if profile.subcategory_id:
+        condition = Q(**{f'{prefix}category_id': profile.subcategory_id})
+    elif profile.main_category_id:
+        condition = (Q(**{f'{prefix}category_id': profile.main_category_id})
+                     | Q(**{f'{prefix}category__parent_id': profile.main_category_id}))
+    else:
+        return None
+    # Вакансии без категории не отсекаем: о них ничего не известно
+    return condition | Q(**{f'{prefix}category__isnull': True})
+
+
+def location_condition(profile, prefix):
+    """Вакансии в одном из предпочтительных мест, без указанного места или удаленные"""
+    places = [place.strip() for place in (profile.location_preferences or '').split(',') if place.strip()]
+    if not places:
+        return None
+
+    condition = Q(**{f'{prefix}location': ''}) | Q(**{f'{prefix}employment_type': 'remote'})
+    for place in places:
+        if not REMOTE_RE.search(place.lower()):
+            condition |= Q(**{f'{prefix}location__icontains': place})
+    return condition
+
+
+CANDIDATE_CONSTRAINTS = {
+    'experience_level': experience_condition,
+    'education_level': education_condition,
+}
+
+VACANCY_CONSTRAINTS = {
+    'category': category_condition,
+    'location': location_condition,
+}
+
+
+def _configured(names, available):
+    return [name for name in names if name in available]
+
+
+def apply_prefilter(queryset, profile, prefix='', scope=None, min_rows=None, explain=False):
+    """Сужает queryset по структурным полям профиля до оценки в Python.
+
+    Жесткие ограничения (AI_SEARCH_PREFILTER_HARD) применяются всегда, мягкие
+    (AI_SEARCH_PREFILTER_SOFT) - только если после них остается не меньше
+    min_rows строк, иначе ограничение снимается. scope - дополнительное условие
+    (например, шорт-лист), в пределах которого считаются строки. COUNT выполняется
+    только для проверки мягких ограничений; число строк до и после отбора и план
+    запроса собираются лишь с explain (бенчмарк, отладочный лог).
+    Возвращает (queryset, статистика для диагностики поиска).
+    """
+    available = CANDIDATE_CONSTRAINTS if isinstance(profile, IdealCandidateProfile) else VACANCY_CONSTRAINTS
+    if min_rows is None:
+        min_rows = settings.AI_SEARCH_PREFILTER_MIN_ROWS
+
+    def rows(candidate):
+        return (candidate.filter(scope) if scope is not None else candidate).count()
+
+    rows_before = rows(queryset) if explain else None
+    rows_after = rows_before
+    stats = {'applied': [], 'relaxed': [], 'skipped': []}
+
+    for name in _configured(settings.AI_SEARCH_PREFILTER_HARD, available):
+        condition = available[name](profile, prefix)
+        if condition is None:
+            stats['skipped'].append(name)
+            continue
+        queryset = queryset.filter(condition)
+        rows_after = None
+        stats['applied'].append(name)
+
+    for name in _configured(settings.AI_SEARCH_PREFILTER_SOFT, available):
+        if name in settings.AI_SEARCH_PREFILTER_HARD:
+            continue
+        condition = available[name](profile, prefix)
+        if condition is None:
+            stats['skipped'].append(name)
+            continue
+        narrowed = queryset.filter(condition)
+        # Мягкое ограничение не должно оставлять оценке слишком мало документов
+        narrowed_rows = rows(narrowed) if min_rows > 0 else None
+        if narrowed_rows is not None and narrowed_rows < min_rows:
+            stats['relaxed'].append(name)
+            continue
+        queryset, rows_after = narrowed, narrowed_rows
+        stats['applied'].append(name)
+
+    if explain:
+        if rows_after is None:
+            rows_after = rows(queryset)
+        stats.update({
+            'rows_before': rows_before,
+            'rows_after': rows_after,
+            'reduction': round(1 - rows_after / rows_before, 3) if rows_before else 0,
+            'query_plan': query_plan(queryset.filter(scope) if scope is not None else queryset),
+        })
+    else:
+        stats.update({'rows_before': None, 'rows_after': None, 'reduction': None, 'query_plan': ''})
+    return queryset, stats
+
+
+def query_plan(queryset):
+    """План запроса от СУБД (пустая строка, если EXPLAIN не поддерживается)"""
+    try:
+        return queryset.explain()
+    except Exception:
+        # План нужен только для диагностики и не должен ломать поиск
+        return ''
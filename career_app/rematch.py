@@ -0,0 +1,154 @@
+import uuid
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import result_cache, search_locks
+from .ai_matcher import AIMatcher, score_candidate_chunk, score_vacancy_chunk
+from .models import AISearchMatch, Applicant, IdealCandidateProfile, IdealVacancyProfile, Vacancy
+from .prefilter import apply_prefilter
+
+
+def needs_full_search(profile, full=False):
+    """Профиль ищется заново целиком: еще не пересчитывался или изменен после пересчета"""
+    return full or profile.rematched_at is None or profile.updated_at > profile.rematched_at
+
+
+def changed_since(model, since):
+    """{id: updated_at} строк model, измененных после since"""
+    return dict(model.objects.filter(updated_at__gt=since).values_list('id', 'updated_at'))
+
+
+def rematch_candidate_pairs(profile, applicant_ids):
+    """Пересчитывает совпадения профиля HR только с резюме applicant_ids.
+
+    Структурные ограничения профиля проверяются только на этих резюме, мягкие -
+    без снятия по AI_SEARCH_PREFILTER_MIN_ROWS (на нескольких измененных
+    документах порог снимал бы их всегда). Резюме, снятые с публикации или больше не проходящие порог, теряют
+    совпадение (если по нему еще ничего не сделано); сверх запаса профиля
+    (AIMatcher.pool_size) остаются лучшие по смыслу, как при полном поиске.
+
+    Место выбывшего совпадения в результатах занимает следующее из запаса, а сам
+    запас пополняется неизмененными резюме только при следующем полном поиске
+    (rematch_profiles --full или изменение профиля).
+    """
+    rows, _ = apply_prefilter(AIMatcher.candidate_rows(), profile, prefix='applicant__',
+                              scope=Q(applicant_id__in=applicant_ids), min_rows=0, explain=False)
+    query = AIMatcher.prepare_candidate_query(profile)
+    query['min_match_percentage'] = AIMatcher.pool_threshold(profile)
+
+    scored = {}
+    for chunk in AIMatcher.iter_candidate_chunks(applicant_ids, rows=rows):
+        chunk_scored, _ = score_candidate_chunk(query, chunk)
+        scored.update((applicant_id, details) for _, applicant_id, details in chunk_scored)
+
+    write = AIMatcher.save_matches(
+        AISearchMatch.objects.filter(ideal_candidate_profile=profile, matched_applicant_id__in=applicant_ids),
+        'matched_applicant_id',
+        {'ideal_candidate_profile': profile},
+        scored
+    )
+    write['deleted'] += trim_candidate_matches(profile)
+    return write
+
+
+def trim_candidate_matches(profile):
+    """Удаляет ожидающие совпадения профиля за пределами запаса лучших по смыслу"""
+    ranked = AISearchMatch.objects.filter(ideal_candidate_profile=profile).order_by(
+        F('semantic_similarity').desc(nulls_last=True), 'id'
+    ).values_list('id', 'status')
+    overflow = [match_id for match_id, status in ranked[AIMatcher.pool_size(profile):] if status == 'pending']
+    if overflow:
+        AISearchMatch.objects.filter(id__in=overflow).delete()
+    return len(overflow)
+
+
+def rematch_vacancy_pairs(profile, vacancy_ids):
+    """Пересчитывает совпадения профиля соискателя только с вакансиями vacancy_ids.
+
+    Ограничения профиля - как в rematch_candidate_pairs.
+    """
+    vacancies, _ = apply_prefilter(
+        Vacancy.objects.filter(status='published', pk__in=vacancy_ids).select_related('features'), profile,
+        min_rows=0, explain=False
+    )
+    _, documents = AIMatcher.vacancy_documents(vacancies)
+    query = AIMatcher.prepare_vacancy_query(profile)
+    scored, _ = score_vacancy_chunk(query, documents)
+
+    return AIMatcher.save_matches(
+        AISearchMatch.objects.filter(ideal_vacancy_profile=profile, matched_vacancy_id__in=vacancy_ids),
+        'matched_vacancy_id',
+        {'ideal_vacancy_profile': profile},
+        {vacancy_id: details for _, vacancy_id, details in scored}
+    )
+
+
+# Тип профиля: (модель профиля, модель документов, полный поиск, пересчет пар)
+PROFILE_KINDS = {
+    'candidate': (IdealCandidateProfile, Applicant, AIMatcher.find_candidates_for_hr, rematch_candidate_pairs),
+    'vacancy': (IdealVacancyProfile, Vacancy, AIMatcher.find_vacancies_for_applicant, rematch_vacancy_pairs),
+}
+
+
+def rematch_profiles(kind, profile_ids=None, full=False, report=None):
+    """Пересчитывает совпадения активных профилей kind ('candidate' или 'vacancy') по изменениям корпуса.
+
+    Профилю оцениваются только документы, измененные после его прошлого пересчета
+    (updated_at документа против rematched_at профиля), остальные сохраненные
+    совпадения остаются как есть. Новый, измененный после пересчета профиль или
+    все профили при full ищутся заново целиком.
+
+    Измененные документы читаются одним запросом с самого раннего rematched_at,
+    каждому профилю достаются измененные после его собственного. Профили, по
+    которым сейчас идет поиск, пропускаются и пересчитываются в следующий раз.
+    report(profile, статистика) вызывается после каждого профиля.
+    Возвращает {id профиля: статистика}.
+    """
+    profile_model, document_model, search, rematch_pairs = PROFILE_KINDS[kind]
+    profiles = profile_model.objects.filter(is_active=True)
+    if profile_ids:
+        profiles = profiles.filter(pk__in=profile_ids)
+    profiles = list(profiles)
+
+    # Отметку ставим до чтения изменений: сохраненное во время пересчета попадет в следующий
+    started = timezone.now()
+    watermarks = [profile.rematched_at for profile in profiles if not needs_full_search(profile, full)]
+    changed = changed_since(document_model, min(watermarks)) if watermarks else {}
+
+    owner = f'rematch:{uuid.uuid4().hex}'
+    results = {}
+    for profile in profiles:
+        full_search = needs_full_search(profile, full)
+        document_ids = [] if full_search else sorted(
+            pk for pk, updated_at in changed.items() if updated_at > profile.rematched_at
+        )
+        key = search_locks.profile_key(profile)
+        if not full_search and not document_ids:
+            stats = {'mode': 'unchanged', 'documents': 0}
+        elif not search_locks.acquire(key, owner):
+            stats = {'mode': 'skipped'}
+        else:
+            try:
+                if full_search:
+                    stats = _full_search(profile, search)
+                else:
+                    stats = {'mode': 'incremental', 'documents': len(document_ids),
+                             'write': rematch_pairs(profile, document_ids)}
+            finally:
+                search_locks.release(key, owner)
+
+        if stats['mode'] != 'skipped':
+            profile_model.objects.filter(pk=profile.pk).update(rematched_at=started)
+        results[profile.pk] = stats
+        if report:
+            report(profile, stats)
+    return results
+
+
+def _full_search(profile, search):
+    version = result_cache.corpus_version()
+    result = search(profile)
+    result_cache.store(profile, version, result)
+    return {'mode': 'full', 'documents': result.stats['pruning'].get('candidates', 0),
+            'write': result.stats['write']}
@@ -0,0 +1,129 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AISearchResultCache, IdealCandidateProfile, SearchCounter
+
+CORPUS_VERSION = 'corpus_version'
+CACHE_HITS = 'result_cache_hits'
+CACHE_MISSES = 'result_cache_misses'
+
+
+def counter_value(name):
+    """Значение именованного счетчика (0, если его еще нет)"""
+    return SearchCounter.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+
+def increment_counter(name):
+    """Атомарно увеличивает именованный счетчик на 1"""
+    # Атомарный инкремент в БД: веб-процессы и воркеры видят одно значение
+    if not SearchCounter.objects.filter(name=name).update(value=F('value') + 1):
+        SearchCounter.objects.get_or_create(name=name)
+        SearchCounter.objects.filter(name=name).update(value=F('value') + 1)
+
+
+def corpus_version():
+    """Текущая версия корпуса резюме и вакансий"""
+    return counter_value(CORPUS_VERSION)
+
+
+def bump_corpus_version():
+    """Повышает версию корпуса: все записи кэша становятся неактуальными"""
+    increment_counter(CORPUS_VERSION)
+
+
+def profile_fingerprint(profile):
+    """Хэш полей профиля и настроек, от которых зависит результат поиска.
+
+    Порог и веса профиля не входят: они применяются к сохраненным совпадениям
+    запросом к БД (в пределах запаса, см. covers_threshold).
+    """
+    if isinstance(profile, IdealCandidateProfile):
+        fields = [profile.ideal_resume, profile.required_skills, profile.experience_level, profile.max_candidates]
+    else:
+        fields = [profile.title, profile.desired_skills, profile.tech_stack,
+                  sorted(profile.selected_skill_tags.values_list('id', flat=True))]
+    fields.extend([settings.AI_SEARCH_EXACT_RERANK, settings.AI_SEARCH_SEMANTIC])
+    return hashlib.sha256(json.dumps(fields, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _profile_filter(profile):
+    if isinstance(profile, IdealCandidateProfile):
+        return {'ideal_candidate_profile': profile}
+    return {'ideal_vacancy_profile': profile}
+
+
+def fresh_entry(profile):
+    """Запись кэша, если сохраненные совпадения профиля актуальны, иначе None (без учета в счетчиках)"""
+    entry = AISearchResultCache.objects.filter(**_profile_filter(profile)).first()
+    fresh = (
+        entry is not None
+        and entry.fingerprint == profile_fingerprint(profile)
+        and covers_threshold(entry, profile)
+        and entry.corpus_version == corpus_version()
+        and entry.stored_at >= timezone.now() - timedelta(seconds=settings.AI_SEARCH_RESULT_CACHE_TTL)
+    )
+    return entry if fresh else None
+
+
+def covers_threshold(entry, profile):
+    """Сохраненный запас совпадений покрывает текущий порог профиля"""
+    pool = entry.stats.get('pool', {})
+    return 'min_score' in pool and pool['min_score'] <= profile.min_match_percentage
+
+
+def lookup(profile):
+    """Запись кэша, если сохраненные совпадения профиля актуальны, иначе None"""
+    entry = fresh_entry(profile)
+    if entry is None:
+        increment_counter(CACHE_MISSES)
+        return None
+
+    increment_counter(CACHE_HITS)
+    AISearchResultCache.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    return entry
+
+
+def store(profile, version, result):
+    """Запоминает результат поиска, посчитанный на версии корпуса version"""
+    now = timezone.now()
+    AISearchResultCache.objects.update_or_create(
+        **_profile_filter(profile),
+        defaults={
+            'fingerprint': profile_fingerprint(profile),
+            'corpus_version': version,
+            'result_count': len(result),
+            'stats': result.stats,
+            'stored_at': now,
+            'last_used_at': now,
+        }
+    )
+    evict()
+
+
+def evict():
+    """Удаляет просроченные записи и самые давно не использованные сверх лимита"""
+    expired_before = timezone.now() - timedelta(seconds=settings.AI_SEARCH_RESULT_CACHE_TTL)
+    AISearchResultCache.objects.filter(stored_at__lt=expired_before).delete()
+
+    overflow = list(AISearchResultCache.objects.order_by('-last_used_at').values_list(
+        'id', flat=True
+    )[settings.AI_SEARCH_RESULT_CACHE_SIZE:])
+    if overflow:
+        AISearchResultCache.objects.filter(id__in=overflow).delete()
+
+
+def stats():
+    """Счетчики попаданий и промахов кэша"""
+    hits, misses = counter_value(CACHE_HITS), counter_value(CACHE_MISSES)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else 0,
+        'entries': AISearchResultCache.objects.count(),
+        'corpus_version': corpus_version(),
+    }
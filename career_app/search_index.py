@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from . import minhash, tokenizer
+from .models import Applicant, ApplicantSearchToken, LSHBucket, Vacancy
+
+
+def tokenize_for_index(text):
+    """Возвращает множество токенов текста для инвертированного индекса"""
+    if not text:
+        return set()
+
+    max_length = ApplicantSearchToken._meta.get_field('token').max_length
+    return {token for token in tokenizer.tokenize(text).terms if len(token) <= max_length}
+
+
+def index_applicant(applicant):
+    """Перестраивает записи индекса для одного соискателя"""
+    tokens = tokenize_for_index(applicant.get_full_resume_text())
+
+    with transaction.atomic():
+        ApplicantSearchToken.objects.filter(applicant=applicant).delete()
+        ApplicantSearchToken.objects.bulk_create(
+            [ApplicantSearchToken(token=token, applicant=applicant) for token in tokens]
+        )
+
+
+def rebuild_applicant_index(batch_size=1000):
+    """Полностью перестраивает индекс по всем соискателям"""
+    indexed = 0
+
+    with transaction.atomic():
+        ApplicantSearchToken.objects.all().delete()
+        postings = []
+
+        for applicant in Applicant.objects.all().iterator(chunk_size=batch_size):
+            postings.extend(
+                ApplicantSearchToken(token=token, applicant=applicant)
+                for token in tokenize_for_index(applicant.get_full_resume_text())
+            )
+            indexed += 1
+
+            if len(postings) >= batch_size:
+                ApplicantSearchToken.objects.bulk_create(postings, batch_size=batch_size)
+                postings = []
+
+        ApplicantSearchToken.objects.bulk_create(postings, batch_size=batch_size)
+
+    return indexed
+
+
+def index_is_empty():
+    return not ApplicantSearchToken.objects.exists()
+
+
+def shortlist_applicant_ids(query_text, limit=None):
+    """Кандидаты с наибольшим числом общих токенов с запросом, по убыванию совпадений"""
+    if limit is None:
+        limit = settings.AI_SEARCH_SHORTLIST_SIZE
+
+    tokens = tokenize_for_index(query_text)
+    if not tokens:
+        return []
+
+    postings = (
+        ApplicantSearchToken.objects
+        .filter(token__in=tokens, applicant__is_published=True)
+        .values('applicant_id')
+        .annotate(hits=Count('id'))
+        .order_by('-hits', 'applicant_id')[:limit]
+    )
+    return [row['applicant_id'] for row in postings]
+
+
+def index_signature(kind, object_id, signature):
+    """Перезаписывает LSH-корзины документа по его MinHash-подписи"""
+    with transaction.atomic():
+        LSHBucket.objects.filter(kind=kind, object_id=object_id).delete()
+        LSHBucket.objects.bulk_create([
+            LSHBucket(kind=kind, band=band, bucket=bucket, object_id=object_id)
+            for band, bucket in enumerate(minhash.band_hashes(signature))
+        ])
+
+
+def remove_signature(kind, object_id):
+    """Удаляет LSH-корзины удаленного документа"""
+    LSHBucket.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def published_ids(kind):
+    """Подзапрос id опубликованных документов kind"""
+    if kind == 'applicant':
+        return Applicant.objects.filter(is_published=True).values('id')
+    return Vacancy.objects.filter(status='published').values('id')
+
+
+def lsh_is_empty(kind):
+    return not LSHBucket.objects.filter(kind=kind).exists()
+
+
+def lsh_candidate_ids(kind, signature, limit=None):
+    """Опубликованные документы, совпавшие с подписью хотя бы в одной полосе, по убыванию числа совпавших полос.
+
+    Корзины снятых с публикации документов остаются (документ могут опубликовать снова),
+    поэтому они отсекаются в запросе - до ограничения limit.
+    """
+    if limit is None:
+        limit = settings.AI_SEARCH_SHORTLIST_SIZE
+
+    bands = Q()
+    for band, bucket in enumerate(minhash.band_hashes(signature)):
+        bands |= Q(band=band, bucket=bucket)
+
+    rows = (
+        LSHBucket.objects
+        .filter(bands, kind=kind, object_id__in=published_ids(kind))
+        .values('object_id')
+        .annotate(collisions=Count('id'))
+        .order_by('-collisions', 'object_id')[:limit]
+    )
+    return [row['object_id'] for row in rows]
@@ -0,0 +1,211 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import result_cache, search_locks
+from .ai_matcher import AIMatcher, SearchBudget
+from .models import AISearchJob, IdealCandidateProfile
+from .search_log import summary_text
+
+# Как часто (в секундах) записываем прогресс задачи в БД
+PROGRESS_UPDATE_INTERVAL = 0.5
+
+# Сколько секунд запрос ждет, пока другой запрос по тому же профилю ставит задачу в очередь
+ENQUEUE_LOCK_WAIT = 2
+
+
+def enqueue_search(profile, user=None):
+    """Ставит ИИ-поиск по профилю в очередь и сразу возвращает (задача, создана ли новая).
+
+    Если такой же поиск (профиль с тем же отпечатком) уже в очереди или
+    выполняется, новая задача не создается: запрос присоединяется к идущей.
+    """
+    fingerprint = result_cache.profile_fingerprint(profile)
+
+    # Проверка и создание - под блокировкой профиля, иначе два одновременных запроса создадут две задачи.
+    # Если дождаться ее не удалось, задача все равно создается: повтор отсеет run_job
+    with search_locks.hold(search_locks.profile_key(profile, 'enqueue'), uuid.uuid4().hex, wait=ENQUEUE_LOCK_WAIT):
+        job = active_job_for(profile)
+        if job is not None and job.fingerprint == fingerprint:
+            AISearchJob.objects.filter(id=job.id).update(coalesced=F('coalesced') + 1)
+            job.refresh_from_db()
+            return job, False
+
+        profile_field = 'ideal_candidate_profile' if isinstance(profile, IdealCandidateProfile) \
+            else 'ideal_vacancy_profile'
+        job = AISearchJob.objects.create(**{profile_field: profile}, requested_by=user, fingerprint=fingerprint)
+        return job, True
+
+
+def job_lock_key(job):
+    """Ключ блокировки поиска по профилю задачи"""
+    if job.ideal_candidate_profile_id:
+        return search_locks.lock_key('search', 'candidate', job.ideal_candidate_profile_id)
+    return search_locks.lock_key('search', 'vacancy', job.ideal_vacancy_profile_id)
+
+
+def jobs_for(profile):
+    """Задачи поиска по профилю"""
+    if isinstance(profile, IdealCandidateProfile):
+        return AISearchJob.objects.filter(ideal_candidate_profile=profile)
+    return AISearchJob.objects.filter(ideal_vacancy_profile=profile)
+
+
+def is_abandoned(job):
+    """Задача в статусе running, воркер которой упал или был остановлен.
+
+    Идущий поиск держит блокировку профиля и продлевает ее; у задачи, начатой
+    раньше срока блокировки и без живой блокировки, воркера больше нет.
+    """
+    return (
+        job.status == 'running'
+        and job.started_at is not None
+        and job.started_at < timezone.now() - timedelta(seconds=settings.AI_SEARCH_LOCK_TTL)
+        and not search_locks.is_locked(job_lock_key(job))
+    )
+
+
+def active_job_for(profile):
+    """Последняя незавершенная задача по профилю (брошенные упавшим воркером не учитываются)"""
+    for job in jobs_for(profile).filter(status__in=['queued', 'running']).order_by('-created_at'):
+        if not is_abandoned(job):
+            return job
+    return None
+
+
+def fail_abandoned_jobs():
+    """Помечает ошибкой задачи, брошенные упавшим воркером; возвращает их число"""
+    cutoff = timezone.now() - timedelta(seconds=settings.AI_SEARCH_LOCK_TTL)
+    failed = 0
+    for job in AISearchJob.objects.filter(status='running', started_at__lt=cutoff).only(
+        'id', 'status', 'started_at', 'ideal_candidate_profile', 'ideal_vacancy_profile'
+    ):
+        if is_abandoned(job):
+            failed += AISearchJob.objects.filter(id=job.id, status='running').update(
+                status='failed', error='Воркер остановился, не завершив поиск', finished_at=timezone.now()
+            )
+    return failed
+
+
+def last_search_summary(profile):
+    """Сводка последнего завершенного поиска по профилю для страницы результатов ('' - поиска не было)"""
+    job = jobs_for(profile).filter(status='done').order_by('-finished_at').only('stats').first()
+    return summary_text(job.stats.get('summary')) if job is not None and job.stats else ''
+
+
+def claim_next_job():
+    """Забирает самую старую задачу из очереди.
+
+    Захват - условный UPDATE по статусу, поэтому несколько воркеров
+    не возьмут одну и ту же задачу на любой СУБД. Задачи профилей, по
+    которым уже идет поиск, пропускаются до его завершения. Задачи,
+    брошенные упавшим воркером, перед этим помечаются ошибкой.
+    """
+    fail_abandoned_jobs()
+    # Занятые профили читаем один раз: очередь просматривается до первой свободной задачи,
+    # сколько бы задач занятых профилей ни стояло перед ней
+    locked = search_locks.locked_keys()
+    for job in AISearchJob.objects.filter(status='queued').only(
+        'id', 'ideal_candidate_profile', 'ideal_vacancy_profile'
+    ).iterator():
+        if job_lock_key(job) in locked:
+            continue
+        claimed = AISearchJob.objects.filter(id=job.id, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        if claimed:
+            return AISearchJob.objects.get(id=job.id)
+    return None
+
+
+def run_job(job):
+    """Выполняет поиск по задаче, сохраняя прогресс и итог.
+
+    Одновременно по профилю идет только один поиск (блокировка в таблице
+    SearchLock общая для всех процессов): иначе запуски переписывали бы одни
+    и те же совпадения. Если блокировка занята, задача возвращается в очередь.
+    Если такой же поиск уже завершился на текущем корпусе, его результат
+    засчитывается задаче без повторной оценки.
+    """
+    key, owner = job_lock_key(job), f'job:{job.id}'
+    if not search_locks.acquire(key, owner):
+        AISearchJob.objects.filter(id=job.id).update(status='queued', started_at=None)
+        job.refresh_from_db()
+        return job
+
+    try:
+        entry = result_cache.fresh_entry(job.profile)
+        if entry is not None:
+            AISearchJob.objects.filter(id=job.id).update(
+                status='done', result_count=entry.result_count, stats=dict(entry.stats, reused=True),
+                finished_at=timezone.now()
+            )
+            job.refresh_from_db()
+            return job
+        return _run_search(job, key, owner)
+    finally:
+        search_locks.release(key, owner)
+
+
+def _run_search(job, key, owner):
+    last_update = 0
+
+    def report_progress(scored, total):
+        nonlocal last_update
+        now = time.monotonic()
+        # total равен None, пока корпус читается потоком и его размер неизвестен
+        if (total is None or scored < total) and now - last_update < PROGRESS_UPDATE_INTERVAL:
+            return
+        last_update = now
+        AISearchJob.objects.filter(id=job.id).update(scored=scored, total=total or 0)
+        # Идущий поиск продлевает блокировку профиля
+        search_locks.extend(key, owner)
+
+    # Версию корпуса фиксируем до поиска: изменения во время поиска сделают результат неактуальным
+    version = result_cache.corpus_version()
+
+    # Кандидатов ищет HR, вакансии - соискатель: у ролей свои бюджеты
+    if job.ideal_candidate_profile_id:
+        search, budget = AIMatcher.find_candidates_for_hr, SearchBudget.for_role('hr')
+    else:
+        search, budget = AIMatcher.find_vacancies_for_applicant, SearchBudget.for_role('applicant')
+
+    try:
+        matches = search(job.profile, progress_callback=report_progress, budget=budget)
+        if matches.resume:
+            # Лучшие из уже оцененных сохранены и видны пользователю, остальное досчитываем без бюджета
+            AISearchJob.objects.filter(id=job.id).update(result_count=len(matches), stats=matches.stats)
+            partial_budget = matches.stats['budget']
+            matches = search(job.profile, progress_callback=report_progress, resume=matches.resume)
+            matches.stats['budget'] = dict(partial_budget, continued=True)
+    except Exception as e:
+        AISearchJob.objects.filter(id=job.id).update(status='failed', error=str(e), finished_at=timezone.now())
+        raise
+
+    AISearchJob.objects.filter(id=job.id).update(
+        status='done', result_count=len(matches), stats=matches.stats, finished_at=timezone.now()
+    )
+    result_cache.store(job.profile, version, matches)
+    job.refresh_from_db()
+    return job
+
+
+def job_status_payload(job):
+    """Состояние задачи для JSON-эндпоинта"""
+    return {
+        'id': job.id,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'scored': job.scored,
+        'total': job.total,
+        'result_count': job.result_count,
+        'coalesced': job.coalesced,
+        'stats': job.stats,
+        'summary': summary_text((job.stats or {}).get('summary')),
+        'finished': job.is_finished,
+        'error': job.error,
+    }
@@ -0,0 +1,83 @@
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdealCandidateProfile, SearchLock
+
+
+def lock_key(purpose, kind, profile_id):
+    """Ключ блокировки: назначение, тип профиля ('candidate' или 'vacancy') и его id"""
+    return f'{purpose}:{kind}:{profile_id}'
+
+
+def profile_key(profile, purpose='search'):
+    """Ключ блокировки по профилю"""
+    kind = 'candidate' if isinstance(profile, IdealCandidateProfile) else 'vacancy'
+    return lock_key(purpose, kind, profile.pk)
+
+
+def acquire(key, owner, ttl=None):
+    """Захватывает блокировку key, если она свободна или просрочена.
+
+    Занятость держится уникальным ключом строки, поэтому из двух процессов
+    (в том числе разных воркеров gunicorn) строку создаст только один.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=ttl or settings.AI_SEARCH_LOCK_TTL)
+    # Блокировка упавшего процесса освобождается по истечении срока
+    SearchLock.objects.filter(key=key, expires_at__lt=now).delete()
+    try:
+        with transaction.atomic():
+            SearchLock.objects.create(key=key, owner=owner, acquired_at=now, expires_at=expires_at)
+    except IntegrityError:
+        return False
+    return True
+
+
+def extend(key, owner, ttl=None):
+    """Продлевает свою блокировку (долгий поиск не должен потерять ее по сроку)"""
+    expires_at = timezone.now() + timedelta(seconds=ttl or settings.AI_SEARCH_LOCK_TTL)
+    return bool(SearchLock.objects.filter(key=key, owner=owner).update(expires_at=expires_at))
+
+
+def extend_owned(owner, ttl=None):
+    """Продлевает все блокировки владельца одним запросом (пакетный поиск по многим профилям)"""
+    expires_at = timezone.now() + timedelta(seconds=ttl or settings.AI_SEARCH_LOCK_TTL)
+    return SearchLock.objects.filter(owner=owner).update(expires_at=expires_at)
+
+
+def release(key, owner):
+    SearchLock.objects.filter(key=key, owner=owner).delete()
+
+
+def is_locked(key):
+    return SearchLock.objects.filter(key=key, expires_at__gte=timezone.now()).exists()
+
+
+def locked_keys(purpose='search'):
+    """Ключи занятых блокировок одного назначения (одним запросом)"""
+    return set(SearchLock.objects.filter(
+        key__startswith=f'{purpose}:', expires_at__gte=timezone.now()
+    ).values_list('key', flat=True))
+
+
+@contextmanager
+def hold(key, owner, wait=0, poll_interval=0.05):
+    """Держит блокировку внутри блока with, ожидая ее не дольше wait секунд.
+
+    В блок передается True, если блокировка захвачена, иначе False.
+    """
+    deadline = time.monotonic() + wait
+    acquired = acquire(key, owner)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        acquired = acquire(key, owner)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release(key, owner)
@@ -0,0 +1,62 @@
+import logging
+import random
+
+from django.conf import settings
+
+logger = logging.getLogger('career_app.ai_search')
+
+# Что оценивает поиск - для текста сводки
+DOCUMENT_LABELS = {'candidates': 'резюме', 'vacancies': 'вакансий'}
+
+
+def item_sampler():
+    """Функция выборки для отладочных строк по отдельным документам или None, если они выключены.
+
+    Строки пишутся на уровне DEBUG и только для доли AI_SEARCH_DEBUG_SAMPLE_RATE
+    документов: проверка уровня логгера - одна на часть корпуса, а не на документ.
+    """
+    rate = settings.AI_SEARCH_DEBUG_SAMPLE_RATE
+    if rate <= 0 or not logger.isEnabledFor(logging.DEBUG):
+        return None
+    if rate >= 1:
+        return lambda: True
+    return lambda: random.random() < rate
+
+
+def summarize(kind, profile, result):
+    """Сводка поиска: число оцененных документов, отсечение, длительность этапов.
+
+    Записывается в result.stats['summary'] (ее показывает страница результатов)
+    и одним событием INFO в лог.
+    """
+    pruning = result.stats.get('pruning', {})
+    timings = result.stats.get('timings', {})
+    summary = {
+        'kind': kind,
+        'scored': pruning.get('candidates', 0),
+        'exact_scored': pruning.get('exact_scored', 0),
+        'pruned_ratio': pruning.get('pruned_ratio', 0),
+        'results': len(result),
+        'duration_ms': round(timings.get('total', 0) * 1000),
+        'stages_ms': {stage: round(seconds * 1000) for stage, seconds in timings.items() if stage != 'total'},
+        'partial': bool(result.stats.get('partial')),
+    }
+    result.stats['summary'] = summary
+
+    logger.info(
+        'ai_search kind=%s profile=%s scored=%d exact=%d pruned_ratio=%s results=%d duration_ms=%d stages=%s%s',
+        kind, profile.pk, summary['scored'], summary['exact_scored'], summary['pruned_ratio'],
+        summary['results'], summary['duration_ms'],
+        ','.join(f'{stage}:{ms}' for stage, ms in summary['stages_ms'].items()),
+        ' partial' if summary['partial'] else '',
+    )
+    return summary
+
+
+def summary_text(summary):
+    """Сводка для пользователя: «Оценено 12 430 резюме за 840 мс»"""
+    if not summary:
+        return ''
+    scored = f"{summary['scored']:,}".replace(',', ' ')
+    label = DOCUMENT_LABELS.get(summary['kind'], 'документов')
+    return f"Оценено {scored} {label} за {summary['duration_ms']} мс"
@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, Applicant, Vacancy, SkillTag, IdealCandidateProfile, AISearchMatch
+from .search_index import index_applicant, remove_signature
+from .result_cache import bump_corpus_version
+from .skill_tags import bump_tags_version
+from .ai_matcher import AIMatcher
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -15,4 +19,44 @@ def save_user_profile(sender, instance, **kwargs):
     try:
         instance.userprofile.save()
     except UserProfile.DoesNotExist:
-        UserProfile.objects.create(user=instance, role='applicant')
\ No newline at end of file
+        UserProfile.objects.create(user=instance, role='applicant')
+
+
+@receiver(post_save, sender=Applicant)
+def update_applicant_search_data(sender, instance, **kwargs):
+    """Обновляет индекс, признаки резюме и совпадения с активными профилями HR при сохранении"""
+    index_applicant(instance)
+    AIMatcher.refresh_applicant_features(instance)
+    AIMatcher.match_applicant_against_profiles(instance)
+    # Снятое с публикации резюме тоже меняет корпус, поэтому версию повышаем при любом сохранении
+    bump_corpus_version()
+
+
+@receiver(post_save, sender=Vacancy)
+def update_vacancy_search_data(sender, instance, **kwargs):
+    """Обновляет MinHash-подпись и LSH-корзины вакансии при сохранении"""
+    AIMatcher.refresh_vacancy_features(instance)
+    bump_corpus_version()
+
+
+@receiver(post_save, sender=IdealCandidateProfile)
+def rescore_candidate_matches(sender, instance, **kwargs):
+    """Новые веса профиля HR сразу пересчитывают процент сохраненных совпадений (одним UPDATE)"""
+    AISearchMatch.objects.rescore_candidates(instance)
+
+
+@receiver(post_delete, sender=Applicant)
+@receiver(post_delete, sender=Vacancy)
+def invalidate_search_results(sender, instance, **kwargs):
+    """Удаление резюме или вакансии делает кэш результатов ИИ-поиска неактуальным"""
+    # object_id LSH-корзин - не внешний ключ, каскадом они не удаляются
+    remove_signature('applicant' if sender is Applicant else 'vacancy', instance.pk)
+    bump_corpus_version()
+
+
+@receiver(post_save, sender=SkillTag)
+@receiver(post_delete, sender=SkillTag)
+def invalidate_skill_tags(sender, instance, **kwargs):
+    """Изменение справочника тегов: сохраненные id навыков пересопоставляются при следующем поиске"""
+    bump_tags_version()
+    bump_corpus_version()
@@ -0,0 +1,85 @@
+from collections import deque
+
+
+def _is_word_char(char):
+    # + и # - части названий технологий (c++, c#)
+    return char.isalnum() or char in '+#_'
+
+
+def normalize_text(text):
+    """Нижний регистр и одиночные пробелы: многословные навыки находятся при любых переносах"""
+    return ' '.join((text or '').lower().split())
+
+
+class SkillAutomaton:
+    """Автомат Ахо-Корасик по словарю навыков.
+
+    Все упоминания навыков в тексте находятся за один линейный проход,
+    независимо от размера словаря. Совпадение засчитывается только целым
+    словом: "java" не находится внутри "javascript".
+    """
+
+    def __init__(self, patterns):
+        """patterns - {название навыка: id тега}"""
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for pattern, tag_id in patterns.items():
+            pattern = normalize_text(pattern)
+            if pattern:
+                self._add(pattern, tag_id)
+        self._build_fail_links()
+
+    def _add(self, pattern, tag_id):
+        node = 0
+        for char in pattern:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = next_node
+        self.output[node].append((len(pattern), tag_id, pattern))
+
+    def _build_fail_links(self):
+        # Обход в ширину: ссылка неудачи ведет в самый длинный собственный суффикс, который есть в боре.
+        # У узлов первого уровня она ведет в корень (уже проставлено при добавлении)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """Упоминания навыков в тексте: {id тега: первое найденное написание}"""
+        text = normalize_text(text)
+        found = {}
+        node = 0
+
+        for position, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+
+            for length, tag_id, pattern in self.output[node]:
+                if tag_id in found:
+                    continue
+                start = position - length + 1
+                before_ok = start == 0 or not _is_word_char(text[start - 1])
+                after_ok = position + 1 == len(text) or not _is_word_char(text[position + 1])
+                if before_ok and after_ok:
+                    found[tag_id] = pattern
+
+        return found
+
+    def find_ids(self, text):
+        """Множество id тегов, упомянутых в тексте"""
+        return set(self.find(text))
@@ -0,0 +1,197 @@
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import SkillTag
+from .result_cache import counter_value, increment_counter
+from .skill_extractor import SkillAutomaton
+from .skill_vectors import RequiredSkillsMatrix
+
+# Версия справочника тегов: повышается при любом изменении SkillTag
+SKILL_TAGS_VERSION = 'skill_tags_version'
+
+_lookup_lock = threading.Lock()
+_lookup = {'version': None, 'tags': {}, 'automaton': None}
+# Версия, прочитанная процессом, и когда ее перечитать (time.monotonic())
+_version = {'value': None, 'expires': 0.0}
+
+
+def normalize_skill(skill):
+    return ' '.join(skill.lower().split())
+
+
+def tags_version():
+    """Версия справочника; счетчик в БД читается не чаще раза в AI_SEARCH_SKILL_TAGS_TTL секунд"""
+    now = time.monotonic()
+    if _version['value'] is None or now >= _version['expires']:
+        _version['value'] = counter_value(SKILL_TAGS_VERSION)
+        _version['expires'] = now + settings.AI_SEARCH_SKILL_TAGS_TTL
+    return _version['value']
+
+
+def bump_tags_version():
+    increment_counter(SKILL_TAGS_VERSION)
+    # Процесс, изменивший справочник, видит новую версию сразу
+    _version['value'] = None
+
+
+def _load_tags(version):
+    tags = {}
+    # Сначала синонимы, затем названия: совпадение синонима с названием другого тега решается в пользу названия
+    for tag in SkillTag.objects.only('id', 'aliases'):
+        for alias in tag.alias_list():
+            tags[normalize_skill(alias)] = tag.id
+    for tag_id, name in SkillTag.objects.values_list('id', 'name'):
+        tags[normalize_skill(name)] = tag_id
+
+    _lookup['tags'] = tags
+    _lookup['automaton'] = None
+    _lookup['version'] = version
+
+
+def current_tags():
+    """Версия справочника и словарь {нормализованное название или синоним тега: id}.
+
+    Словарь перечитывается из БД только после изменения тегов.
+    """
+    version = tags_version()
+    with _lookup_lock:
+        if _lookup['version'] != version:
+            _load_tags(version)
+        return version, _lookup['tags']
+
+
+def tag_lookup():
+    return current_tags()[1]
+
+
+def current_automaton(tags=None):
+    """Автомат Ахо-Корасик по текущему справочнику; перестраивается после изменения тегов.
+
+    tags - уже полученный current_tags(): версия тогда не проверяется повторно.
+    """
+    if tags is None:
+        tags = current_tags()
+    with _lookup_lock:
+        # Справочник перечитан после получения tags - автомат по словарю из tags, без кэша
+        if _lookup['tags'] is not tags[1]:
+            return SkillAutomaton(tags[1])
+        if _lookup['automaton'] is None:
+            _lookup['automaton'] = SkillAutomaton(_lookup['tags'])
+        return _lookup['automaton']
+
+
+def find_tag_ids(text, tags=None):
+    """id тегов, упомянутых в тексте (один проход автомата)"""
+    return current_automaton(tags).find_ids(text)
+
+
+def map_skills(skills, lookup=None):
+    """Делит навыки на id тегов (отсортированы, без повторов) и не найденные в справочнике"""
+    if lookup is None:
+        lookup = tag_lookup()
+
+    tag_ids = set()
+    unmapped = []
+    for skill in skills:
+        tag_id = lookup.get(normalize_skill(skill))
+        if tag_id is None:
+            unmapped.append(skill)
+        else:
+            tag_ids.add(tag_id)
+    return sorted(tag_ids), unmapped
+
+
+def ids_to_bytes(tag_ids):
+    """Отсортированный массив id тегов: 4 байта на тег"""
+    return np.asarray(tag_ids, dtype='<u4').tobytes()
+
+
+def ids_from_bytes(data):
+    return frozenset(np.frombuffer(bytes(data or b''), dtype='<u4').tolist())
+
+
+def stored_tag_ids(skills, text, data, version, tags, automaton=None):
+    """id тегов из сохраненных признаков.
+
+    Если справочник менялся после сохранения, текст и навыки сопоставляются
+    заново по текущему словарю (tags - результат current_tags(), automaton -
+    current_automaton(tags), если он уже получен для нескольких документов).
+    """
+    current_version, lookup = tags
+    if version == current_version:
+        return ids_from_bytes(data)
+    if automaton is None:
+        automaton = current_automaton(tags)
+    return frozenset(map_skills(skills, lookup)[0]) | frozenset(automaton.find_ids(text))
+
+
+def save_remapped_ids(features_model, key_field, remapped, version):
+    """Сохраняет id тегов, заново сопоставленных по справочнику версии version.
+
+    remapped - {id документа: id тегов}, key_field - поле features_model с id
+    документа. Следующее чтение этих признаков уже не сопоставляет текст заново.
+    """
+    if not remapped:
+        return
+    with transaction.atomic():
+        for document_id, tag_ids in remapped.items():
+            features_model.objects.filter(**{key_field: document_id}).update(
+                skill_ids=ids_to_bytes(sorted(tag_ids)), skill_tags_version=version
+            )
+
+
+class SkillRequirements:
+    """Требуемые навыки профиля: теги сравниваются пересечением множеств id,
+    нечеткое сравнение n-граммами остается только для навыков вне справочника.
+    """
+
+    def __init__(self, required_skills, extra_tag_ids=(), tags=None):
+        """tags - результат current_tags(), если он уже получен"""
+        if tags is None:
+            tags = current_tags()
+        tag_ids, unmapped = map_skills(required_skills, tags[1])
+        tag_ids = set(tag_ids) | set(extra_tag_ids)
+
+        # Требование, в котором упомянут тег ("опыт с python"), учитывается этим тегом
+        self.free_skills = []
+        automaton = current_automaton(tags) if unmapped else None
+        for skill in unmapped:
+            mentioned = automaton.find_ids(skill)
+            if mentioned:
+                tag_ids |= mentioned
+            else:
+                self.free_skills.append(skill)
+
+        self.tag_ids = frozenset(tag_ids)
+        self.count = len(self.tag_ids) + len(self.free_skills)
+        self._free_matrix = None
+
+    def __bool__(self):
+        return self.count > 0
+
+    @property
+    def free_matrix(self):
+        if self._free_matrix is None:
+            self._free_matrix = RequiredSkillsMatrix(self.free_skills)
+        return self._free_matrix
+
+    def percentages(self, fuzzy_totals, candidates_tag_ids):
+        """Процент совпадения: найденные теги плюс сумма нечетких совпадений остальных навыков"""
+        if not self.count:
+            return [100] * len(candidates_tag_ids)
+        return [
+            int((len(self.tag_ids & tag_ids) + fuzzy) / self.count * 100)
+            for tag_ids, fuzzy in zip(candidates_tag_ids, fuzzy_totals)
+        ]
+
+    def match_batch(self, candidates_skills, candidates_tag_ids):
+        """Процент совпадения для каждого кандидата"""
+        if self.free_skills:
+            fuzzy_totals = self.free_matrix.best_matches(candidates_skills).sum(axis=1).tolist()
+        else:
+            fuzzy_totals = [0] * len(candidates_skills)
+        return self.percentages(fuzzy_totals, candidates_tag_ids)
@@ -0,0 +1,128 @@
+import numpy as np
+
+# Смесь коэффициентов Дайса по символам с учетом повторов и по символьным биграммам.
+# Подобрана так, чтобы повторять SequenceMatcher.ratio() без попарного перебора строк:
+# на типичных навыках итоговый процент отличается в среднем на 2-3 пункта (см. tests.py).
+# Расходится порядок слов: n-граммы его не учитывают, поэтому "react node.js" и
+# "node.js react" совпадают полностью, а у SequenceMatcher - примерно наполовину
+UNIGRAM_WEIGHT = 0.6
+BIGRAM_WEIGHT = 0.4
+
+# Сколько строк навыков кандидатов обрабатываем за одно матричное умножение
+MAX_ROWS_PER_CHUNK = 20000
+
+
+def char_ngrams(skill, n):
+    """Множество символьных n-грамм навыка с границами слова"""
+    padded = f' {skill} '
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def char_occurrences(skill):
+    """Символы навыка с номером повтора: ('a', 1), ('a', 2)...
+
+    Пересечение таких множеств - число общих символов с учетом повторов,
+    как у совпадающих символов SequenceMatcher.
+    """
+    seen = {}
+    occurrences = set()
+    for char in skill:
+        seen[char] = seen.get(char, 0) + 1
+        occurrences.add((char, seen[char]))
+    return occurrences
+
+
+class RequiredSkillsMatrix:
+    """Требуемые навыки профиля в виде бинарных векторов n-грамм"""
+
+    def __init__(self, required_skills):
+        self.required_skills = list(required_skills)
+        self.unigram_vocab = {}
+        self.bigram_vocab = {}
+
+        required_unigrams = [char_occurrences(skill) for skill in self.required_skills]
+        required_bigrams = [char_ngrams(skill, 2) for skill in self.required_skills]
+
+        for grams in required_unigrams:
+            for gram in grams:
+                self.unigram_vocab.setdefault(gram, len(self.unigram_vocab))
+        for grams in required_bigrams:
+            for gram in grams:
+                self.bigram_vocab.setdefault(gram, len(self.bigram_vocab))
+
+        self.unigrams = self._binary_matrix(required_unigrams, self.unigram_vocab)
+        self.bigrams = self._binary_matrix(required_bigrams, self.bigram_vocab)
+        self.unigram_sizes = np.array([len(grams) for grams in required_unigrams], dtype=np.float64)
+        self.bigram_sizes = np.array([len(grams) for grams in required_bigrams], dtype=np.float64)
+
+    @staticmethod
+    def _binary_matrix(gram_sets, vocab):
+        matrix = np.zeros((len(gram_sets), len(vocab)), dtype=np.float32)
+        for row, grams in enumerate(gram_sets):
+            columns = [vocab[gram] for gram in grams if gram in vocab]
+            matrix[row, columns] = 1
+        return matrix
+
+    def similarity(self, skills):
+        """Матрица схожести (len(skills) x len(required_skills))"""
+        skill_unigrams = [char_occurrences(skill) for skill in skills]
+        skill_bigrams = [char_ngrams(skill, 2) for skill in skills]
+
+        # Пересечения считаем только по n-граммам требуемых навыков,
+        # а размеры множеств - по всем n-граммам навыка кандидата.
+        # Счетчики пересечений в float32 точны, доли считаем в float64
+        unigram_overlap = self._binary_matrix(skill_unigrams, self.unigram_vocab) @ self.unigrams.T
+        bigram_overlap = self._binary_matrix(skill_bigrams, self.bigram_vocab) @ self.bigrams.T
+        unigram_sizes = np.array([len(grams) for grams in skill_unigrams], dtype=np.float64)
+        bigram_sizes = np.array([len(grams) for grams in skill_bigrams], dtype=np.float64)
+
+        # Пустая строка навыка не имеет символов: знаменатель не меньше 1, чтобы не делить на ноль
+        unigram_dice = 2 * unigram_overlap / np.maximum(unigram_sizes[:, None] + self.unigram_sizes[None, :], 1)
+        bigram_dice = 2 * bigram_overlap / (bigram_sizes[:, None] + self.bigram_sizes[None, :])
+        return UNIGRAM_WEIGHT * unigram_dice + BIGRAM_WEIGHT * bigram_dice
+
+    def best_matches(self, candidates_skills):
+        """Лучшая схожесть по каждому требуемому навыку для каждого кандидата (кандидаты x требования)"""
+        best = np.zeros((len(candidates_skills), len(self.required_skills)), dtype=np.float64)
+
+        # Склеиваем навыки кандидатов в одну матрицу и берем максимум по отрезкам
+        for start, end in _chunk_bounds(candidates_skills):
+            chunk = candidates_skills[start:end]
+            non_empty = [index for index, skills in enumerate(chunk) if skills]
+            if not non_empty:
+                continue
+
+            flat_skills = [skill for index in non_empty for skill in chunk[index]]
+            offsets = np.cumsum([0] + [len(chunk[index]) for index in non_empty[:-1]])
+            similarity = self.similarity(flat_skills)
+            best[start + np.array(non_empty)] = np.maximum.reduceat(similarity, offsets, axis=0)
+
+        return best
+
+
+def _chunk_bounds(candidates_skills):
+    """Делит кандидатов на отрезки примерно по MAX_ROWS_PER_CHUNK навыков"""
+    start = 0
+    rows = 0
+    for end, skills in enumerate(candidates_skills):
+        if rows and rows + len(skills) > MAX_ROWS_PER_CHUNK:
+            yield start, end
+            start, rows = end, 0
+        rows += len(skills)
+
+    if start < len(candidates_skills):
+        yield start, len(candidates_skills)
+
+
+def skills_match_batch(candidates_skills, required_skills):
+    """Процент совпадения требований для каждого кандидата за одну матричную операцию"""
+    if isinstance(required_skills, RequiredSkillsMatrix):
+        matrix = required_skills
+    else:
+        matrix = RequiredSkillsMatrix(required_skills)
+
+    if not matrix.required_skills:
+        return [100] * len(candidates_skills)
+
+    best = matrix.best_matches(candidates_skills)
+    return [int(total / len(matrix.required_skills) * 100) for total in best.sum(axis=1).tolist()]
@@ -0,0 +1,76 @@
+import random
+from difflib import SequenceMatcher
+from itertools import permutations
+
+from django.test import SimpleTestCase
+
+from .ai_matcher import AIMatcher
+
+# Навыки из резюме и профилей: отдельные слова и короткие сочетания
+SKILL_WORDS = (
+    'python django react javascript typescript node.js vue.js sql postgresql docker java kotlin golang rust '
+    'c++ c# 1с figma excel linux git rest api английский язык управление проектами разработка '
+    'тестирование аналитика данных машинное обучение backend frontend команда опыт работы'
+).split()
+
+
+def random_skills(rng, count):
+    return [' '.join(rng.sample(SKILL_WORDS, rng.choice([1, 1, 1, 2, 3]))) for _ in range(count)]
+
+
+class SkillsMatchParityTests(SimpleTestCase):
+    """Векторное сравнение навыков (n-граммы) против эталона на SequenceMatcher"""
+
+    # Допустимое расхождение в пунктах процента в среднем по случайным наборам навыков.
+    # В отдельных случайных случаях расхождение больше (порядок слов в сочетаниях),
+    # поэтому по каждому случаю оно проверяется на кандидатах с частью требуемых навыков
+    MEAN_TOLERANCE = 3
+    MAX_TOLERANCE = 10
+    # Кандидаты, эталонные оценки которых отличаются больше, ранжируются в том же порядке
+    RANKING_TOLERANCE = 5
+
+    def test_matches_exact_within_tolerance(self):
+        rng = random.Random(0)
+        differences = []
+        for _ in range(300):
+            candidate_skills = random_skills(rng, rng.randint(1, 30))
+            required_skills = random_skills(rng, rng.randint(1, 8))
+            differences.append(abs(
+                AIMatcher.calculate_skills_match(candidate_skills, required_skills)
+                - AIMatcher.calculate_skills_match_exact(candidate_skills, required_skills)
+            ))
+
+        self.assertLessEqual(sum(differences) / len(differences), self.MEAN_TOLERANCE)
+
+    def test_ranks_candidates_like_exact(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            required_skills = random_skills(rng, rng.randint(2, 8))
+            # Кандидаты от не знающего ни одного требуемого навыка до знающего все, с лишними навыками
+            candidates = [rng.sample(required_skills, count) + random_skills(rng, rng.randint(0, 15))
+                          for count in range(len(required_skills) + 1)]
+            fast = [AIMatcher.calculate_skills_match(skills, required_skills) for skills in candidates]
+            exact = [AIMatcher.calculate_skills_match_exact(skills, required_skills) for skills in candidates]
+
+            for fast_score, exact_score in zip(fast, exact):
+                self.assertLessEqual(abs(fast_score - exact_score), self.MAX_TOLERANCE)
+            for i, j in permutations(range(len(candidates)), 2):
+                if exact[i] - exact[j] > self.RANKING_TOLERANCE:
+                    self.assertGreater(fast[i], fast[j], (required_skills, candidates[i], candidates[j]))
+
+    def test_same_skills_match_fully(self):
+        skills = ['python', 'django', 'postgresql']
+        self.assertEqual(AIMatcher.calculate_skills_match(skills, skills), 100)
+        self.assertEqual(AIMatcher.calculate_skills_match_exact(skills, skills), 100)
+
+    def test_no_required_skills(self):
+        self.assertEqual(AIMatcher.calculate_skills_match(['python'], []), 100)
+        self.assertEqual(AIMatcher.calculate_skills_match_exact(['python'], []), 100)
+
+    def test_word_order_is_ignored(self):
+        # Известное расхождение: n-граммы не учитывают порядок слов, SequenceMatcher - учитывает
+        self.assertEqual(AIMatcher.calculate_skills_match(['react node.js'], ['node.js react']), 100)
+        self.assertLess(AIMatcher.calculate_skills_match_exact(['react node.js'], ['node.js react']), 60)
+
+    def test_empty_skill_string(self):
+        self.assertEqual(AIMatcher.calculate_skills_match([''], ['python']), 0)
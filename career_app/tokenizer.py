@@ -0,0 +1,166 @@
+import hashlib
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+try:
+    import snowballstemmer
+except ImportError:  # стемминг необязателен
+    snowballstemmer = None
+
+# Слова из букв и цифр (для шинглов MinHash)
+WORD_RE = re.compile(r'\w+')
+# Термины индекса: слова и названия технологий вместе с + и # (c++, c#)
+TERM_RE = re.compile(r'[a-zа-яё0-9][a-zа-яё0-9+#]+')
+# Кириллица в слове - выбираем стеммер по алфавиту
+CYRILLIC_RE = re.compile(r'[а-яё]')
+
+# Общеупотребительные русские и английские слова
+STOPWORDS = frozenset({
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а', 'то', 'все', 'она', 'так',
+    'его', 'но', 'да', 'ты', 'к', 'у', 'же', 'вы', 'за', 'бы', 'по', 'только', 'ее', 'мне', 'было',
+    'вот', 'от', 'меня', 'еще', 'нет', 'о', 'из', 'ему', 'теперь', 'когда', 'даже', 'ну', 'ли',
+    'если', 'уже', 'или', 'ни', 'быть', 'был', 'него', 'до', 'вас', 'нибудь', 'опять', 'уж', 'вам',
+    'ведь', 'там', 'потом', 'себя', 'ничего', 'ей', 'может', 'они', 'тут', 'где', 'есть', 'надо',
+    'ней', 'для', 'мы', 'тебя', 'их', 'чем', 'была', 'сам', 'чтоб', 'без', 'будто', 'чего', 'раз',
+    'тоже', 'себе', 'под', 'будет', 'ж', 'тогда', 'кто', 'этот', 'того', 'потому', 'этого', 'какой',
+    'при', 'также', 'это', 'эти', 'этой', 'над', 'через', 'после', 'между', 'очень', 'более',
+    'the', 'and', 'for', 'with', 'of', 'in', 'to', 'on', 'at', 'a', 'an', 'is', 'are', 'be', 'by',
+    'or', 'as', 'this', 'that', 'from', 'was', 'were', 'will', 'can', 'not', 'but', 'have',
+    'has', 'i', 'we', 'you', 'our', 'your', 'my',
+})
+
+# Метки полей из get_full_resume_text и слишком общие слова - встречаются почти в каждом резюме
+INDEX_STOPWORDS = STOPWORDS | {
+    'должность', 'уровень', 'опыта', 'образования', 'навыки', 'резюме', 'опыт',
+    'образование', 'соискатель', 'работа', 'работы', 'знание', 'умение',
+}
+
+_stemmers = {}
+
+
+def _stem(term):
+    """Основа слова стеммером Snowball (русским или английским по алфавиту)"""
+    language = 'russian' if CYRILLIC_RE.search(term) else 'english'
+    if language not in _stemmers:
+        _stemmers[language] = snowballstemmer.stemmer(language)
+    return _stemmers[language].stemWord(term)
+
+
+def stemming_enabled():
+    return settings.AI_SEARCH_STEMMING and snowballstemmer is not None
+
+
+class Document:
+    """Результат разбора одного текста.
+
+    Текст приводится к нижнему регистру один раз, списки слов и термины
+    вычисляются при первом обращении и дальше переиспользуются всеми
+    этапами оценки. Слова интернируются: одинаковые токены разных резюме
+    занимают память один раз и сравниваются по ссылке.
+    """
+
+    __slots__ = ('text', '_words', '_word_set', '_word_tokens', '_term_tokens', '_terms')
+
+    def __init__(self, text):
+        self.text = (text or '').lower().strip()
+        self._words = None
+        self._word_set = None
+        self._word_tokens = None
+        self._term_tokens = None
+        self._terms = None
+
+    @property
+    def words(self):
+        """Слова через пробел"""
+        if self._words is None:
+            self._words = tuple(sys.intern(word) for word in self.text.split())
+        return self._words
+
+    @property
+    def word_set(self):
+        if self._word_set is None:
+            self._word_set = frozenset(self.words)
+        return self._word_set
+
+    @property
+    def word_tokens(self):
+        """Слова из букв и цифр без знаков препинания"""
+        if self._word_tokens is None:
+            self._word_tokens = tuple(sys.intern(word) for word in WORD_RE.findall(self.text))
+        return self._word_tokens
+
+    @property
+    def term_tokens(self):
+        """Термины по порядку с повторами: без стоп-слов, при включенном стемминге - основы слов"""
+        if self._term_tokens is None:
+            terms = [term for term in TERM_RE.findall(self.text) if term not in INDEX_STOPWORDS]
+            if stemming_enabled():
+                terms = [_stem(term) for term in terms]
+            self._term_tokens = tuple(sys.intern(term) for term in terms)
+        return self._term_tokens
+
+    @property
+    def terms(self):
+        """Термины для индекса (множество term_tokens)"""
+        if self._terms is None:
+            self._terms = frozenset(self.term_tokens)
+        return self._terms
+
+
+class _DocumentCache:
+    """LRU-кэш разобранных текстов по хэшу содержимого"""
+
+    def __init__(self):
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        with self._lock:
+            document = self._items.get(key)
+            if document is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return document
+            self.misses += 1
+
+        document = Document(text)
+        with self._lock:
+            self._items[key] = document
+            while len(self._items) > settings.AI_SEARCH_TOKENIZER_CACHE_SIZE:
+                self._items.popitem(last=False)
+        return document
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._items)}
+
+
+_cache = _DocumentCache()
+
+
+def tokenize(text):
+    """Разобранный текст; повторный разбор того же текста берется из кэша"""
+    if isinstance(text, Document):
+        return text
+    if not text:
+        return Document('')
+    return _cache.get(text)
+
+
+def cache_info():
+    return _cache.info()
+
+
+def clear_cache():
+    _cache.clear()
@@ -72,6 +72,7 @@ urlpatterns = [
     path('ai-search/results/<int:profile_id>/', views.ai_search_results, name='ai_search_results'),
     path('ai-search/run/<int:profile_id>/', views.run_ai_search, name='run_ai_search'),
     path('ai-search/force/<int:profile_id>/', views.force_ai_search, name='force_ai_search'),
+    path('ai-search/jobs/<int:job_id>/status/', views.ai_search_job_status, name='ai_search_job_status'),
     path('ai-search/send-offer/<int:match_id>/', views.send_offer_to_candidate, name='send_offer_to_candidate'),
 
     # Резюме
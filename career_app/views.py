@@ -751,6 +751,8 @@ def moderate_vacancy(request, pk, action):
     if action == 'approve':
         vacancy.status = 'published'
         vacancy.save()
+        # Сразу показываем новую вакансию соискателям с подходящими профилями
+        AIMatcher.match_vacancy_against_profiles(vacancy)
         messages.success(request, f'Вакансия "{vacancy.title}" опубликована!')
     elif action == 'reject':
         vacancy.status = 'rejected'
@@ -1776,6 +1778,8 @@ def create_chat_from_internship_response(request, response_id):
 
 from .ai_matcher import AIMatcher
 from .forms import IdealCandidateProfileForm, IdealVacancyProfileForm
+from .search_jobs import enqueue_search, active_job_for, job_status_payload, last_search_summary
+from . import result_cache, search_log
 
 
 @login_required
@@ -1789,10 +1793,10 @@ def create_ideal_candidate_profile(request):
             profile.hr_user = request.user
             profile.save()
 
-            # Запускаем поиск кандидатов
-            matches = AIMatcher.find_candidates_for_hr(profile)
+            # Ставим поиск кандидатов в очередь - результаты появятся на странице профиля
+            enqueue_search(profile, request.user)
 
-            messages.success(request, f'Найдено {len(matches)} подходящих кандидатов!')
+            messages.success(request, 'Профиль создан! Поиск кандидатов запущен.')
             return redirect('ai_candidate_results', profile_id=profile.id)
     else:
         form = IdealCandidateProfileForm()
@@ -1871,33 +1875,23 @@ def ai_search_results(request, profile_id):
     try:
         if user_profile.role == 'hr':
             profile = IdealCandidateProfile.objects.get(id=profile_id, hr_user=request.user)
-            matches = AISearchMatch.objects.filter(
-                ideal_candidate_profile=profile
-            ).select_related('matched_applicant').order_by('-match_percentage')
+            matches = AISearchMatch.objects.candidate_results(profile)
             template = 'career_app/ai_candidate_results.html'
         else:
             profile = IdealVacancyProfile.objects.get(id=profile_id, applicant__user=request.user)
-            matches = AISearchMatch.objects.filter(
-                ideal_vacancy_profile=profile
-            ).select_related('matched_vacancy', 'matched_vacancy__company').order_by('-match_percentage')
+            matches = AISearchMatch.objects.vacancy_results(profile)
             template = 'career_app/ai_vacancy_results.html'
 
-        # ДИАГНОСТИКА: выводим отладочную информацию
-        print(f"=== ДИАГНОСТИКА РЕЗУЛЬТАТОВ ===")
-        print(f"Профиль: {profile.title}")
-        print(f"Найдено совпадений в базе: {matches.count()}")
-        for match in matches:
-            if hasattr(match, 'matched_vacancy') and match.matched_vacancy:
-                print(f"- Вакансия: {match.matched_vacancy.title} - {match.match_percentage}%")
-            elif hasattr(match, 'matched_applicant') and match.matched_applicant:
-                print(
-                    f"- Кандидат: {match.matched_applicant.first_name} {match.matched_applicant.last_name} - {match.match_percentage}%")
+        matches_count = matches.count()
+        search_log.logger.debug('Результаты профиля %s: совпадений в базе %d', profile.pk, matches_count)
 
         context = {
             'profile': profile,
             'matches': matches,
+            'active_job': active_job_for(profile),
+            'search_summary': last_search_summary(profile),
             'debug_info': {
-                'matches_count': matches.count(),
+                'matches_count': matches_count,
                 'profile_title': profile.title
             }
         }
@@ -1969,14 +1963,14 @@ def ai_search_dashboard(request):
 
     if user_profile.role == 'hr':
         profiles = IdealCandidateProfile.objects.filter(hr_user=request.user)
-        recent_matches = AISearchMatch.objects.filter(
+        recent_matches = AISearchMatch.objects.visible().filter(
             ideal_candidate_profile__hr_user=request.user
         ).select_related('matched_applicant')[:5]
     elif user_profile.role == 'applicant':
         try:
             applicant = request.user.applicant
             profiles = IdealVacancyProfile.objects.filter(applicant=applicant)
-            recent_matches = AISearchMatch.objects.filter(
+            recent_matches = AISearchMatch.objects.visible().filter(
                 ideal_vacancy_profile__applicant=applicant
             ).select_related('matched_vacancy', 'matched_vacancy__company')[:5]
         except Applicant.DoesNotExist:
@@ -2091,7 +2085,7 @@ def ai_search_dashboard(request):
 
     if user_profile.role == 'hr':
         profiles = IdealCandidateProfile.objects.filter(hr_user=request.user)
-        recent_matches = AISearchMatch.objects.filter(
+        recent_matches = AISearchMatch.objects.visible().filter(
             ideal_candidate_profile__hr_user=request.user
         ).select_related('matched_applicant')[:5]
         total_applicants = Applicant.objects.filter(is_published=True).count()
@@ -2104,7 +2098,7 @@ def ai_search_dashboard(request):
         try:
             applicant = request.user.applicant
             profiles = IdealVacancyProfile.objects.filter(applicant=applicant)
-            recent_matches = AISearchMatch.objects.filter(
+            recent_matches = AISearchMatch.objects.visible().filter(
                 ideal_vacancy_profile__applicant=applicant
             ).select_related('matched_vacancy', 'matched_vacancy__company')[:5]
             total_vacancies = Vacancy.objects.filter(status='published').count()
@@ -2157,19 +2151,14 @@ from .models import IdealVacancyProfile, Vacancy
 
 @login_required
 def force_ai_search(request, profile_id):
-    """Принудительный запуск ИИ-поиска"""
+    """Принудительный запуск ИИ-поиска (в фоне)"""
     try:
         profile = IdealVacancyProfile.objects.get(id=profile_id, applicant__user=request.user)
-        from .ai_matcher import AIMatcher
 
-        # Запускаем поиск
-        results = AIMatcher.find_vacancies_for_applicant(profile)
+        # Ставим поиск в очередь, страница результатов покажет прогресс
+        enqueue_search(profile, request.user)
 
-        # Проверяем сохраненные результаты
-        saved_matches = AISearchMatch.objects.filter(ideal_vacancy_profile=profile)
-
-        messages.success(request,
-                         f'Поиск выполнен! Найдено {len(results)} вакансий, сохранено {saved_matches.count()} совпадений.')
+        messages.success(request, 'Поиск запущен! Результаты появятся на этой странице.')
         return redirect('ai_search_results', profile_id=profile_id)
 
     except Exception as e:
@@ -2179,21 +2168,28 @@ def force_ai_search(request, profile_id):
 
 @login_required
 def run_ai_search(request, profile_id):
-    """Запуск ИИ-поиска и отображение результатов"""
+    """Запуск ИИ-поиска в фоне и переход к результатам"""
     try:
         user_profile = request.user.userprofile
 
         if user_profile.role == 'hr':
             profile = IdealCandidateProfile.objects.get(id=profile_id, hr_user=request.user)
-            from .ai_matcher import AIMatcher
-            results = AIMatcher.find_candidates_for_hr(profile)
-            messages.success(request, f'Поиск завершен! Найдено {len(results)} кандидатов.')
+            # Профиль и корпус не менялись - сохраненные совпадения актуальны, повторно не считаем
+            if result_cache.lookup(profile):
+                messages.info(request, 'Профиль и база резюме не изменились - показаны актуальные результаты.')
+            elif enqueue_search(profile, request.user)[1]:
+                messages.success(request, 'Поиск кандидатов запущен!')
+            else:
+                messages.info(request, 'Поиск по этому профилю уже выполняется - показан его прогресс.')
 
         elif user_profile.role == 'applicant':
             profile = IdealVacancyProfile.objects.get(id=profile_id, applicant__user=request.user)
-            from .ai_matcher import AIMatcher
-            results = AIMatcher.find_vacancies_for_applicant(profile)
-            messages.success(request, f'Поиск завершен! Найдено {len(results)} вакансий.')
+            if result_cache.lookup(profile):
+                messages.info(request, 'Профиль и база вакансий не изменились - показаны актуальные результаты.')
+            elif enqueue_search(profile, request.user)[1]:
+                messages.success(request, 'Поиск вакансий запущен!')
+            else:
+                messages.info(request, 'Поиск по этому профилю уже выполняется - показан его прогресс.')
 
         return redirect('ai_search_results', profile_id=profile_id)
 
@@ -2201,6 +2197,19 @@ def run_ai_search(request, profile_id):
         messages.error(request, f'Ошибка при поиске: {str(e)}')
         return redirect('ai_search_dashboard')
 
+
+@login_required
+def ai_search_job_status(request, job_id):
+    """Прогресс фонового ИИ-поиска для опроса со страницы результатов"""
+    # К задаче могли присоединиться запросы других пользователей - доступ по владельцу профиля
+    job = get_object_or_404(
+        AISearchJob,
+        Q(requested_by=request.user) | Q(ideal_candidate_profile__hr_user=request.user)
+        | Q(ideal_vacancy_profile__applicant__user=request.user),
+        id=job_id
+    )
+    return JsonResponse(job_status_payload(job))
+
 @login_required
 @user_passes_test(is_hr)
 def edit_ideal_candidate_profile(request, profile_id):
@@ -2233,13 +2242,13 @@ def ai_candidate_results(request, profile_id):
     """Результаты поиска кандидатов для HR"""
     try:
         profile = IdealCandidateProfile.objects.get(id=profile_id, hr_user=request.user)
-        matches = AISearchMatch.objects.filter(
-            ideal_candidate_profile=profile
-        ).select_related('matched_applicant').order_by('-match_percentage')
+        matches = AISearchMatch.objects.candidate_results(profile)
 
         context = {
             'profile': profile,
             'matches': matches,
+            'active_job': active_job_for(profile),
+            'search_summary': last_search_summary(profile),
         }
         return render(request, 'career_app/ai_candidate_results.html', context)
 
@@ -2254,13 +2263,13 @@ def ai_vacancy_results(request, profile_id):
     try:
         applicant = request.user.applicant
         profile = IdealVacancyProfile.objects.get(id=profile_id, applicant=applicant)
-        matches = AISearchMatch.objects.filter(
-            ideal_vacancy_profile=profile
-        ).select_related('matched_vacancy', 'matched_vacancy__company').order_by('-match_percentage')
+        matches = AISearchMatch.objects.vacancy_results(profile)
 
         context = {
             'profile': profile,
             'matches': matches,
+            'active_job': active_job_for(profile),
+            'search_summary': last_search_summary(profile),
         }
         return render(request, 'career_app/ai_vacancy_results.html', context)
 
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -106,3 +106,73 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
 AUTH_USER_MODEL = 'auth.User'
+
+# ИИ-поиск: сколько кандидатов из инвертированного индекса проходит на полную оценку
+AI_SEARCH_SHORTLIST_SIZE = config('AI_SEARCH_SHORTLIST_SIZE', default=500, cast=int)
+
+# Параллельная оценка корпуса в пуле процессов (1 - последовательно)
+AI_SEARCH_WORKERS = config('AI_SEARCH_WORKERS', default=1, cast=int)
+# Корпус меньше этого размера всегда оценивается последовательно
+AI_SEARCH_PARALLEL_MIN_CORPUS = config('AI_SEARCH_PARALLEL_MIN_CORPUS', default=2000, cast=int)
+# Максимальный размер части корпуса, отдаваемой одному процессу
+AI_SEARCH_CHUNK_SIZE = config('AI_SEARCH_CHUNK_SIZE', default=500, cast=int)
+# Точная переоценка смысловой схожести через SequenceMatcher вместо оценки по MinHash
+AI_SEARCH_EXACT_RERANK = config('AI_SEARCH_EXACT_RERANK', default=False, cast=bool)
+# Стемминг терминов индекса (нужен пакет snowballstemmer; после смены - rebuild_search_index)
+AI_SEARCH_STEMMING = config('AI_SEARCH_STEMMING', default=False, cast=bool)
+# Сколько разобранных текстов держать в LRU-кэше токенизатора
+AI_SEARCH_TOKENIZER_CACHE_SIZE = config('AI_SEARCH_TOKENIZER_CACHE_SIZE', default=10000, cast=int)
+# Кэш результатов ИИ-поиска: время жизни записи (сек) и максимум записей (вытесняются давно не использованные)
+AI_SEARCH_RESULT_CACHE_TTL = config('AI_SEARCH_RESULT_CACHE_TTL', default=3600, cast=int)
+AI_SEARCH_RESULT_CACHE_SIZE = config('AI_SEARCH_RESULT_CACHE_SIZE', default=1000, cast=int)
+# Предварительный отбор в SQL по структурным полям профиля: жесткие ограничения применяются всегда,
+# мягкие - только если после них остается не меньше AI_SEARCH_PREFILTER_MIN_ROWS документов.
+# Оба списка по умолчанию пусты (отбор включается явно).
+# Кандидаты: experience_level, education_level; вакансии: category, location
+AI_SEARCH_PREFILTER_HARD = config('AI_SEARCH_PREFILTER_HARD', default='', cast=Csv())
+AI_SEARCH_PREFILTER_SOFT = config('AI_SEARCH_PREFILTER_SOFT', default='', cast=Csv())
+AI_SEARCH_PREFILTER_MIN_ROWS = config('AI_SEARCH_PREFILTER_MIN_ROWS', default=200, cast=int)
+# Бюджет ИИ-поиска по ролям: секунды и число оцененных документов (0 - без ограничения).
+# По исчерпании бюджета сохраняются лучшие из уже оцененных совпадений, а поиск досчитывается в фоне
+AI_SEARCH_BUDGETS = {
+    'hr': {
+        'seconds': config('AI_SEARCH_BUDGET_HR_SECONDS', default=2.0, cast=float),
+        'documents': config('AI_SEARCH_BUDGET_HR_DOCUMENTS', default=0, cast=int),
+    },
+    'applicant': {
+        'seconds': config('AI_SEARCH_BUDGET_APPLICANT_SECONDS', default=2.0, cast=float),
+        'documents': config('AI_SEARCH_BUDGET_APPLICANT_DOCUMENTS', default=0, cast=int),
+    },
+}
+# Смысловая схожесть: 'embedding' - косинус векторов текстов (hashing trick), 'minhash' - оценка Жаккара
+AI_SEARCH_SEMANTIC = config('AI_SEARCH_SEMANTIC', default='embedding')
+# Размерность векторов текстов (после смены - rebuild_search_index) и сколько секунд индекс векторов
+# процесса может использоваться после изменения корпуса, прежде чем перечитать его из БД
+AI_SEARCH_EMBEDDING_DIM = config('AI_SEARCH_EMBEDDING_DIM', default=256, cast=int)
+AI_SEARCH_EMBEDDING_INDEX_TTL = config('AI_SEARCH_EMBEDDING_INDEX_TTL', default=30, cast=int)
+# Каталог файлов индекса векторов (build_embedding_index); процессы открывают их через mmap
+AI_SEARCH_INDEX_DIR = config('AI_SEARCH_INDEX_DIR', default=str(MEDIA_ROOT / 'search_index'))
+# Срок блокировки поиска по профилю (сек): продлевается во время поиска, у упавшего процесса истекает
+AI_SEARCH_LOCK_TTL = config('AI_SEARCH_LOCK_TTL', default=300, cast=int)
+# Доля документов, для которых поиск пишет отладочную строку (логгер career_app.ai_search на уровне DEBUG);
+# 0 - выключено. Сводка каждого поиска пишется на уровне INFO
+AI_SEARCH_DEBUG_SAMPLE_RATE = config('AI_SEARCH_DEBUG_SAMPLE_RATE', default=0.0, cast=float)
+AI_SEARCH_LOG_LEVEL = config('AI_SEARCH_LOG_LEVEL', default='INFO')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'career_app.ai_search': {'handlers': ['console'], 'level': AI_SEARCH_LOG_LEVEL, 'propagate': False},
+    },
+}
+# Запас сохраненных совпадений: кандидатов в AI_SEARCH_MATCH_POOL_FACTOR раз больше max_candidates
+# и с процентом до AI_SEARCH_MATCH_POOL_MARGIN ниже порога профиля. В этих пределах порог и веса
+# профиля меняются запросом к БД без повторного поиска
+AI_SEARCH_MATCH_POOL_FACTOR = config('AI_SEARCH_MATCH_POOL_FACTOR', default=3, cast=int)
+AI_SEARCH_MATCH_POOL_MARGIN = config('AI_SEARCH_MATCH_POOL_MARGIN', default=20, cast=int)
+# Сколько секунд процесс использует прочитанную версию справочника тегов, прежде чем проверить ее в БД
+# (изменение тегов в другом процессе становится видно не позже чем через этот срок)
+AI_SEARCH_SKILL_TAGS_TTL = config('AI_SEARCH_SKILL_TAGS_TTL', default=5, cast=int)